@@ -0,0 +1,379 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+from config import (ANALYTICS_CACHE_DIR, ANALYTICS_REFRESH_SECONDS, ANALYTICS_BATCH_ROWS,
+                    ANALYTICS_LOCK_STALE_SECONDS)
+from binning import bin_frame, distribution_query
+from database import read_sql
+from statements import seek_clause
+
+# analytics_cache.py
+#
+# Optional local columnar copy of the analytics tables (enabled by ANALYTICS_CACHE_DIR), so
+# chart aggregates stop hitting the OLTP database. Each table is stored as Parquet parts listed
+# in manifest.json. Append-only tables (transaction, the investment tables) are read in pages
+# of ANALYTICS_BATCH_ROWS in primary key order, one part per page, and refreshed incrementally:
+# only rows whose key is above the stored high-water mark (compared over the whole primary
+# key) are fetched. bankaccount and loan change in place (Balance, Status), so they are re-read
+# whole. Rows changed below the high-water mark are only picked up by a rebuild:
+#   python analytics_cache.py refresh|rebuild
+#
+# Aggregates run with DuckDB over the Parquet files when it is installed, otherwise with pandas
+# over the parts, combined in Arrow and converted once. A stale snapshot is refreshed on a background thread while
+# pages keep reading the old one; before the first snapshot exists charts read MySQL.
+
+# table -> (columns, primary key columns to page on incrementally, or None to re-read the whole table)
+SNAPSHOT_TABLES = {
+    "transaction": (["TranID", "AccID", "Type", "Amount", "Date", "Status", "CurrencyType"], ["TranID"]),
+    "bankaccount": (["AccID", "Type", "SetupDate", "Balance", "Status", "BranchID", "CustomerID"], None),
+    "loan": (["LoanID", "Type", "Amount", "StartDate", "Status", "CustomerID"], None),
+    "fixedrateinvestment": (["InvestID", "AccID", "Amount", "InterestRate", "StartDate"], ["InvestID", "AccID"]),
+    "variablerateinvestment": (["InvestID", "AccID", "Amount", "ReturnRate", "StartDate"], ["InvestID", "AccID"]),
+}
+
+
+def _monthly_mean(data, column, result):
+    means = data.groupby(data["StartDate"].dt.to_period("M"))[column].mean()
+    return pd.DataFrame({"Period": means.index.astype(str), result: means.to_numpy()})
+
+
+def _total(data, investment_type):
+    return pd.DataFrame({"InvestmentType": [investment_type], "TotalAmount": [data["Amount"].sum()]})
+
+
+def _transaction_volume(data):
+    counts = data.groupby(data["Date"].dt.to_period("M")).size()
+    return pd.DataFrame({"Month": counts.index.astype(str), "TransactionCount": counts.to_numpy()})
+
+
+# Chart query name -> (tables, DuckDB SQL, pandas equivalent), returning the same columns as
+# the MySQL chart query
+ANALYTICS_QUERIES = {
+    "account_types": (
+        ["bankaccount"],
+        "SELECT Type, COUNT(*) as count FROM bankaccount GROUP BY Type",
+        lambda t: t["bankaccount"].groupby("Type", observed=True).size().reset_index(name="count")),
+    "customer_growth": (
+        ["bankaccount"],
+        "SELECT year(SetupDate) as Year, COUNT(DISTINCT CustomerID) as CustomerCount "
+        "FROM bankaccount GROUP BY Year ORDER BY Year",
+        lambda t: t["bankaccount"].groupby(t["bankaccount"]["SetupDate"].dt.year.rename("Year"))["CustomerID"]
+        .nunique().reset_index(name="CustomerCount")),
+    "balance_distribution": (
+        ["bankaccount"],
+        distribution_query("balance"),  # plain FLOOR arithmetic, valid DuckDB as well
+        lambda t: bin_frame("balance", t["bankaccount"])),
+    "loan_types": (
+        ["loan"],
+        "SELECT Type, COUNT(*) as LoanCount, SUM(Amount) as TotalAmount FROM loan GROUP BY Type",
+        lambda t: t["loan"].groupby("Type", observed=True)
+        .agg(LoanCount=("Amount", "size"), TotalAmount=("Amount", "sum")).reset_index()),
+    "loan_status": (
+        ["loan"],
+        "SELECT Status, COUNT(*) as LoanCount FROM loan GROUP BY Status",
+        lambda t: t["loan"].groupby("Status", observed=True).size().reset_index(name="LoanCount")),
+    "loan_amount_distribution": (
+        ["loan"],
+        distribution_query("loan_amount"),
+        lambda t: bin_frame("loan_amount", t["loan"])),
+    "transaction_volume": (
+        ["transaction"],
+        "SELECT strftime(\"Date\", '%Y-%m') as Month, COUNT(*) as TransactionCount "
+        "FROM \"transaction\" GROUP BY Month ORDER BY Month",
+        lambda t: _transaction_volume(t["transaction"])),
+    "variable_returns": (
+        ["variablerateinvestment"],
+        "SELECT strftime(StartDate, '%Y-%m') as Period, AVG(ReturnRate) as AverageReturnRate "
+        "FROM variablerateinvestment GROUP BY Period ORDER BY Period",
+        lambda t: _monthly_mean(t["variablerateinvestment"], "ReturnRate", "AverageReturnRate")),
+    "fixed_returns": (
+        ["fixedrateinvestment"],
+        "SELECT strftime(StartDate, '%Y-%m') as Period, AVG(InterestRate) as AverageInterestRate "
+        "FROM fixedrateinvestment GROUP BY Period ORDER BY Period",
+        lambda t: _monthly_mean(t["fixedrateinvestment"], "InterestRate", "AverageInterestRate")),
+    "fixed_total": (
+        ["fixedrateinvestment"],
+        "SELECT 'Fixed Rate Investment' as InvestmentType, SUM(Amount) as TotalAmount FROM fixedrateinvestment",
+        lambda t: _total(t["fixedrateinvestment"], "Fixed Rate Investment")),
+    "variable_total": (
+        ["variablerateinvestment"],
+        "SELECT 'Variable Rate Investment' as InvestmentType, SUM(Amount) as TotalAmount FROM variablerateinvestment",
+        lambda t: _total(t["variablerateinvestment"], "Variable Rate Investment")),
+}
+
+_refresh_thread = None
+_refresh_lock = threading.Lock()
+_results = {}  # query name -> (parts it was computed from, frame)
+
+
+def enabled():
+    return bool(ANALYTICS_CACHE_DIR)
+
+
+def _path(*parts):
+    return os.path.join(ANALYTICS_CACHE_DIR, *parts)
+
+
+def read_manifest():
+    try:
+        with open(_path("manifest.json"), encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomically(path, write):
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(handle)
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _write_manifest(manifest):
+    def write(temp_path):
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, indent=2)
+    _write_atomically(_path("manifest.json"), write)
+
+
+def _write_part(table, file_name, data):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    arrow_table = pa.Table.from_pandas(data, preserve_index=False)
+    _write_atomically(_path(table, file_name), lambda temp_path: pq.write_table(arrow_table, temp_path))
+
+
+def _acquire_file_lock():
+    """Cross-process refresh lock; False when another process holds a recent one."""
+    path = _path("refresh.lock")
+    for _ in range(2):
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) < ANALYTICS_LOCK_STALE_SECONDS:
+                    return False
+                os.remove(path)  # left behind by a refresh that died
+            except FileNotFoundError:
+                pass
+    return False
+
+
+def _remove_retired(entry):
+    # Files replaced by the previous refresh; kept until now for readers holding the old manifest
+    for file_name in entry.get("retired", []):
+        try:
+            os.remove(_path(entry["table"], file_name))
+        except FileNotFoundError:
+            pass
+    entry["retired"] = []
+
+
+def batch_query(select, key, high_water=None):
+    """
+    (query, params) for the next batch after the high-water mark, or the first batch when it is
+    None. Paged on the whole key so a batch boundary between rows sharing a leading column
+    (InvestID) skips nothing.
+    """
+    columns = ", ".join(f"`{column}`" for column in key)
+    where, params = seek_clause(key, ">", high_water) if high_water is not None else ("", None)
+    return (f"{select} {'WHERE ' + where + ' ' if where else ''}"
+            f"ORDER BY {columns} LIMIT {int(ANALYTICS_BATCH_ROWS)}"), params
+
+
+def _last_key(data, key):
+    # JSON-safe key of the last row in key order
+    last = data.sort_values(key).iloc[-1] if len(data) else None
+    return None if last is None else [int(last[column]) for column in key]
+
+
+def _write_pages(table, select, key, high_water, first_index=0):
+    """
+    Fetches the rows above high_water (all rows when None) one batch at a time, writing each
+    batch as a part, so memory holds at most ANALYTICS_BATCH_ROWS rows. Yields (file name,
+    rows, high-water mark after it).
+    """
+    index = first_index
+    while True:
+        query, params = batch_query(select, key, high_water)
+        data = read_sql(query, params, timeout_ms=None)
+        if data.empty:
+            return
+        file_name = f"part-{int(time.time() * 1000)}-{index}.parquet"
+        _write_part(table, file_name, data)
+        high_water = _last_key(data, key)
+        index += 1
+        yield file_name, len(data), high_water
+
+
+def _refresh_table(manifest, table, rebuild):
+    columns, key = SNAPSHOT_TABLES[table]
+    entry = manifest.setdefault(table, {"table": table, "parts": [], "retired": [], "high_water": None, "rows": 0})
+    _remove_retired(entry)
+    os.makedirs(_path(table), exist_ok=True)
+    select = f"SELECT {', '.join(f'`{column}`' for column in columns)} FROM `{table}`"
+    started = time.time()
+    if key is None:
+        data = read_sql(select, timeout_ms=None)
+        file_name = f"full-{int(started * 1000)}.parquet"
+        _write_part(table, file_name, data)
+        entry["retired"] = entry["parts"]
+        entry.update(parts=[file_name], rows=len(data), refreshed_at=started)
+        _write_manifest(manifest)
+        return
+    if rebuild and entry["parts"]:
+        # Readers keep the old parts until the new set is complete
+        parts, rows, high_water = [], 0, None
+        try:
+            for file_name, count, high_water in _write_pages(table, select, key, None):
+                parts.append(file_name)
+                rows += count
+        except BaseException:
+            for file_name in parts:
+                os.remove(_path(table, file_name))
+            raise
+        entry["retired"] = entry["parts"]
+        entry.update(parts=parts, rows=rows, high_water=high_water, refreshed_at=started)
+        _write_manifest(manifest)
+        return
+    if rebuild or entry["high_water"] is None:
+        # First build (or an empty table): page from the lowest key
+        entry["retired"] = entry["parts"]
+        entry.update(parts=[], rows=0, high_water=None)
+    for file_name, count, high_water in _write_pages(table, select, key, entry["high_water"], len(entry["parts"])):
+        entry["parts"].append(file_name)
+        entry.update(high_water=high_water, rows=entry["rows"] + count)
+        _write_manifest(manifest)  # progress survives an interrupted refresh
+    entry["refreshed_at"] = started
+    _write_manifest(manifest)
+
+
+def refresh(rebuild=False):
+    """
+    Brings every snapshot table up to date; returns False when another process is already
+    refreshing. rebuild re-reads every table whole.
+    """
+    os.makedirs(ANALYTICS_CACHE_DIR, exist_ok=True)
+    if not _acquire_file_lock():
+        return False
+    try:
+        manifest = read_manifest()
+        for table in SNAPSHOT_TABLES:
+            _refresh_table(manifest, table, rebuild)
+        return True
+    finally:
+        os.remove(_path("refresh.lock"))
+
+
+def _refresh_quietly():
+    try:
+        refresh()
+    except Exception:
+        pass  # charts keep the previous snapshot (or MySQL) until the next attempt
+
+
+def _refresh_in_background():
+    global _refresh_thread
+    with _refresh_lock:
+        if _refresh_thread is None or not _refresh_thread.is_alive():
+            _refresh_thread = threading.Thread(target=_refresh_quietly, name="analytics_refresh", daemon=True)
+            _refresh_thread.start()
+
+
+def freshness():
+    """{table: time of its last refresh, or None before the first one}."""
+    manifest = read_manifest() if enabled() else {}
+    return {table: manifest.get(table, {}).get("refreshed_at") for table in SNAPSHOT_TABLES}
+
+
+def _ready(tables):
+    """Whether the snapshot holds the tables; starts a background refresh when it is stale."""
+    refreshed = freshness()
+    if any(at is None or time.time() - at > ANALYTICS_REFRESH_SECONDS for at in refreshed.values()):
+        _refresh_in_background()
+    return all(refreshed[table] is not None for table in tables)
+
+
+def read_table(table, manifest=None):
+    """A snapshot table as one DataFrame; its parts are concatenated in Arrow and converted once."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    entry = (manifest or read_manifest())[table]
+    parts = [pq.read_table(_path(table, file_name)) for file_name in entry["parts"]]
+    if not parts:
+        return pd.DataFrame(columns=SNAPSHOT_TABLES[table][0])
+    # Parts written from different batches may type an all-NULL column differently
+    return pa.concat_tables(parts, promote_options="default").to_pandas()
+
+
+def _run_duckdb(duckdb, sql, tables, manifest):
+    conn = duckdb.connect()
+    try:
+        for table in tables:
+            files = ", ".join("'" + _path(table, file_name).replace("'", "''") + "'"
+                              for file_name in manifest[table]["parts"])
+            conn.execute(f"CREATE VIEW \"{table}\" AS SELECT * FROM read_parquet([{files}])")
+        return conn.execute(sql).df()
+    finally:
+        conn.close()
+
+
+def query(name):
+    """
+    The chart query's result computed from the snapshot, or None when the snapshot can't
+    serve it yet (disabled, not built, or a part vanished mid-refresh) and MySQL should.
+    """
+    if not enabled() or name not in ANALYTICS_QUERIES:
+        return None
+    tables, sql, aggregate = ANALYTICS_QUERIES[name]
+    if not _ready(tables):
+        return None
+    manifest = read_manifest()
+    version = tuple(tuple(manifest[table]["parts"]) for table in tables)
+    cached = _results.get(name)
+    if cached is not None and cached[0] == version:
+        return cached[1].copy()
+    try:
+        import duckdb
+    except ImportError:
+        duckdb = None
+    # A damaged or half-replaced snapshot falls back to MySQL rather than failing the chart
+    errors = (OSError, ValueError) + ((duckdb.Error,) if duckdb is not None else ())
+    try:
+        if duckdb is None:
+            data = aggregate({table: read_table(table, manifest) for table in tables})
+        else:
+            data = _run_duckdb(duckdb, sql, tables, manifest)
+    except errors:
+        return None
+    _results[name] = (version, data)
+    return data.copy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the local analytics snapshot.")
+    parser.add_argument("command", choices=["refresh", "rebuild"],
+                        help="refresh: fetch new and changed rows; rebuild: re-read every table")
+    args = parser.parse_args()
+    if not enabled():
+        parser.error("ANALYTICS_CACHE_DIR is not set in config.py")
+    if not refresh(rebuild=args.command == "rebuild"):
+        print("Another process is refreshing the snapshot.")
+        return
+    for table, entry in read_manifest().items():
+        print(f"{table}: {entry['rows']} rows in {len(entry['parts'])} part(s)")
+
+
+if __name__ == "__main__":
+    main()
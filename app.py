@@ -3,6 +3,8 @@ import os
 import streamlit as st
 from crud import display_crud_operations
 from visualizations import display_visualizations
+from diagnostics import display_diagnostics
+from overview import display_overview
 from styles import set_background_gif, set_title_style, set_container_style, hide_topbar   # Imported styling functions
 
 def main():
@@ -19,12 +21,16 @@ def main():
     # Display the styled title
     st.markdown('<h1 class="title">Banking System Dashboard with CRUD and Visualizations</h1>', unsafe_allow_html=True)
     st.sidebar.title("Navigation")
-    page = st.sidebar.selectbox("Select Page", ["CRUD Operations", "Visualizations"])
+    page = st.sidebar.selectbox("Select Page", ["CRUD Operations", "Visualizations", "Overview", "Diagnostics"])
 
     if page == "CRUD Operations":
         display_crud_operations()
     elif page == "Visualizations":
         display_visualizations()
+    elif page == "Overview":
+        display_overview()
+    elif page == "Diagnostics":
+        display_diagnostics()
 
 if __name__ == "__main__":
     st.set_page_config(page_title="Banking System Dashboard", page_icon="🏦")
@@ -0,0 +1,107 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from config import ASYNC_MAX_WORKERS, ASYNC_QUERY_TIMEOUT, QUERY_MAX_ROWS, RESULT_CACHE_TTL
+from database import cached_group, read_snapshot, read_sql
+from guardrails import QueryTimeoutError
+from routing import bind_session, current_session_id
+
+# async_queries.py
+#
+# Concurrent data loading. Independent queries (or whole loaders) are fanned out with asyncio
+# and gathered, so a page needing several result sets waits for the slowest one instead of
+# the sum. The queries run on a small thread pool through database.read_sql, so replica
+# routing, read-your-writes, the execution timeout and KILL QUERY cancellation still apply.
+
+_executor = ThreadPoolExecutor(max_workers=ASYNC_MAX_WORKERS, thread_name_prefix="query")
+
+
+async def run_blocking(function, *args, timeout=ASYNC_QUERY_TIMEOUT, name=None, session_id=None):
+    """
+    Runs a blocking function on the query thread pool as the given (default: current) session,
+    so read-your-writes routing still applies. A timeout stops waiting for the result; the
+    worker thread finishes the call in the background.
+    """
+    loop = asyncio.get_running_loop()
+    # Carry context variables (e.g. a guardrails cancel scope) over to the worker thread
+    context = contextvars.copy_context()
+    future = loop.run_in_executor(_executor, context.run, bind_session(function, session_id), *args)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        raise QueryTimeoutError(f"{name or getattr(function, '__name__', 'query')} timed out after {timeout}s")
+
+
+async def gather_named(awaitables, return_exceptions=False):
+    """Awaits {name: awaitable} concurrently and returns {name: result} in the same order."""
+    names = list(awaitables)
+    results = await asyncio.gather(*awaitables.values(), return_exceptions=return_exceptions)
+    return dict(zip(names, results))
+
+
+def _on_query_thread():
+    return threading.current_thread().name.startswith("query_")
+
+
+def _run(coroutine):
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # Already inside an event loop (e.g. a notebook): run ours on a separate thread
+    with ThreadPoolExecutor(max_workers=1) as runner:
+        return runner.submit(contextvars.copy_context().run, asyncio.run, coroutine).result()
+
+
+def run_loaders(loaders, timeout=ASYNC_QUERY_TIMEOUT, return_exceptions=False):
+    """
+    Calls {name: function} concurrently on the query thread pool and returns {name: result}.
+    With return_exceptions, a failed or timed-out call yields its exception instead of raising.
+    """
+    if _on_query_thread():
+        # Nested inside another fan-out: waiting on the same pool could starve it, so run in-line
+        return {name: function() for name, function in loaders.items()}
+    session_id = current_session_id()
+
+    async def main():
+        return await gather_named(
+            {name: run_blocking(function, timeout=timeout, name=name, session_id=session_id)
+             for name, function in loaders.items()},
+            return_exceptions)
+    return _run(main())
+
+
+def run_queries(queries, snapshot_groups=(), timeout=ASYNC_QUERY_TIMEOUT, max_rows=QUERY_MAX_ROWS):
+    """
+    Runs {name: query or (query, params)} concurrently and returns {name: DataFrame}. Each
+    query gets its own connection and is stopped by the server after `timeout` seconds; the
+    names in each of snapshot_groups are read together in one database.read_snapshot() so
+    their numbers agree, and the group counts as one concurrent load.
+    """
+    queries = {name: query if isinstance(query, tuple) else (query, None) for name, query in queries.items()}
+    loaders, grouped = {}, set()
+    for group in snapshot_groups:
+        members = {name: queries[name] for name in group if name in queries}
+        if len(members) > 1:
+            loaders[tuple(members)] = partial(read_snapshot, members, cached=False, max_rows=max_rows)
+            grouped.update(members)
+    for name, (query, params) in queries.items():
+        if name not in grouped:
+            loaders[name] = partial(read_sql, query, params, timeout_ms=int(timeout * 1000), max_rows=max_rows)
+    frames = {}
+    for name, result in run_loaders(loaders, timeout=timeout).items():
+        frames.update(result if isinstance(name, tuple) else {name: result})
+    return {name: frames[name] for name in queries}
+
+
+def read_concurrently(queries, snapshot_groups=(), cached=True, ttl=RESULT_CACHE_TTL,
+                      timeout=ASYNC_QUERY_TIMEOUT, max_rows=QUERY_MAX_ROWS):
+    """
+    run_queries() through the result cache, with the whole group stored as one entry (like
+    database.read_snapshot), so a cached page is served from a single lookup.
+    """
+    return cached_group(queries, partial(run_queries, snapshot_groups=snapshot_groups, timeout=timeout,
+                                         max_rows=max_rows), cached=cached, ttl=ttl)
@@ -0,0 +1,73 @@
+import numbers
+
+import numpy as np
+import pandas as pd
+from config import DISTRIBUTION_BIN_WIDTHS
+
+# binning.py
+#
+# Histograms for the distribution charts. binned_query() builds SQL that buckets in the
+# database (FLOOR(value / width) * width, grouped and counted), so only one row per bin is
+# transferred; bin_values() does the same bucketing with NumPy for data that is already local.
+# Both return a frame of BinStart, Count ordered by BinStart.
+
+# name -> (table, value expression, local column, whether the column holds dates of birth)
+DISTRIBUTIONS = {
+    "age": ("customer", "TIMESTAMPDIFF(YEAR, DateOfBirth, CURDATE())", "DateOfBirth", True),
+    "balance": ("bankaccount", "Balance", "Balance", False),
+    "loan_amount": ("loan", "Amount", "Amount", False),
+}
+
+
+def _width_literal(width):
+    # Inlined rather than bound so the text alone identifies the query (result cache, EXPLAIN)
+    if isinstance(width, bool) or not isinstance(width, numbers.Real) or width <= 0:
+        raise ValueError(f"Bin width must be a positive number, got {width!r}")
+    return repr(int(width)) if float(width).is_integer() else repr(float(width))
+
+
+def binned_query(table, expression, width):
+    width = _width_literal(width)
+    return f"""
+    SELECT FLOOR(({expression}) / {width}) * {width} as BinStart, COUNT(*) as Count
+    FROM {table}
+    WHERE {expression} IS NOT NULL
+    GROUP BY BinStart
+    ORDER BY BinStart
+    """
+
+
+def distribution_query(name, width=None):
+    table, expression, _, _ = DISTRIBUTIONS[name]
+    return binned_query(table, expression, width or DISTRIBUTION_BIN_WIDTHS[name])
+
+
+def ages(dates_of_birth, today=None):
+    """Completed years of age for each date of birth, vectorized (NaN where unknown)."""
+    today = pd.Timestamp(today or "today").normalize()
+    born = pd.to_datetime(pd.Series(dates_of_birth), errors="coerce")
+    had_birthday = (born.dt.month < today.month) | ((born.dt.month == today.month) & (born.dt.day <= today.day))
+    return (today.year - born.dt.year - (~had_birthday).astype("int64")).where(born.notna())
+
+
+def bin_values(values, width):
+    """Histogram of local values with the same bucketing as binned_query()."""
+    _width_literal(width)
+    values = pd.to_numeric(pd.Series(values), errors="coerce").dropna().to_numpy(dtype="float64")
+    starts, counts = np.unique(np.floor(values / width) * width, return_counts=True)
+    return pd.DataFrame({"BinStart": starts, "Count": counts})
+
+
+def bin_frame(name, data, width=None):
+    """Histogram of a distribution from raw rows already loaded (its local column)."""
+    _, _, column, is_birth_date = DISTRIBUTIONS[name]
+    values = ages(data[column]) if is_birth_date else data[column]
+    return bin_values(values, width or DISTRIBUTION_BIN_WIDTHS[name])
+
+
+def bin_labels(starts, width):
+    """Axis labels: the value itself for unit-width bins, otherwise 'start-end'."""
+    if width == 1:
+        return [f"{start:g}" for start in starts]
+    return [f"{start:,.0f}-{start + width:,.0f}" if float(width).is_integer() else f"{start:g}-{start + width:g}"
+            for start in starts]
@@ -0,0 +1,251 @@
+import csv
+import os
+import re
+import tempfile
+import time
+
+import pandas as pd
+import streamlit as st
+from sqlalchemy import text
+from config import IMPORT_CHUNK_SIZE, IMPORT_USE_LOAD_DATA, IMPORT_MAX_ERRORS_PER_CHUNK
+from database import create_database_engine, execute_many, note_write, quote_identifier
+from schema import INTEGER_TYPES, get_table
+from statements import insert_statement
+import table_cache
+
+# bulk_import.py
+#
+# Streams CSV/Parquet files into a table in bounded chunks. Each chunk is validated against the
+# reflected column types, then loaded with LOAD DATA LOCAL INFILE when the server allows it or
+# with a batched multi-row INSERT otherwise. Only one chunk is held in memory at a time.
+
+NUMERIC_TYPES = {"decimal", "numeric", "float", "double", "real"}
+DATE_TYPES = {"date"}
+DATETIME_TYPES = {"datetime", "timestamp"}
+NULL_MARKERS = ["", "NULL", "\\N"]
+
+_load_data_engine = None
+# "... at row 3" in a LOAD DATA warning: the line of the chunk's temporary file
+_WARNING_ROW = re.compile(r"\bat row (\d+)\b")
+
+
+def iter_file_chunks(source, file_format, chunk_size=IMPORT_CHUNK_SIZE):
+    """Yields DataFrames of at most chunk_size rows from a CSV or Parquet file path/buffer."""
+    if file_format == "csv":
+        # Read everything as text; typing happens in validate_chunk against the table schema
+        reader = pd.read_csv(source, chunksize=chunk_size, dtype=str,
+                             keep_default_na=False, na_values=NULL_MARKERS)
+        for chunk in reader:
+            yield chunk
+    elif file_format == "parquet":
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(source)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported file format: {file_format}")
+
+
+def _coerce_column(series, column):
+    """Returns (values, bad_mask) where values are bind-ready and bad_mask flags invalid rows."""
+    present = series.notna()
+    if column.data_type in INTEGER_TYPES:
+        numbers = pd.to_numeric(series, errors="coerce")
+        bad = present & (numbers.isna() | (numbers % 1 != 0))
+        # Null out non-integral values first: casting 1.5 to Int64 raises instead of flagging the row
+        values = numbers.where(~bad).astype("Int64").astype(object)
+    elif column.data_type in NUMERIC_TYPES:
+        numbers = pd.to_numeric(series, errors="coerce")
+        bad = present & numbers.isna()
+        # Keep the textual value so DECIMAL columns don't pick up float rounding
+        values = series.astype(str)
+    elif column.data_type in DATE_TYPES:
+        dates = pd.to_datetime(series, errors="coerce")
+        bad = present & dates.isna()
+        values = dates.dt.strftime("%Y-%m-%d")
+    elif column.data_type in DATETIME_TYPES:
+        dates = pd.to_datetime(series, errors="coerce")
+        bad = present & dates.isna()
+        values = dates.dt.strftime("%Y-%m-%d %H:%M:%S")
+    else:
+        values = series.astype(str)
+        bad = pd.Series(False, index=series.index)
+        if column.max_length:
+            bad = present & (values.str.len() > column.max_length)
+    if column.required:
+        bad = bad | ~present
+    values = values.where(present & ~bad, None)
+    return values, bad
+
+
+def validate_chunk(chunk, table_info, first_row=0):
+    """
+    Checks a chunk against the table's columns.
+
+    Returns (valid_frame, errors) where errors is a list of (row_number, column, message)
+    and valid_frame holds only rows that passed, with bind-ready values.
+    """
+    errors = []
+    unknown = [column for column in chunk.columns if table_info.get_column(column) is None]
+    if unknown:
+        return chunk.iloc[0:0], [(None, ", ".join(unknown), "columns not in table")]
+    missing = [column.name for column in table_info.columns
+               if column.required and column.name not in chunk.columns]
+    if missing:
+        return chunk.iloc[0:0], [(None, ", ".join(missing), "required columns missing from file")]
+
+    bad_rows = pd.Series(False, index=chunk.index)
+    valid = pd.DataFrame(index=chunk.index)
+    for name in chunk.columns:
+        column = table_info.get_column(name)
+        values, bad = _coerce_column(chunk[name], column)
+        valid[name] = values
+        for position in bad[bad].index[:IMPORT_MAX_ERRORS_PER_CHUNK - len(errors)]:
+            errors.append((first_row + int(chunk.index.get_loc(position)) + 1, name,
+                           f"invalid {column.column_type} value: {chunk.at[position, name]!r}"))
+        bad_rows |= bad
+    return valid[~bad_rows], errors
+
+
+def load_data_available():
+    """True when both client and server allow LOAD DATA LOCAL INFILE."""
+    if not IMPORT_USE_LOAD_DATA:
+        return False
+    try:
+        with _get_load_data_engine().connect() as conn:
+            return bool(conn.execute(text("SELECT @@GLOBAL.local_infile")).scalar())
+    except Exception:
+        return False
+
+
+def _get_load_data_engine():
+    # LOAD DATA LOCAL needs the client-side local_infile flag, which the shared engine doesn't set
+    global _load_data_engine
+    if _load_data_engine is None:
+        _load_data_engine = create_database_engine(name="load_data", connect_args={"local_infile": True},
+                                                   pool_size=1, max_overflow=1)
+    return _load_data_engine
+
+
+def _load_chunk_with_infile(table_name, frame):
+    """
+    Returns (rows loaded, warnings). With LOCAL, MySQL turns conversion errors into warnings and
+    skips duplicate keys as if IGNORE were given, so the warnings are read back from the same
+    connection as (line of the chunk or None, message).
+    """
+    columns = ", ".join(quote_identifier(column) for column in frame.columns)
+    handle, path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(handle, "w", newline="", encoding="utf-8") as temp_file:
+            writer = csv.writer(temp_file, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+            for record in frame.itertuples(index=False, name=None):
+                # \N is MySQL's NULL marker; literal backslashes must be escaped for ESCAPED BY '\\'
+                writer.writerow(["\\N" if value is None else str(value).replace("\\", "\\\\")
+                                 for value in record])
+        query = (f"LOAD DATA LOCAL INFILE :path INTO TABLE {quote_identifier(table_name)} "
+                 "CHARACTER SET utf8mb4 FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+                 f"ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({columns})")
+        with _get_load_data_engine().begin() as conn:
+            loaded = conn.execute(text(query), {"path": path}).rowcount
+            warnings = conn.execute(text(f"SHOW WARNINGS LIMIT {int(IMPORT_MAX_ERRORS_PER_CHUNK)}")).fetchall()
+        note_write()
+        return loaded, [(_warning_line(message), message) for _, _, message in warnings]
+    finally:
+        os.remove(path)
+
+
+def _warning_line(message):
+    match = _WARNING_ROW.search(message)
+    return int(match.group(1)) if match else None
+
+
+def _load_chunk_with_insert(table_name, frame):
+    # Sent as multi-row INSERT statements; the file chunk commits or rolls back as a whole, and
+    # any bad value fails it with an error rather than a warning
+    query, _ = insert_statement(table_name, dict.fromkeys(frame.columns))
+    param_sets = ({f"v_{i}": value for i, value in enumerate(record)}
+                  for record in frame.itertuples(index=False, name=None))
+    return sum(chunk["affected"] for chunk in execute_many(query, param_sets, transaction="call")), []
+
+
+def import_file(table_name, source, file_format, chunk_size=IMPORT_CHUNK_SIZE, on_chunk=None, use_load_data=None):
+    """
+    Streams a file into table_name one chunk at a time; each chunk commits on its own.
+
+    on_chunk, if given, is called after every chunk with a report dict:
+    {chunk, rows_read, rows_loaded, errors, seconds, total_rows_read, total_rows_loaded, rows_per_second}.
+    Returns the final report.
+    """
+    table_info = get_table(table_name)
+    if use_load_data is None:
+        use_load_data = load_data_available()
+    load_chunk = _load_chunk_with_infile if use_load_data else _load_chunk_with_insert
+
+    started = time.perf_counter()
+    report = {"chunk": 0, "total_rows_read": 0, "total_rows_loaded": 0, "rows_per_second": 0.0,
+              "method": "LOAD DATA LOCAL INFILE" if use_load_data else "multi-row INSERT"}
+    for chunk_number, chunk in enumerate(iter_file_chunks(source, file_format, chunk_size), start=1):
+        chunk_started = time.perf_counter()
+        first_row = report["total_rows_read"]
+        valid, errors = validate_chunk(chunk, table_info, first_row=first_row)
+        loaded = 0
+        if not valid.empty:
+            try:
+                loaded, warnings = load_chunk(table_name, valid)
+            except Exception as e:
+                errors.append((None, None, f"chunk rejected by database: {e}"))
+            else:
+                for line, message in warnings[:max(IMPORT_MAX_ERRORS_PER_CHUNK - len(errors), 0)]:
+                    row = (first_row + chunk.index.get_loc(valid.index[line - 1]) + 1
+                           if line and line <= len(valid) else None)
+                    errors.append((row, None, message))
+                if 0 <= loaded < len(valid):
+                    errors.append((None, None, f"{len(valid) - loaded} of {len(valid)} valid rows were not loaded "
+                                               "(skipped by the database, e.g. duplicate keys)"))
+        report.update({
+            "chunk": chunk_number,
+            "rows_read": len(chunk),
+            "rows_loaded": max(loaded, 0),
+            "errors": errors,
+            "seconds": time.perf_counter() - chunk_started,
+        })
+        report["total_rows_read"] += len(chunk)
+        report["total_rows_loaded"] += max(loaded, 0)
+        report["rows_per_second"] = report["total_rows_read"] / max(time.perf_counter() - started, 1e-9)
+        if on_chunk:
+            on_chunk(report)
+    # Cached CRUD pages can't be patched row by row after a bulk load
+    table_cache.invalidate(table_name)
+    table_cache.acknowledge_write(table_name)
+    return report
+
+
+def display_import_panel(table_name):
+    st.subheader("Bulk Import")
+    uploaded = st.file_uploader("CSV or Parquet file:", type=["csv", "parquet"], key=f"import_{table_name}")
+    chunk_size = st.number_input("Rows per chunk:", min_value=100, max_value=100000,
+                                 value=IMPORT_CHUNK_SIZE, step=1000, key=f"import_chunk_{table_name}")
+    if uploaded is None or not st.button("Import", key=f"import_button_{table_name}"):
+        return
+
+    file_format = "parquet" if uploaded.name.lower().endswith(".parquet") else "csv"
+    total_bytes = uploaded.size or 1
+    progress = st.progress(0.0)
+    status = st.empty()
+    error_log = st.container()
+
+    def on_chunk(report):
+        progress.progress(min(uploaded.tell() / total_bytes, 1.0))
+        status.text(f"Chunk {report['chunk']}: {report['total_rows_loaded']:,} of "
+                    f"{report['total_rows_read']:,} rows loaded · {report['rows_per_second']:,.0f} rows/sec")
+        if report["errors"]:
+            error_log.warning(f"Chunk {report['chunk']}: {len(report['errors'])} problems")
+            error_log.dataframe(pd.DataFrame(report["errors"], columns=["Row", "Column", "Error"]))
+
+    try:
+        report = import_file(table_name, uploaded, file_format, chunk_size, on_chunk=on_chunk)
+        progress.progress(1.0)
+        st.success(f"Imported {report['total_rows_loaded']:,} of {report['total_rows_read']:,} rows "
+                   f"via {report['method']} at {report['rows_per_second']:,.0f} rows/sec.")
+    except Exception as e:
+        st.error(f"Import failed: {e}")
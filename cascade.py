@@ -0,0 +1,197 @@
+from collections import defaultdict
+
+import pandas as pd
+import streamlit as st
+from sqlalchemy import text
+from config import BULK_KEY_CHUNK_SIZE
+from database import engine, note_write, quote_identifier
+from schema import get_schema
+from statements import chunked, key_set_clause, bulk_delete_statements, bulk_update_statements
+
+# cascade.py
+#
+# Plans and runs deletes that follow foreign keys. Starting from a set of rows, every row that
+# references them (directly or transitively) is found with set-based IN queries, counted per
+# table for a preview, and deleted children-first in one transaction.
+#
+# A foreign key whose columns are all nullable is a reference, not ownership (loan.EmpID, the
+# employee who handled the loan): by default the referencing rows are kept and the reference
+# is set to NULL instead of deleting them and everything that depends on them.
+
+SET_NULL = "set_null"
+DELETE = "delete"
+
+
+def build_dependency_graph(schema=None):
+    """Returns {parent_table: [(child_table, ForeignKeyInfo), ...]} from the reflected schema."""
+    schema = schema or get_schema()
+    children = defaultdict(list)
+    for table in schema.values():
+        for foreign_key in table.foreign_keys:
+            children[foreign_key.referred_table].append((table.name, foreign_key))
+    return children
+
+
+def is_nullable(foreign_key, child_info):
+    """Whether every column of the foreign key accepts NULL, so a child row can outlive its parent."""
+    return all(child_info.get_column(column).nullable for column in foreign_key.columns)
+
+
+def _select_keys(conn, table_name, select_columns, where_columns, values):
+    """SELECT select_columns FROM table WHERE (where_columns) IN values, chunked."""
+    found = set()
+    columns = ", ".join(quote_identifier(column) for column in select_columns)
+    for chunk in chunked(values, BULK_KEY_CHUNK_SIZE):
+        clause, params = key_set_clause(where_columns, chunk)
+        query = f"SELECT {columns} FROM {quote_identifier(table_name)} WHERE {clause}"
+        found.update(tuple(row) for row in conn.execute(text(query), params))
+    return found
+
+
+def plan_cascade(table_name, keys, conn=None, nullable=SET_NULL, schema=None):
+    """
+    Finds every row that depends on the given rows of table_name. Rows referencing them through
+    a nullable foreign key are set NULL (nullable=SET_NULL) or deleted with their own
+    dependents (nullable=DELETE).
+
+    Returns (plan, nulls): {table: set of primary key tuples} to delete, including the starting
+    rows, and {(table, foreign key columns): set of primary key tuples} to set NULL.
+    Raises ValueError when a dependent table has no primary key to delete or update by.
+    """
+    if conn is None:
+        # Always plan on the primary: a lagging replica could miss freshly added children
+        with engine.connect() as conn:
+            return plan_cascade(table_name, keys, conn, nullable, schema)
+
+    schema = schema or get_schema()
+    graph = build_dependency_graph(schema)
+    plan = defaultdict(set)
+    nulls = defaultdict(set)
+    plan[table_name].update(tuple(key) for key in keys)
+    pending = [(table_name, set(plan[table_name]))]
+    while pending:
+        parent, parent_keys = pending.pop()
+        parent_info = schema[parent]
+        for child, foreign_key in graph.get(parent, []):
+            child_info = schema[child]
+            if not child_info.primary_key:
+                raise ValueError(f"Cannot cascade into {child}: it has no primary key.")
+            # Values of the referenced columns for the parent rows (usually the key itself)
+            if list(foreign_key.referred_columns) == list(parent_info.primary_key):
+                referenced = parent_keys
+            else:
+                referenced = _select_keys(conn, parent, foreign_key.referred_columns,
+                                          parent_info.primary_key, parent_keys)
+            if not referenced:
+                continue
+            child_keys = _select_keys(conn, child, child_info.primary_key, foreign_key.columns, referenced)
+            if nullable == SET_NULL and is_nullable(foreign_key, child_info):
+                # Also applied to rows deleted through another key, so this key never orders the deletes
+                nulls[(child, tuple(foreign_key.columns))].update(child_keys)
+                continue
+            new_keys = child_keys - plan[child]
+            if new_keys:
+                plan[child].update(new_keys)
+                pending.append((child, new_keys))
+    return dict(plan), {target: keys for target, keys in nulls.items() if keys}
+
+
+def delete_order(plan, schema=None, nullable=SET_NULL):
+    """
+    Tables in the plan ordered children-first, so no delete violates a foreign key. With
+    nullable=SET_NULL, nullable foreign keys are set NULL beforehand and don't constrain the order.
+    """
+    schema = schema or get_schema()
+    graph = build_dependency_graph(schema)
+    tables = set(plan)
+    remaining_children = {
+        table: {child for child, foreign_key in graph.get(table, [])
+                if child in tables and child != table
+                and not (nullable == SET_NULL and is_nullable(foreign_key, schema[child]))}
+        for table in tables
+    }
+    order = []
+    while remaining_children:
+        ready = sorted(table for table, children in remaining_children.items() if not children)
+        if not ready:
+            raise ValueError(f"Foreign keys form a cycle between: {', '.join(sorted(remaining_children))}")
+        for table in ready:
+            order.append(table)
+            del remaining_children[table]
+        for children in remaining_children.values():
+            children.difference_update(ready)
+    return order
+
+
+def _null_action(columns):
+    return "set " + ", ".join(columns) + " to NULL"
+
+
+def preview_cascade(table_name, keys, nullable=SET_NULL):
+    """Row counts per table and action, in execution order, as a DataFrame."""
+    plan, nulls = plan_cascade(table_name, keys, nullable=nullable)
+    rows = [{"Table": table, "Action": _null_action(columns), "Rows": len(keys)}
+            for (table, columns), keys in nulls.items()]
+    rows += [{"Table": table, "Action": "delete", "Rows": len(plan[table])} for table in delete_order(plan, None, nullable)]
+    return pd.DataFrame(rows, columns=["Table", "Action", "Rows"])
+
+
+def execute_cascade(table_name, keys, nullable=SET_NULL):
+    """
+    Re-plans inside one transaction (so rows added since the preview are included), sets the
+    nullable references to NULL, then deletes children-first, all with chunked
+    `WHERE pk IN (...)` statements. Returns ({table: rows deleted}, {table: rows set NULL}).
+    """
+    schema = get_schema()
+    deleted, nulled = {}, defaultdict(int)
+
+    def run(statements):
+        return sum(max(conn.execute(text(query), params).rowcount, 0) for query, params in statements)
+    with engine.begin() as conn:
+        plan, nulls = plan_cascade(table_name, keys, conn, nullable, schema)
+        for (table, columns), null_keys in nulls.items():
+            nulled[table] += run(bulk_update_statements(table, {column: None for column in columns},
+                                                        schema[table].primary_key, sorted(null_keys, key=repr),
+                                                        BULK_KEY_CHUNK_SIZE))
+        for table in delete_order(plan, schema, nullable):
+            deleted[table] = run(bulk_delete_statements(table, schema[table].primary_key,
+                                                        sorted(plan[table], key=repr), BULK_KEY_CHUNK_SIZE))
+    note_write()
+    return deleted, dict(nulled)
+
+
+def display_cascade_delete(table_name, keys, key_prefix):
+    """
+    Shows the per-table preview and a confirm button; once executed, returns {table: rows
+    deleted or set NULL} for every table changed.
+    """
+    nullable = st.radio("Rows referencing these through a nullable foreign key:", [SET_NULL, DELETE],
+                        format_func={SET_NULL: "Keep them, set the reference to NULL",
+                                     DELETE: "Delete them too"}.get,
+                        key=f"{key_prefix}_cascade_nullable", horizontal=True)
+    try:
+        preview = preview_cascade(table_name, keys, nullable)
+    except ValueError as e:
+        st.error(str(e))
+        return None
+    st.dataframe(preview)
+    deletes = preview[preview["Action"] == "delete"]
+    caption = f"{int(deletes['Rows'].sum())} rows in {len(deletes)} tables will be deleted, children first"
+    if len(deletes) < len(preview):
+        caption += f", after {int(preview['Rows'].sum() - deletes['Rows'].sum())} references are set to NULL"
+    st.caption(caption + ".")
+    if not st.button("Confirm cascade delete", key=f"{key_prefix}_cascade_confirm"):
+        return None
+    try:
+        deleted, nulled = execute_cascade(table_name, keys, nullable)
+    except Exception as e:
+        st.error(f"Cascade delete failed and was rolled back: {e}")
+        return None
+    message = "Deleted " + ", ".join(f"{count} from {table}" for table, count in deleted.items())
+    if nulled:
+        message += "; set NULL in " + ", ".join(f"{count} rows of {table}" for table, count in nulled.items())
+    st.success(message + ".")
+    changed = dict(nulled)
+    for table, count in deleted.items():
+        changed[table] = changed.get(table, 0) + count
+    return changed
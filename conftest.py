@@ -0,0 +1,5 @@
+# conftest.py
+#
+# Lets the tests under tests/ import the top-level modules when run as plain `pytest`.
+# test_connection.py is a manual check that connects to MySQL on import, not a unit test.
+collect_ignore = ["test_connection.py"]
@@ -1,33 +1,377 @@
 import streamlit as st
 import pandas as pd
-from database import engine, execute_sql
-from sqlalchemy import text
-
-# List of tables in the database
-table_names = [
-    'access', 'assist', 'bankaccount', 'branch', 'branchaddress', 'branchemail',
-    'branchphone', 'customer', 'customeremail', 'customernationalid', 'customerphone',
-    'employee', 'employeeemail', 'employeenationalid', 'employeephone',
-    'fixedrateinvestment', 'loan', 'loantype', 'locker', 'lockerbranch',
-    'lockercustomer', 'rolename', 'rolepermission', 'rolestatus', 'transaction',
-    'variablerateinvestment'
-]
-
-def fetch_table_data(table_name):
-    query = f"SELECT * FROM {table_name}"
-    with engine.connect() as conn:
-        data = pd.read_sql(query, conn)
+from database import execute_sql, execute_batch, quote_identifier, read_sql
+from config import CRUD_PAGE_SIZE, CRUD_MAX_PAGE_SIZE, CRUD_MAX_ROWS, BULK_KEY_CHUNK_SIZE
+from guardrails import run_cancellable, warn_truncated
+from schema import get_table, get_table_names, refresh_schema
+from statements import (row_key, to_python, display_text, primary_key_clause, primary_key_params,
+                        insert_statement, update_statement, delete_statement, chunked, key_set_clause, seek_clause,
+                        bulk_update_statements, bulk_delete_statements)
+from staging import stage_insert, stage_update, stage_delete, display_staging_panel
+from bulk_import import display_import_panel
+from export import display_export_panel
+from table_filters import compile_filters, display_filter_controls
+from cascade import display_cascade_delete
+from rollups import ROLLUP_PREFIX, SOURCE as ROLLUP_SOURCE, mark_stale as mark_rollups_stale
+from frames import memory_bytes
+import table_cache
+
+def fetch_table_data(table_name, where="", params=None, order_by=None, descending=False, max_rows=CRUD_MAX_ROWS):
+    query = f"SELECT * FROM {quote_identifier(table_name)}"
+    if where:
+        query += f" WHERE {where}"
+    if order_by:
+        order = "DESC" if descending else "ASC"
+        query += " ORDER BY " + ", ".join(f"{quote_identifier(column)} {order}" for column in order_by)
+    # Exact values: Decimal money and date objects show and bind back as stored
+    return read_sql(query, params, max_rows=max_rows, decimals="exact")
+
+def get_primary_key_columns(table_name):
+    return get_table(table_name).primary_key
+
+
+def fetch_table_page(table_name, key_columns, page_size, anchor=None, where="", params=None,
+                     sort_column=None, descending=False):
+    """
+    Fetches one page of a table using keyset (seek) pagination.
+
+    Parameters:
+    - key_columns (list): Primary key columns, in index order.
+    - page_size (int): Number of rows to return.
+    - anchor (tuple): None for the first page, or (direction, key) where direction is
+      'after' (next page), 'before' (previous page) or 'from' (jump to the first row whose
+      leading sort column is >= key[0], or <= when descending). key holds the values of
+      the ordering columns returned by page_order_columns().
+    - where, params: Extra filter condition from compile_filters(), ANDed with the seek predicate.
+    - sort_column, descending: Optional sort; the primary key is appended as a tiebreaker.
+
+    Returns (data, has_previous, has_next).
+    """
+    table = quote_identifier(table_name)
+    order_columns = page_order_columns(key_columns, sort_column)
+    params = dict(params or {})
+    params["limit"] = page_size + 1
+    direction, key = anchor if anchor else (None, None)
+    conditions = [f"({where})"] if where else []
+
+    # Walking backwards (previous page) flips both the comparison and the scan order
+    backwards = (direction == "before") != descending
+    if direction in ("after", "before"):
+        clause, key_params = seek_clause(order_columns, "<" if backwards else ">", key)
+        conditions.append(clause)
+        params.update(key_params)
+    elif direction == "from":
+        conditions.append(f"{quote_identifier(order_columns[0])} {'<=' if descending else '>='} :k0")
+        params["k0"] = key[0]
+
+    where_sql = "WHERE " + " AND ".join(conditions) if conditions else ""
+    order = "DESC" if backwards else "ASC"
+    order_by = ", ".join(f"{quote_identifier(column)} {order}" for column in order_columns)
+    query = f"SELECT * FROM {table} {where_sql} ORDER BY {order_by} LIMIT :limit"
+    data = read_sql(query, params, decimals="exact")
+
+    # One extra row tells us whether another page exists in the scan direction
+    has_more = len(data) > page_size
+    data = data.iloc[:page_size]
+    if direction == "before":
+        data = data.iloc[::-1]
+        has_previous, has_next = has_more, True
+    else:
+        has_previous, has_next = direction is not None, has_more
+    return data.reset_index(drop=True), has_previous, has_next
+
+def cached_table_page(table_name, key_columns, page_size, anchor=None, where="", params=None,
+                      sort_column=None, descending=False):
+    """fetch_table_page() through the in-process table cache."""
+    signature = repr(("page", page_size, anchor, where, sorted((params or {}).items()), sort_column, descending))
+    entry = table_cache.get_entry(table_name, signature)
+    if entry is None:
+        data, has_previous, has_next = run_cancellable(fetch_table_page, table_name, key_columns, page_size,
+                                                       anchor, where, params, sort_column, descending,
+                                                       label=f"Loading {table_name}")
+        entry = table_cache.make_entry(data, page_order_columns(key_columns, sort_column), descending,
+                                       filtered=bool(where), has_previous=has_previous, has_next=has_next)
+        table_cache.put_entry(table_name, signature, entry)
+    return entry["data"], entry["has_previous"], entry["has_next"]
+
+def cached_table_data(table_name, where="", params=None, order_by=None, descending=False):
+    """fetch_table_data() through the in-process table cache."""
+    signature = repr(("all", where, sorted((params or {}).items()), order_by, descending))
+    entry = table_cache.get_entry(table_name, signature)
+    if entry is None:
+        data = run_cancellable(fetch_table_data, table_name, where, params, order_by, descending,
+                               label=f"Loading {table_name}")
+        entry = table_cache.make_entry(data, order_by or [], descending, filtered=bool(where))
+        table_cache.put_entry(table_name, signature, entry)
+    elif "truncated_at" in entry["data"].attrs:
+        warn_truncated(f"Loading {table_name}", entry["data"].attrs["truncated_at"])
+    return entry["data"]
+
+def _write_runs(writes):
+    # Consecutive updates setting the same values, or consecutive deletes, form one run
+    runs = []
+    for write in writes:
+        signature = (write["operation"], repr(sorted(write.get("values", {}).items())))
+        if runs and runs[-1][0] == signature:
+            runs[-1][1].append(write)
+        else:
+            runs.append((signature, [write]))
+    return [run for _, run in runs]
+
+def patch_cache_after_writes(table_info, writes):
+    """
+    Applies successful writes to one table's cached frames, then acknowledges them with a single
+    change-marker check. Runs of updates and deletes are applied as one vectorized pass each.
+    Inserts are re-read together by key (`WHERE pk IN (...)`) after the other writes so defaults
+    are included; when a key isn't known (auto-increment) the table's entries are dropped instead.
+    """
+    table_name = table_info.name
+    key_columns = table_info.primary_key
+    inserted = []
+    _note_rollup_edits(table_name, {write["operation"] for write in writes})
+    for run in _write_runs(writes):
+        operation = run[0]["operation"]
+        if operation == "update":
+            table_cache.apply_update(table_name, run[0]["key_columns"], [write["key"] for write in run],
+                                     run[0]["values"])
+        elif operation == "delete":
+            table_cache.apply_delete(table_name, run[0]["key_columns"], [write["key"] for write in run])
+        else:
+            inserted.extend(write["values"] for write in run)
+    if inserted:
+        if key_columns and all(values.get(column) not in (None, "") for values in inserted
+                               for column in key_columns):
+            keys = [tuple(table_info.get_column(column).parse(values[column]) for column in key_columns)
+                    for values in inserted]
+            for chunk in chunked(keys, BULK_KEY_CHUNK_SIZE):
+                where, params = key_set_clause(key_columns, chunk)
+                table_cache.apply_insert(table_name, fetch_table_data(table_name, where, params))
+        else:
+            table_cache.invalidate(table_name)
+    table_cache.acknowledge_write(table_name)
+
+def _note_rollup_edits(table_name, operations):
+    # Edits and deletes of transactions the rollups already counted are only corrected by a rebuild
+    if table_name == ROLLUP_SOURCE and operations & {"update", "delete"}:
+        mark_rollups_stale()
+
+def patch_cache_after_write(table_info, write):
+    patch_cache_after_writes(table_info, [write])
+
+def patch_cache_after_flush(writes):
+    """Patches the cache after a staging flush: one pass and one acknowledgement per table."""
+    by_table = {}
+    for write in writes:
+        by_table.setdefault(write["table"], []).append(write)
+    for table_name, table_writes in by_table.items():
+        patch_cache_after_writes(get_table(table_name), table_writes)
+
+def page_order_columns(key_columns, sort_column=None):
+    if sort_column and sort_column not in key_columns:
+        return [sort_column] + list(key_columns)
+    if sort_column:
+        return [sort_column] + [column for column in key_columns if column != sort_column]
+    return list(key_columns)
+
+def _set_page_anchor(state_key, anchor, page_delta):
+    state = st.session_state[state_key]
+    state["anchor"] = anchor
+    if anchor is None:
+        state["page"] = 1
+    elif state["page"] is not None and page_delta:
+        state["page"] += page_delta
+    else:
+        state["page"] = None
+
+def _jump_to_key(state_key, column):
+    value = st.session_state.get(f"{state_key}_jump_value", "").strip()
+    if value:
+        try:
+            value = column.parse(value)
+        except ValueError:
+            pass  # let MySQL compare the raw text
+        _set_page_anchor(state_key, ("from", (value,)), 0)
+
+def display_table_page(table_name):
+    """
+    Renders the filter controls and the paginated grid with prev/next/jump controls,
+    and returns the visible page.
+    """
+    table_info = get_table(table_name)
+    key_columns = table_info.primary_key
+    filters, search, sort_column, descending = display_filter_controls(table_info)
+    try:
+        where, params = compile_filters(table_info, filters, search)
+    except ValueError as e:
+        st.error(f"Invalid filter value: {e}")
+        where, params = "", {}
+
+    if not key_columns:
+        st.warning(f"Table {table_name} has no primary key; loading all matching rows.")
+        data = cached_table_data(table_name, where, params, page_order_columns(key_columns, sort_column), descending)
+        st.dataframe(data)
+        return data
+
+    page_size = st.sidebar.number_input(
+        "Rows per page:", min_value=1, max_value=CRUD_MAX_PAGE_SIZE, value=CRUD_PAGE_SIZE, step=10
+    )
+    state_key = f"crud_page_{table_name}"
+    state = st.session_state.setdefault(state_key, {"anchor": None, "page": 1, "query": None})
+    # Any change to filters or sort invalidates the cursor, so start again from the first page
+    query_signature = repr((where, sorted(params.items()), sort_column, descending))
+    if state.get("query") != query_signature:
+        state.update({"anchor": None, "page": 1, "query": query_signature})
+
+    order_columns = page_order_columns(key_columns, sort_column)
+    data, has_previous, has_next = cached_table_page(table_name, key_columns, page_size, state["anchor"],
+                                                     where, params, sort_column, descending)
+    if data.empty and state["anchor"] is not None:
+        st.info("No rows on this page.")
+    st.dataframe(data)
+
+    first_key = row_key(data.iloc[0], order_columns) if not data.empty else None
+    last_key = row_key(data.iloc[-1], order_columns) if not data.empty else None
+    page_label = f"Page {state['page']}" if state["page"] else "Page"
+    direction = "descending" if descending else "ascending"
+    st.caption(f"{page_label} · {len(data)} rows ({memory_bytes(data) / 1024:.0f} KiB) · "
+               f"ordered by {', '.join(order_columns)} ({direction})")
+
+    first_col, prev_col, next_col = st.columns(3)
+    first_col.button("First", key=f"{state_key}_first", disabled=state["anchor"] is None,
+                     on_click=_set_page_anchor, args=(state_key, None, 0))
+    prev_col.button("Previous", key=f"{state_key}_prev", disabled=not has_previous or first_key is None,
+                    on_click=_set_page_anchor, args=(state_key, ("before", first_key), -1))
+    next_col.button("Next", key=f"{state_key}_next", disabled=not has_next or last_key is None,
+                    on_click=_set_page_anchor, args=(state_key, ("after", last_key), 1))
+
+    with st.form(f"{state_key}_jump"):
+        st.text_input(f"Jump to {order_columns[0]}:", key=f"{state_key}_jump_value")
+        st.form_submit_button("Jump", on_click=_jump_to_key,
+                              args=(state_key, table_info.get_column(order_columns[0])))
+
     return data
 
+def display_update_conflict(table_name, key_columns, key_values, expected, updates):
+    """
+    Explains why an optimistic UPDATE matched no row: either the row is gone or one of the
+    edited columns no longer holds the value the form was loaded with.
+    """
+    current = fetch_table_data(table_name, primary_key_clause(key_columns), primary_key_params(key_values))
+    if current.empty:
+        st.error("Update conflict: the record was deleted by someone else.")
+        return
+    st.error("Update conflict: the record was changed by someone else since it was loaded. Nothing was written.")
+    current_row = current.iloc[0]
+    report = pd.DataFrame([
+        {"Column": column, "Loaded value": display_text(expected[column]),
+         "Current value": display_text(current_row[column]), "Your value": display_text(updates[column])}
+        for column in updates
+    ])
+    st.dataframe(report)
+
+def run_bulk_action(table_info, keys, values=None):
+    """
+    Updates (values given) or deletes every row in keys with chunked `WHERE pk IN (...)`
+    statements inside one transaction. Returns the number of affected rows.
+    """
+    key_columns = table_info.primary_key
+    if values:
+        statements = bulk_update_statements(table_info.name, values, key_columns, keys, BULK_KEY_CHUNK_SIZE)
+    else:
+        statements = bulk_delete_statements(table_info.name, key_columns, keys, BULK_KEY_CHUNK_SIZE)
+    counts = execute_batch([(query, [params]) for query, params in statements])
+    operation = "update" if values else "delete"
+    patch_cache_after_writes(table_info, [{"operation": operation, "values": values or {},
+                                           "key_columns": key_columns, "key": key} for key in keys])
+    return sum(count for count in counts if count > 0)
+
+def _invalidate_after_cascade(changed):
+    _note_rollup_edits(ROLLUP_SOURCE, {"delete"} if changed.get(ROLLUP_SOURCE) else set())
+    for table_name in changed:
+        table_cache.invalidate(table_name)
+        table_cache.acknowledge_write(table_name)
+
+def display_bulk_actions(table_info, data, staging=False):
+    st.subheader("Bulk Actions")
+    key_columns = table_info.primary_key
+    select_all = st.checkbox("Select all rows on this page", key=f"bulk_all_{table_info.name}")
+    selected = st.multiselect(
+        "Select rows:", list(data.index), default=list(data.index) if select_all else [],
+        format_func=lambda index: ", ".join(f"{column}={display_text(data.at[index, column])}"
+                                            for column in key_columns),
+        key=f"bulk_rows_{table_info.name}_{select_all}",
+    )
+    if not selected:
+        return
+    keys = [row_key(data.loc[index], key_columns) for index in selected]
+
+    action = st.radio("Action:", ["Set column value", "Delete rows"], key=f"bulk_action_{table_info.name}")
+    if action == "Set column value":
+        column_col, value_col = st.columns(2)
+        column_name = column_col.selectbox("Column:", [name for name in table_info.column_names
+                                                       if name not in key_columns],
+                                           key=f"bulk_column_{table_info.name}")
+        raw_value = value_col.text_input("New value (blank for NULL):", key=f"bulk_value_{table_info.name}")
+        if not column_name or not st.button(f"Update {len(keys)} rows", key=f"bulk_update_{table_info.name}"):
+            return
+        try:
+            values = {column_name: table_info.get_column(column_name).parse(raw_value)}
+        except ValueError as e:
+            st.error(f"Invalid value: {e}")
+            return
+    else:
+        if not staging and st.checkbox("Also delete dependent rows (cascade)", key=f"bulk_cascade_{table_info.name}"):
+            deleted = display_cascade_delete(table_info.name, keys, f"bulk_{table_info.name}")
+            if deleted:
+                _invalidate_after_cascade(deleted)
+            return
+        if not st.button(f"Delete {len(keys)} rows", key=f"bulk_delete_{table_info.name}"):
+            return
+        values = None
+
+    if staging:
+        for key in keys:
+            if values:
+                stage_update(table_info.name, values, key_columns, key)
+            else:
+                stage_delete(table_info.name, key_columns, key)
+        st.success(f"Staged {len(keys)} {'updates' if values else 'deletes'}.")
+        return
+    try:
+        affected = run_bulk_action(table_info, keys, values)
+        st.success(f"{'Updated' if values else 'Deleted'} {affected} of {len(keys)} selected rows.")
+    except Exception as e:
+        st.error(f"Bulk action failed and was rolled back: {e}")
+
 def display_crud_operations():
     st.sidebar.title("Tables")
+    if st.sidebar.button("Refresh schema"):
+        refresh_schema()
+    # Rollup tables are maintained by rollups.py and must not be edited by hand
+    table_names = [name for name in get_table_names() if not name.startswith(ROLLUP_PREFIX)]
     selected_table = st.sidebar.selectbox("Select a table to manage:", table_names)
+    paginated = st.sidebar.checkbox("Paginated browsing", value=True)
+    staging = st.sidebar.checkbox("Staging mode", value=False,
+                                  help="Queue writes and flush them together in one transaction.")
 
     if selected_table:
         st.header(f"Table: {selected_table}")
         try:
-            data = fetch_table_data(selected_table)
-            st.dataframe(data)
+            table_info = get_table(selected_table)
+            key_columns = table_info.primary_key
+            # Full reloads happen only on request or when someone else changed the table
+            if st.sidebar.button("Reload table"):
+                table_cache.invalidate(selected_table)
+            elif table_cache.check_external_change(selected_table):
+                st.info("The table was changed outside this dashboard; reloaded.")
+            if paginated:
+                data = display_table_page(selected_table)
+            else:
+                filters, search, sort_column, descending = display_filter_controls(table_info)
+                where, params = compile_filters(table_info, filters, search)
+                data = cached_table_data(selected_table, where, params,
+                                         page_order_columns(key_columns, sort_column), descending)
+                st.dataframe(data)
 
             # CRUD Options
             st.subheader("CRUD Operations")
@@ -36,60 +380,115 @@ def display_crud_operations():
             st.subheader("Create New Record")
             with st.form("create_form"):
                 inputs = {}
-                for column in data.columns:
-                    value = st.text_input(f"Enter value for {column}")
-                    if column == "DateOfBirth" and value:  # Validate date format
+                for column in table_info.columns:
+                    label = f"Enter value for {column.name}" + (" *" if column.required else "")
+                    value = st.text_input(label)
+                    if column.data_type == "date" and value:  # Validate date format
                         try:
                             pd.to_datetime(value)
                         except ValueError:
-                            st.error(f"Invalid date format for {column}. Use YYYY-MM-DD.")
-                    inputs[column] = value.strip()  # Strip whitespace
+                            st.error(f"Invalid date format for {column.name}. Use YYYY-MM-DD.")
+                    inputs[column.name] = value.strip()  # Strip whitespace
 
                 submit_create = st.form_submit_button("Create")
                 if submit_create:
-                    if not all(inputs.values()):  # Ensure all fields are filled
-                        st.error("All fields are required.")
+                    missing = [column.name for column in table_info.columns
+                               if column.required and not inputs[column.name]]
+                    if missing:  # Ensure required fields are filled
+                        st.error(f"Required fields are missing: {', '.join(missing)}")
                     else:
                         try:
-                            # Prepare the INSERT query
-                            columns = ", ".join(inputs.keys())
-                            placeholders = ", ".join([f":{key}" for key in inputs.keys()])
-                            query = f"INSERT INTO {selected_table} ({columns}) VALUES ({placeholders})"
-
-                            # Execute the query
-                            execute_sql(query, inputs)
-                            st.success("Record added successfully!")
+                            # Leave blank optional columns to their defaults / NULL
+                            inputs = {key: value for key, value in inputs.items() if value}
+                            if staging:
+                                stage_insert(selected_table, inputs)
+                                st.success("Insert staged.")
+                            else:
+                                # Prepare and execute the INSERT query
+                                query, params = insert_statement(selected_table, inputs)
+                                execute_sql(query, params)
+                                patch_cache_after_write(table_info, {"operation": "insert", "values": inputs})
+                                st.success("Record added successfully!")
                         except Exception as e:
                             st.error(f"Error inserting record: {e}")
 
             # Update Operation
             st.subheader("Update Record")
-            if not data.empty:
+            if not data.empty and not key_columns:
+                st.info("Updates and deletes need a primary key.")
+            elif not data.empty:
                 row_to_update = st.selectbox("Select a row to update:", data.index)
                 selected_row = data.loc[row_to_update]
                 with st.form("update_form"):
-                    updates = {}
+                    original_text = {column: display_text(selected_row[column]) for column in data.columns}
+                    edited_text = {}
                     for column in data.columns:
-                        value = st.text_input(f"Update {column}:", str(selected_row[column]))
-                        updates[column] = value
+                        edited_text[column] = st.text_input(f"Update {column}:", original_text[column])
                     submit_update = st.form_submit_button("Update")
                     if submit_update:
-                        set_clause = ", ".join([f"{col} = :{col}" for col in updates.keys()])
-                        query = f"UPDATE {selected_table} SET {set_clause} WHERE {data.columns[0]} = :id"
-                        updates["id"] = selected_row[data.columns[0]]
-                        execute_sql(query, updates)
-                        st.success("Record updated successfully!")
+                        # Only columns whose text actually changed are written
+                        changed = [column for column in data.columns
+                                   if edited_text[column].strip() != original_text[column].strip()]
+                        try:
+                            updates = {column: table_info.get_column(column).parse(edited_text[column])
+                                       for column in changed}
+                        except ValueError as e:
+                            updates = None
+                            st.error(f"Invalid value: {e}")
+                        if updates is not None and not updates:
+                            st.info("Nothing to update; no values were changed.")
+                        elif updates:
+                            key_values = row_key(selected_row, key_columns)
+                            # The original values of the changed columns guard against concurrent edits
+                            expected = {column: to_python(selected_row[column]) for column in changed}
+                            if staging:
+                                stage_update(selected_table, updates, key_columns, key_values, expected)
+                                st.success("Update staged.")
+                            else:
+                                query, params = update_statement(selected_table, updates, key_columns,
+                                                                 key_values, expected)
+                                if execute_sql(query, params):
+                                    patch_cache_after_write(table_info, {
+                                        "operation": "update", "values": updates,
+                                        "key_columns": key_columns, "key": key_values})
+                                    st.success(f"Record updated successfully! ({', '.join(changed)})")
+                                else:
+                                    display_update_conflict(selected_table, key_columns, key_values,
+                                                            expected, updates)
 
             # Delete Operation
             st.subheader("Delete Record")
-            if not data.empty:
+            if not data.empty and key_columns:
                 row_to_delete = st.selectbox("Select a row to delete:", data.index)
                 selected_row = data.loc[row_to_delete]
-                delete_button = st.button("Delete")
-                if delete_button:
-                    query = f"DELETE FROM {selected_table} WHERE {data.columns[0]} = :id"
-                    execute_sql(query, {"id": selected_row[data.columns[0]]})
-                    st.success("Record deleted successfully!")
+                cascade = not staging and st.checkbox("Also delete dependent rows (cascade)", key="delete_cascade")
+                if cascade:
+                    deleted = display_cascade_delete(selected_table, [row_key(selected_row, key_columns)], "delete")
+                    if deleted:
+                        _invalidate_after_cascade(deleted)
+                elif st.button("Delete"):
+                    key_values = row_key(selected_row, key_columns)
+                    if staging:
+                        stage_delete(selected_table, key_columns, key_values)
+                        st.success("Delete staged.")
+                    else:
+                        query, params = delete_statement(selected_table, key_columns, key_values)
+                        execute_sql(query, params)
+                        patch_cache_after_write(table_info, {"operation": "delete",
+                                                             "key_columns": key_columns, "key": key_values})
+                        st.success("Record deleted successfully!")
+
+            if not data.empty and key_columns:
+                display_bulk_actions(table_info, data, staging)
+
+            if staging:
+                display_staging_panel(on_flushed=patch_cache_after_flush)
+
+            with st.expander("Bulk Import"):
+                display_import_panel(selected_table)
+
+            with st.expander("Export"):
+                display_export_panel(selected_table)
 
         except Exception as e:
             st.error(f"Error: {e}")
@@ -1,16 +1,288 @@
+import itertools
+import re
+import time
+from contextlib import contextmanager
+
 from sqlalchemy import create_engine, text
-from config import DATABASE_URI
+from config import (DATABASE_URI, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+                    DB_POOL_PRE_PING, DB_CONNECT_TIMEOUT, REPLICA_URIS, REPLICA_SELECTION,
+                    REPLICA_MAX_LAG_SECONDS, READ_YOUR_WRITES_SECONDS, REPLICA_LAG_CHECK_INTERVAL,
+                    RESULT_CACHE_TTL, QUERY_TIMEOUT_MS, QUERY_MAX_ROWS, EXECUTE_MANY_CHUNK_SIZE)
+from pool_metrics import InstrumentedQueuePool, instrument_engine
+from query_stats import instrument_query_timing, record_frame
+from routing import ReplicaRouter
+from frames import compact_frame, memory_bytes
+from guardrails import (QueryTimeoutError, instrument_cancellation, is_timeout, with_execution_timeout,
+                        with_row_cap, cap_rows, report_truncation)
+import result_cache
+
+def create_database_engine(uri=DATABASE_URI, name="primary", connect_args=None, **pool_options):
+    """
+    Builds an engine with the pool settings from config.py and pool metrics attached.
+    Every module should share `engine` below; extra engines (e.g. for LOAD DATA LOCAL INFILE)
+    go through here too so they show up on the diagnostics page.
+    """
+    options = dict(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    options.update(pool_options)
+    new_engine = create_engine(
+        uri,
+        poolclass=InstrumentedQueuePool,
+        connect_args={"connect_timeout": DB_CONNECT_TIMEOUT, **(connect_args or {})},
+        **options,
+    )
+    instrument_engine(new_engine, name)
+    instrument_query_timing(new_engine)
+    result_cache.instrument_result_cache(new_engine)
+    instrument_cancellation(new_engine)
+    return new_engine
+
+# Initialize the shared database connection pool (the primary; all writes go here)
+engine = create_database_engine()
+
+# Reads go through the router: a replica when one is configured and fresh enough, else the primary
+router = ReplicaRouter(
+    engine,
+    [create_database_engine(uri, name=f"replica{i + 1}") for i, uri in enumerate(REPLICA_URIS)],
+    selection=REPLICA_SELECTION,
+    max_lag_seconds=REPLICA_MAX_LAG_SECONDS,
+    read_your_writes_seconds=READ_YOUR_WRITES_SECONDS,
+    lag_check_interval=REPLICA_LAG_CHECK_INTERVAL,
+)
+
+def get_read_engine():
+    return router.read_engine()
+
+def note_write():
+    # Pins the current session's reads to the primary for READ_YOUR_WRITES_SECONDS
+    router.note_write()
+
+def _fetch_frame(conn, query, params, decimals):
+    result = conn.execute(text(query), params or {})
+    description = result.cursor.description if result.cursor is not None else None
+    return compact_frame(result.fetchall(), list(result.keys()), description, decimals)
+
+def read_sql(query, params=None, conn=None, timeout_ms=QUERY_TIMEOUT_MS, max_rows=None, decimals="float"):
+    """
+    Runs a read-only query and returns a compact DataFrame (see frames.compact_frame). Without
+    an explicit connection the query is routed to a replica (or the primary when the session
+    has just written). The frame's size is in data.attrs["memory_bytes"] and on the
+    diagnostics page.
+
+    SELECTs are stopped by the server after timeout_ms (QueryTimeoutError). With max_rows, at
+    most that many rows are fetched and a cut-off result has data.attrs["truncated_at"] set.
+    """
+    original = query
+    query = with_execution_timeout(query, timeout_ms)
+    query, capped = with_row_cap(query, max_rows)
+    try:
+        if conn is not None:
+            data = _fetch_frame(conn, query, params, decimals)
+        else:
+            with get_read_engine().connect() as conn:
+                data = _fetch_frame(conn, query, params, decimals)
+    except Exception as e:
+        if is_timeout(e):
+            raise QueryTimeoutError(f"Query exceeded {timeout_ms} ms and was stopped: {original.strip()[:200]}") from e
+        raise
+    if capped:
+        data = cap_rows(data, max_rows, original)
+    data.attrs["memory_bytes"] = memory_bytes(data)
+    record_frame(query, data.attrs["memory_bytes"])
+    return data
+
+def _session_pinned():
+    # A session that just wrote reads the primary; the shared cache may hold pre-write replica data
+    return bool(router.replicas) and router.is_pinned()
+
+def _may_cache(tables, pinned):
+    """
+    Whether a freshly read result may be cached. A replica read shortly after a write to one of
+    its tables can predate that write, and caching it would serve pre-write data for the whole
+    TTL, including to the writing session once its read-your-writes window ends.
+    """
+    return pinned or not router.replicas or not result_cache.invalidated_within(tables, READ_YOUR_WRITES_SECONDS)
+
+def cached_read_sql(query, params=None, ttl=RESULT_CACHE_TTL, max_rows=QUERY_MAX_ROWS):
+    """
+    read_sql through the result cache. The result is reused until the TTL runs out or a write
+    touches one of the tables the query reads; callers get a copy they are free to modify.
+    Sessions pinned to the primary after a write bypass cached results.
+    """
+    pinned = _session_pinned()
+    data = None if pinned else result_cache.get(query, params)
+    if data is None:
+        tables = result_cache.tables_read(query)
+        seen = result_cache.generation(tables)
+        data = read_sql(query, params, max_rows=max_rows)
+        if _may_cache(tables, pinned):
+            result_cache.put(query, params, data, ttl=ttl, tables=tables, seen_generation=seen)
+    elif "truncated_at" in data.attrs:
+        report_truncation(data.attrs["truncated_at"], query)
+    return data.copy()
+
+@contextmanager
+def snapshot_read(read_engine=None):
+    """
+    Yields one pooled connection inside a REPEATABLE READ, read-only transaction started WITH
+    CONSISTENT SNAPSHOT: every read_sql(..., conn=conn) in the block sees the database as of the
+    same instant, and the group costs a single checkout.
+    """
+    with (read_engine or get_read_engine()).connect() as conn:
+        conn.exec_driver_sql("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        conn.exec_driver_sql("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+
+def cached_group(queries, load, cached=True, ttl=RESULT_CACHE_TTL):
+    """
+    Returns {name: DataFrame} for {name: query or (query, params)}, calling load(queries) on a
+    cache miss. With cached, the group is cached as a single entry so its frames always stay
+    consistent with each other.
+    """
+    queries = {name: query if isinstance(query, tuple) else (query, None) for name, query in queries.items()}
+    cache_key = "\n;\n".join(f"-- {name}\n{query}" for name, (query, _) in queries.items())
+    cache_params = {name: params for name, (_, params) in queries.items() if params}
+    tables = set().union(*(result_cache.tables_read(query) for query, _ in queries.values()))
+    pinned = _session_pinned()
+    results = result_cache.get(cache_key, cache_params) if cached and not pinned else None
+    if results is None:
+        seen = result_cache.generation(tables)
+        results = load(queries)
+        if cached and _may_cache(tables, pinned):
+            result_cache.put(cache_key, cache_params, results, ttl=ttl, tables=tables, seen_generation=seen)
+    else:
+        for data in results.values():
+            if "truncated_at" in data.attrs:
+                report_truncation(data.attrs["truncated_at"])
+    return {name: data.copy() for name, data in results.items()}
+
+def read_snapshot(queries, cached=True, ttl=RESULT_CACHE_TTL, max_rows=QUERY_MAX_ROWS):
+    """
+    Runs {name: query or (query, params)} in one snapshot_read() and returns {name: DataFrame},
+    cached as one entry (cached_group).
+    """
+    def load(queries):
+        with snapshot_read() as conn:
+            return {name: read_sql(query, params, conn=conn, max_rows=max_rows)
+                    for name, (query, params) in queries.items()}
+    return cached_group(queries, load, cached=cached, ttl=ttl)
+
+def quote_identifier(name):
+    # Backtick-quote table/column names; `transaction` is a reserved word in MySQL
+    return "`" + str(name).replace("`", "``") + "`"
+
+class StaleWriteError(Exception):
+    """Raised when a guarded write matches fewer rows than expected."""
 
-# Initialize database connection
-engine = create_engine(DATABASE_URI)
 
 def execute_sql(query, params=None):
+    # Returns the number of matched rows (SQLAlchemy sets CLIENT_FOUND_ROWS for MySQL)
     try:
         with engine.connect() as conn:
             if params:
-                conn.execute(text(query), params)
+                result = conn.execute(text(query), params)
             else:
-                conn.execute(text(query))
+                result = conn.execute(text(query))
             conn.commit()
+            note_write()
+            return result.rowcount
     except Exception as e:
         raise e
+
+def execute_batch(statements, expect_rows=False):
+    # statements: [(query, [params, ...]), ...]; all run in one transaction, one
+    # executemany per entry. Returns the affected row count of each entry.
+    # With expect_rows, an entry matching fewer rows than it has parameter sets
+    # raises StaleWriteError and rolls the whole batch back.
+    counts = []
+    with engine.begin() as conn:
+        for query, param_sets in statements:
+            param_sets = list(param_sets)
+            result = conn.execute(text(query), param_sets)
+            if expect_rows and result.rowcount < len(param_sets):
+                raise StaleWriteError(
+                    f"{len(param_sets) - result.rowcount} of {len(param_sets)} rows no longer match: {query}"
+                )
+            counts.append(result.rowcount)
+    note_write()
+    return counts
+
+# INSERT/REPLACE ... VALUES (<one row>) [ON DUPLICATE KEY UPDATE ...]
+_INSERT_VALUES = re.compile(r"^(\s*(?:INSERT|REPLACE)\b.*?\bVALUES\s*)(\(.*?\))(\s*(?:ON\s+DUPLICATE\s+KEY\s+UPDATE\b.*)?)$",
+                            re.IGNORECASE | re.DOTALL)
+_BIND_PARAM = re.compile(r"(?<![:\w]):(\w+)")
+MAX_PLACEHOLDERS = 65535  # MySQL's limit per prepared statement
+
+def multi_row_insert(query, param_sets):
+    """
+    Rewrites a single-row INSERT ... VALUES (:a, :b) into one statement inserting every
+    parameter set, e.g. VALUES (:a_r0, :b_r0), (:a_r1, :b_r1). Returns (query, params), or
+    None when the statement can't be rewritten (not an INSERT, or parameters outside VALUES).
+    """
+    match = _INSERT_VALUES.match(query)
+    if match is None or _BIND_PARAM.search(match.group(3)):
+        return None
+    head, row, tail = match.groups()
+    names = _BIND_PARAM.findall(row)
+    rows, params = [], {}
+    for index, param_set in enumerate(param_sets):
+        rows.append(_BIND_PARAM.sub(lambda m: f":{m.group(1)}_r{index}", row))
+        params.update({f"{name}_r{index}": param_set[name] for name in names})
+    return head + ", ".join(rows) + tail, params
+
+def execute_many(query, param_sets, chunk_size=EXECUTE_MANY_CHUNK_SIZE, transaction="chunk",
+                 rewrite_inserts=True):
+    """
+    Executes one statement for every parameter set in a list or iterator, chunk_size sets per
+    round-trip. Single-row INSERTs are rewritten into multi-row VALUES statements; anything
+    else uses the driver's executemany.
+
+    transaction="chunk" commits after each chunk, so a failure keeps the chunks before it;
+    transaction="call" runs every chunk in one transaction that is rolled back on failure.
+
+    Returns one dict per chunk: {"chunk", "rows" (parameter sets), "affected", "seconds"}.
+    """
+    if transaction not in ("chunk", "call"):
+        raise ValueError(f"transaction must be 'chunk' or 'call', not {transaction!r}")
+    param_sets = iter(param_sets)
+    first = next(param_sets, None)
+    if first is None:
+        return []
+    param_sets = itertools.chain([first], param_sets)
+    rewrite = rewrite_inserts and multi_row_insert(query, [first]) is not None
+    if rewrite and first:
+        chunk_size = max(1, min(chunk_size, MAX_PLACEHOLDERS // len(first)))
+
+    def run_chunk(conn, index, chunk):
+        started = time.perf_counter()
+        if rewrite:
+            rewritten, params = multi_row_insert(query, chunk)
+            result = conn.execute(text(rewritten), params)
+        else:
+            result = conn.execute(text(query), chunk)
+        return {"chunk": index, "rows": len(chunk), "affected": result.rowcount,
+                "seconds": time.perf_counter() - started}
+
+    chunks = iter(lambda: list(itertools.islice(param_sets, chunk_size)), [])
+    report = []
+    try:
+        if transaction == "call":
+            with engine.begin() as conn:
+                for index, chunk in enumerate(chunks):
+                    report.append(run_chunk(conn, index, chunk))
+        else:
+            for index, chunk in enumerate(chunks):
+                with engine.begin() as conn:
+                    report.append(run_chunk(conn, index, chunk))
+    finally:
+        if report:
+            note_write()
+    return report
@@ -0,0 +1,136 @@
+import pandas as pd
+import streamlit as st
+from config import (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+                    SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_PATH, RESULT_CACHE_TTL, SHARED_CACHE_DIR,
+                    INDEX_ADVISOR_MIN_ROWS)
+from pool_metrics import all_pool_metrics
+from database import router
+from query_stats import query_stats, reset_query_stats
+import index_advisor
+import rollups
+from guardrails import run_cancellable
+from sqlalchemy.exc import SQLAlchemyError
+import result_cache
+import shared_cache
+
+# diagnostics.py
+
+def display_pool_metrics():
+    st.subheader("Connection Pool")
+    st.caption(f"pool_size={DB_POOL_SIZE}, max_overflow={DB_MAX_OVERFLOW}, timeout={DB_POOL_TIMEOUT}s, "
+               f"recycle={DB_POOL_RECYCLE}s, pre_ping={DB_POOL_PRE_PING}")
+    metrics = all_pool_metrics()
+    if not metrics:
+        st.info("No engines have been created yet.")
+        return
+    data = pd.DataFrame(metrics).set_index("engine")
+    primary = metrics[0]
+    in_use_col, overflow_col, wait_col, churn_col = st.columns(4)
+    in_use_col.metric("In use", f"{primary['checked_out']} / {primary['pool_size']}")
+    overflow_col.metric("Overflow", primary["overflow"])
+    wait_col.metric("Checkout wait p95", f"{primary['wait_p95_ms']:.1f} ms")
+    churn_col.metric("Churn", f"{primary['churn_per_minute']:.1f} conn/min")
+    st.dataframe(data.round(2))
+    if primary["checkout_timeouts"]:
+        st.warning(f"{primary['checkout_timeouts']} checkouts timed out; consider raising DB_POOL_SIZE or DB_MAX_OVERFLOW.")
+
+def display_query_stats():
+    st.subheader("Query Timings")
+    st.caption(f"Queries slower than {SLOW_QUERY_THRESHOLD_MS} ms are logged to {SLOW_QUERY_LOG_PATH}.")
+    stats = query_stats()
+    if not stats:
+        st.info("No queries recorded yet.")
+        return
+    st.dataframe(pd.DataFrame(stats).round(2))
+    if st.button("Reset query timings"):
+        reset_query_stats()
+
+def display_result_cache():
+    st.subheader("Result Cache")
+    stats = result_cache.cache_stats()
+    st.caption(f"ttl={RESULT_CACHE_TTL}s, max size={stats['max_bytes'] / 2**20:.0f} MiB")
+    hits_col, misses_col, rate_col, size_col = st.columns(4)
+    hits_col.metric("Hits", stats["hits"])
+    misses_col.metric("Misses", stats["misses"])
+    rate_col.metric("Hit rate", f"{stats['hit_rate']:.0%}")
+    size_col.metric("Cached", f"{stats['entries']} / {stats['bytes'] / 2**20:.1f} MiB")
+    st.caption(f"{stats['evictions']} evicted, {stats['expirations']} expired, "
+               f"{stats['invalidations']} invalidated by writes")
+    if shared_cache.enabled():
+        try:
+            shared = shared_cache.cache_stats()
+        except Exception as e:
+            st.warning(f"Shared cache at {SHARED_CACHE_DIR} is unavailable: {e}")
+        else:
+            st.caption(f"Shared tier ({shared['directory']}): {stats['shared_hits']} hits, {shared['entries']} entries, "
+                       f"{shared['bytes'] / 2**20:.1f} / {shared['max_bytes'] / 2**20:.0f} MiB")
+    if st.button("Clear result cache"):
+        result_cache.invalidate()
+
+def display_routing_status():
+    st.subheader("Read Routing")
+    if not router.replicas:
+        st.caption("No replicas configured (REPLICA_URIS); all reads use the primary.")
+    else:
+        st.caption(f"selection={router.selection}, max lag={router.max_lag_seconds}s, "
+                   f"read-your-writes window={router.read_your_writes_seconds}s")
+    st.dataframe(pd.DataFrame(router.status()).set_index("engine"))
+
+def display_rollups():
+    st.subheader("Transaction Rollups")
+    try:
+        edits = rollups.stale_edits()
+    except SQLAlchemyError as e:
+        st.warning(f"Rollup tables are unavailable; charts aggregate the transaction table: {e}")
+        return
+    if edits:
+        st.warning(f"{edits} edit(s) or delete(s) of transactions since the last rebuild; the Transaction Volume "
+                   "chart aggregates the transaction table until the rollups are rebuilt.")
+    else:
+        st.caption("Rollups are current; new transactions are folded in as charts load.")
+    if st.button("Rebuild rollups"):
+        high = run_cancellable(rollups.rebuild_rollups, label="Rebuilding rollups")
+        st.success(f"Rebuilt rollups up to TranID {high}.")
+
+def display_index_advisor():
+    st.subheader("Index Advisor")
+    st.caption(f"EXPLAINs every dashboard query; flags full scans of {INDEX_ADVISOR_MIN_ROWS}+ rows, "
+               "filesorts and temporary tables.")
+    if st.button("Explain dashboard queries"):
+        try:
+            st.session_state["index_advice"] = index_advisor.analyze()
+        except Exception as e:
+            st.error(f"Error running the index advisor: {e}")
+    advice = st.session_state.get("index_advice")
+    if not advice:
+        return
+    findings, proposals = advice
+    st.dataframe(pd.DataFrame([{"Query": finding["query"], "Issues": "; ".join(finding["issues"]) or "ok"}
+                               for finding in findings]).set_index("Query"))
+    with st.expander("Query plans"):
+        for finding in findings:
+            if finding["plan"]:
+                st.text(finding["query"])
+                st.dataframe(pd.DataFrame(finding["plan"]))
+    if not proposals:
+        st.success("No indexes to propose.")
+    for proposal in proposals:
+        st.code(proposal["statement"], language="sql")
+        st.caption(f"For: {', '.join(proposal['queries'])}")
+        if st.button("Create index", key=f"create_{index_advisor.index_name(proposal['table'], proposal['columns'])}"):
+            try:
+                index_advisor.apply_index(proposal)
+                st.success(f"Created {index_advisor.index_name(proposal['table'], proposal['columns'])}.")
+                del st.session_state["index_advice"]  # plans are stale now
+            except Exception as e:
+                st.error(f"Error creating index: {e}")
+
+def display_diagnostics():
+    st.header("Diagnostics")
+    st.button("Refresh")  # any click reruns the page with fresh numbers
+    display_pool_metrics()
+    display_routing_status()
+    display_result_cache()
+    display_query_stats()
+    display_rollups()
+    display_index_advisor()
@@ -0,0 +1,196 @@
+import csv
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+import streamlit as st
+from sqlalchemy import text
+from config import EXPORT_DIR, EXPORT_BATCH_SIZE, EXPORT_DOWNLOAD_MAX_BYTES
+from database import get_read_engine, quote_identifier
+from schema import get_table
+
+# export.py
+#
+# Streams tables and query results to CSV, JSON Lines or Parquet. Rows come from a server-side
+# cursor (stream_results) in fixed-size partitions and each partition is written out before the
+# next is fetched, so memory use depends on the batch size, not on the table size.
+
+EXPORT_FORMATS = {"CSV": "csv", "JSON Lines": "jsonl", "Parquet": "parquet"}
+
+
+def stream_query(query, params=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yields (column_names, rows) partitions of at most batch_size rows from a server-side cursor."""
+    with get_read_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=batch_size).execute(
+            text(query), params or {}
+        )
+        columns = list(result.keys())
+        empty = True
+        for partition in result.partitions(batch_size):
+            empty = False
+            yield columns, partition
+        if empty:
+            # Still hand the column names to writers so they can emit headers/schemas
+            yield columns, []
+
+
+def _json_default(value):
+    # Decimal, date, datetime and timedelta values from the driver
+    return str(value)
+
+
+class _CsvWriter:
+    def __init__(self, path, columns):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, columns, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _JsonLinesWriter:
+    def __init__(self, path, columns):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, columns, rows):
+        self.file.writelines(
+            json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows
+        )
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    # One Parquet row group per streamed partition
+    def __init__(self, path, columns, arrow_schema=None):
+        self.path = path
+        self.schema = arrow_schema
+        self.writer = None
+        self.text_columns = set()
+
+    def write(self, columns, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        data = {name: [row[i] for row in rows] for i, name in enumerate(columns)}
+        if self.schema is None:
+            table = pa.Table.from_pydict(data)
+            # Columns that are all NULL in the first batch would otherwise be typed as null forever
+            self.text_columns = {field.name for field in table.schema if pa.types.is_null(field.type)}
+            self.schema = pa.schema([
+                field.with_type(pa.string()) if field.name in self.text_columns else field
+                for field in table.schema
+            ])
+        for name in self.text_columns:
+            # ... so their later values are written as text, like the JSON Lines export does
+            data[name] = [None if value is None else _json_default(value) for value in data[name]]
+        table = pa.Table.from_pydict(data, schema=self.schema)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def arrow_schema_for_table(table_name):
+    """Builds a pyarrow schema from the reflected column types, so every row group agrees."""
+    import pyarrow as pa
+    fields = []
+    for column in get_table(table_name).columns:
+        data_type = column.data_type
+        if data_type in ("tinyint", "smallint", "mediumint", "int", "integer", "bigint", "year"):
+            arrow_type = pa.int64()
+        elif data_type in ("decimal", "numeric"):
+            match = re.search(r"\((\d+),\s*(\d+)\)", column.column_type)
+            precision, scale = (int(match.group(1)), int(match.group(2))) if match else (38, 10)
+            arrow_type = pa.decimal128(precision, scale)
+        elif data_type in ("float", "double", "real"):
+            arrow_type = pa.float64()
+        elif data_type == "date":
+            arrow_type = pa.date32()
+        elif data_type in ("datetime", "timestamp"):
+            arrow_type = pa.timestamp("us")
+        elif data_type == "time":
+            arrow_type = pa.duration("us")  # PyMySQL returns TIME as timedelta
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type, nullable=column.nullable))
+    return pa.schema(fields)
+
+
+def export_query(query, path, file_format, params=None, batch_size=EXPORT_BATCH_SIZE,
+                 arrow_schema=None, on_batch=None):
+    """
+    Streams a query's result into path as csv, jsonl or parquet.
+
+    on_batch, if given, is called with the running row count after each partition is written.
+    Returns a report dict {rows, batches, bytes, seconds, path}.
+    """
+    started = time.perf_counter()
+    writer = None
+    rows_written = batches = 0
+    try:
+        for columns, rows in stream_query(query, params, batch_size):
+            if writer is None:
+                if file_format == "csv":
+                    writer = _CsvWriter(path, columns)
+                elif file_format == "jsonl":
+                    writer = _JsonLinesWriter(path, columns)
+                elif file_format == "parquet":
+                    writer = _ParquetWriter(path, columns, arrow_schema)
+                else:
+                    raise ValueError(f"Unsupported export format: {file_format}")
+            writer.write(columns, rows)
+            rows_written += len(rows)
+            batches += 1
+            if on_batch:
+                on_batch(rows_written)
+    finally:
+        if writer is not None:
+            writer.close()
+    return {"rows": rows_written, "batches": batches, "path": path,
+            "bytes": os.path.getsize(path), "seconds": time.perf_counter() - started}
+
+
+def export_table(table_name, path, file_format, batch_size=EXPORT_BATCH_SIZE, on_batch=None):
+    arrow_schema = arrow_schema_for_table(table_name) if file_format == "parquet" else None
+    query = f"SELECT * FROM {quote_identifier(table_name)}"
+    return export_query(query, path, file_format, batch_size=batch_size,
+                        arrow_schema=arrow_schema, on_batch=on_batch)
+
+
+def display_export_panel(table_name):
+    st.subheader("Export")
+    format_label = st.selectbox("Format:", list(EXPORT_FORMATS), key=f"export_format_{table_name}")
+    if not st.button("Export table", key=f"export_button_{table_name}"):
+        return
+
+    file_format = EXPORT_FORMATS[format_label]
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    file_name = f"{table_name}_{datetime.now():%Y%m%d_%H%M%S}.{file_format}"
+    path = os.path.join(EXPORT_DIR, file_name)
+    status = st.empty()
+    try:
+        report = export_table(table_name, path, file_format,
+                              on_batch=lambda rows: status.text(f"{rows:,} rows written..."))
+    except Exception as e:
+        st.error(f"Export failed: {e}")
+        return
+
+    rate = report["rows"] / max(report["seconds"], 1e-9)
+    status.empty()
+    st.success(f"Exported {report['rows']:,} rows ({report['bytes'] / 1e6:,.1f} MB) to {path} "
+               f"in {report['seconds']:.1f}s ({rate:,.0f} rows/sec).")
+    if report["bytes"] <= EXPORT_DOWNLOAD_MAX_BYTES:
+        with open(path, "rb") as export_file:
+            st.download_button("Download", export_file, file_name=file_name, key=f"export_download_{table_name}")
+    else:
+        st.info("The file is too large to download through the browser; fetch it from the server path above.")
@@ -0,0 +1,49 @@
+import pandas as pd
+from config import CATEGORY_COLUMNS, CATEGORY_MAX_RATIO
+
+# frames.py
+#
+# Builds compact DataFrames straight from DB-API rows. The MySQL type code of each column
+# (cursor.description) decides the dtype: DECIMAL becomes float64, DATE and DATETIME
+# become datetime64, and low-cardinality text columns named in CATEGORY_COLUMNS become
+# categoricals, instead of object columns of Decimal/date/str values. Editing paths (the CRUD
+# grid) use decimals="exact", which keeps DECIMAL as Decimal and DATE/DATETIME as the driver's
+# date/datetime objects so values display and bind back exactly.
+
+# MySQL protocol type codes (pymysql.constants.FIELD_TYPE)
+DECIMAL_TYPES = {0, 246}  # DECIMAL, NEWDECIMAL
+DATE_TYPES = {7, 10, 12, 14}  # TIMESTAMP, DATE, DATETIME, NEWDATE
+TEXT_TYPES = {15, 247, 253, 254}  # VARCHAR, ENUM, VAR_STRING, STRING
+
+
+def _is_low_cardinality(values):
+    non_null = values.dropna()
+    return len(non_null) > 0 and non_null.nunique() <= max(1, CATEGORY_MAX_RATIO * len(non_null))
+
+
+def compact_frame(rows, columns, description=None, decimals="float"):
+    """
+    DataFrame from fetched rows using the cursor description's type codes.
+    decimals="exact" leaves DECIMAL and date columns as Decimal/date objects; the default
+    converts them to float64 and datetime64.
+    """
+    data = pd.DataFrame.from_records(rows, columns=columns, coerce_float=False)
+    for index, column in enumerate(columns):
+        type_code = description[index][1] if description else None
+        values = data.iloc[:, index]
+        if decimals == "exact" and type_code in DECIMAL_TYPES | DATE_TYPES:
+            continue
+        if type_code in DECIMAL_TYPES:
+            values = values.astype("float64")
+        elif type_code in DATE_TYPES:
+            values = pd.to_datetime(values, errors="coerce")
+        elif type_code in TEXT_TYPES and column in CATEGORY_COLUMNS and _is_low_cardinality(values):
+            values = values.astype("category")
+        else:
+            continue
+        data[column] = values
+    return data
+
+
+def memory_bytes(data):
+    return int(data.memory_usage(deep=True).sum())
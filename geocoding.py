@@ -1,20 +1,19 @@
-import pandas as pd
 import pydeck as pdk
 import streamlit as st
 from geopy.geocoders import Nominatim
 from geopy.extra.rate_limiter import RateLimiter
-from database import engine
+from database import cached_read_sql
 
 # geocoding.py
 
-def get_branch_locations():
-    query = """
+BRANCH_LOCATIONS_QUERY = """
     SELECT ba.BranchID, b.Name as BranchName, ba.Street, ba.City, ba.State, ba.ZipCode, ba.Country
     FROM branchaddress ba
     JOIN branch b ON ba.BranchID = b.BranchID
     """
-    with engine.connect() as conn:
-        data = pd.read_sql(query, conn)
+
+def get_branch_locations():
+    data = cached_read_sql(BRANCH_LOCATIONS_QUERY)
     return data
 
 def geocode_addresses(addresses_df):
@@ -33,8 +32,9 @@ def geocode_addresses(addresses_df):
     addresses_df = addresses_df.drop(columns=['Location'])
     return addresses_df
 
-def plot_branch_locations():
-    addresses_df = get_branch_locations()
+def plot_branch_locations(addresses_df=None):
+    # addresses_df: rows of BRANCH_LOCATIONS_QUERY when the caller already loaded them
+    addresses_df = get_branch_locations() if addresses_df is None else addresses_df.copy()
     addresses_df = geocode_addresses(addresses_df)
     if addresses_df.empty:
         st.warning("No branch locations available to display.")
@@ -0,0 +1,196 @@
+import contextvars
+import itertools
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+from config import QUERY_MAX_WORKERS
+from routing import bind_session, script_run_context
+
+# guardrails.py
+#
+# Limits for interactive reads: a server-side execution timeout (MySQL's MAX_EXECUTION_TIME
+# optimizer hint), a hard row cap that marks the result as truncated, and cancellation of
+# in-flight queries with KILL QUERY when the user presses Cancel or Streamlit's Stop.
+
+_MAX_EXECUTION_TIME_EXCEEDED = 3024  # MySQL ER_QUERY_TIMEOUT
+_LEADING_SELECT = re.compile(r"^(\s*SELECT)\b(?!\s*/\*\+)", re.IGNORECASE)
+_TRAILING_LIMIT = re.compile(r"\bLIMIT\s+(?:\d+|:\w+)(?:\s*(?:,|OFFSET)\s*(?:\d+|:\w+))?\s*;?\s*$", re.IGNORECASE)
+_CANCELLED_KEY = "guardrails_cancelled"
+_FINISHED_KEY = "guardrails_finished"  # Cancel buttons whose query completed before the click landed
+_button_ids = itertools.count()
+
+_executor = ThreadPoolExecutor(max_workers=QUERY_MAX_WORKERS, thread_name_prefix="guarded")
+# The cancel scope of the current run_cancellable() call; queries executed inside it register here
+_scope = contextvars.ContextVar("guardrails_scope", default=None)
+
+
+class QueryTimeoutError(TimeoutError):
+    """Raised when a query runs longer than its timeout."""
+
+
+class QueryCancelledError(Exception):
+    """Raised when the user cancels a running query."""
+
+
+def with_execution_timeout(query, timeout_ms):
+    """Adds a MAX_EXECUTION_TIME hint to a SELECT; other statements are returned unchanged."""
+    if not timeout_ms:
+        return query
+    return _LEADING_SELECT.sub(lambda match: f"{match.group(1)} /*+ MAX_EXECUTION_TIME({int(timeout_ms)}) */",
+                               query, count=1)
+
+
+def with_row_cap(query, max_rows):
+    """
+    Appends LIMIT max_rows + 1 to a query without a trailing LIMIT, so truncation can be detected.
+    Returns the query and whether the cap was applied.
+    """
+    if not max_rows or _TRAILING_LIMIT.search(query):
+        return query, False
+    return f"{query.rstrip().rstrip(';')} LIMIT {int(max_rows) + 1}", True
+
+
+def cap_rows(data, max_rows, query=""):
+    """
+    Trims a result fetched with with_row_cap() and flags it via data.attrs['truncated_at'];
+    inside run_cancellable() the truncation is also reported to the user.
+    """
+    if max_rows and len(data) > max_rows:
+        data = data.iloc[:max_rows]
+        data.attrs["truncated_at"] = max_rows
+        report_truncation(max_rows, query)
+    return data
+
+
+def report_truncation(max_rows, query=""):
+    """Queues a truncation warning for the enclosing run_cancellable() call, if any."""
+    scope = _scope.get()
+    if scope is not None:
+        with scope.lock:
+            scope.truncated.append((max_rows, query))
+
+
+def is_timeout(error):
+    return isinstance(error, OperationalError) and getattr(error.orig, "args", (None,))[0] == _MAX_EXECUTION_TIME_EXCEEDED
+
+
+class CancelScope:
+    """The MySQL connection ids of the queries currently running on behalf of one call."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = {}  # id(cursor) -> (engine, connection id)
+        self.truncated = []  # (row cap, query) of results cut short by cap_rows()
+
+    def kill(self):
+        with self.lock:
+            running = list(self.running.values())
+        for engine, connection_id in running:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text(f"KILL QUERY {int(connection_id)}"))
+            except Exception:
+                pass  # the query finished (or the connection died) in the meantime
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    scope = _scope.get()
+    thread_id = getattr(getattr(cursor, "connection", None), "thread_id", None)
+    if scope is not None and thread_id is not None:
+        with scope.lock:
+            scope.running[id(cursor)] = (conn.engine, thread_id())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    scope = _scope.get()
+    if scope is not None:
+        with scope.lock:
+            scope.running.pop(id(cursor), None)
+
+
+def _handle_error(exception_context):
+    scope = _scope.get()
+    if scope is not None and exception_context.cursor is not None:
+        with scope.lock:
+            scope.running.pop(id(exception_context.cursor), None)
+
+
+def instrument_cancellation(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def warn_truncated(label, max_rows):
+    import streamlit as st
+    st.warning(f"{label}: showing only the first {max_rows:,} rows; narrow the query to see the rest.")
+
+
+def request_cancel(button_key):
+    """Button callback: cancels the query running in this session on the next rerun."""
+    import streamlit as st
+    st.session_state[_CANCELLED_KEY] = button_key
+
+
+def _pending_cancel(session_state):
+    """Consumes a Cancel click; False when the query it targeted had already finished."""
+    button_key = session_state.pop(_CANCELLED_KEY, None)
+    if button_key is None:
+        return False
+    finished = session_state.get(_FINISHED_KEY, ())
+    return button_key not in finished
+
+
+def run_cancellable(function, *args, label="Running query", poll_interval=0.25, **kwargs):
+    """
+    Runs function on a worker thread while the Streamlit script thread waits with a Cancel
+    button. Pressing Cancel (or Stop) interrupts the wait at the next poll, and every query
+    the function still has running is killed with KILL QUERY. Row-capped results are reported
+    with a warning. Outside Streamlit the function simply runs.
+    """
+    if script_run_context() is None:
+        return function(*args, **kwargs)
+    import streamlit as st
+    if _pending_cancel(st.session_state):
+        raise QueryCancelledError(f"{label} was cancelled.")
+
+    scope = CancelScope()
+
+    def call():
+        _scope.set(scope)
+        return function(*args, **kwargs)
+    context = contextvars.copy_context()
+    future = _executor.submit(context.run, bind_session(call))
+    controls = st.empty()
+    elapsed = None
+    button_key = None
+    started = time.monotonic()
+    try:
+        while True:
+            try:
+                result = future.result(timeout=poll_interval)
+            except FutureTimeoutError:
+                if elapsed is None:  # only slow queries get a Cancel button
+                    button_key = f"cancel_query_{next(_button_ids)}"
+                    with controls.container():
+                        st.button("Cancel", key=button_key, on_click=request_cancel, args=(button_key,))
+                        elapsed = st.empty()
+                # Any Streamlit call is where a pending Stop/rerun interrupts this script run
+                elapsed.caption(f"{label}… {time.monotonic() - started:.0f}s")
+                continue
+            for max_rows, _ in scope.truncated:
+                warn_truncated(label, max_rows)
+            return result
+    finally:
+        controls.empty()
+        if not future.done():
+            scope.kill()
+        elif button_key is not None:
+            # A click on this button that arrives now must not cancel the next, unrelated load
+            finished = st.session_state.setdefault(_FINISHED_KEY, [])
+            finished.append(button_key)
+            del finished[:-50]
@@ -0,0 +1,149 @@
+import argparse
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from config import INDEX_ADVISOR_MIN_ROWS
+from database import engine, execute_sql, quote_identifier
+from visualizations import CHART_QUERIES, DATE_RANGE_COLUMNS, TRANSACTION_VOLUME_DIRECT_QUERY, apply_date_range
+
+# index_advisor.py
+#
+# Runs EXPLAIN on every dashboard query and flags plans that read a whole large table
+# (type=ALL) or sort/group through a filesort or temporary table. For flagged queries it
+# proposes the secondary indexes below, skipping any already covered by an existing index
+# with the same leading columns, and can create them:  python index_advisor.py [--apply]
+
+# Query name -> indexes that let it range-scan or read a covering index in group order
+INDEX_SUGGESTIONS = {
+    "account_types": [("bankaccount", ("Type",))],
+    "customer_ages": [("customer", ("DateOfBirth",))],
+    "balance_distribution": [("bankaccount", ("Balance",))],
+    "loan_amount_distribution": [("loan", ("Amount",))],
+    "customer_growth": [("bankaccount", ("SetupDate", "CustomerID"))],
+    "branch_assets": [("bankaccount", ("BranchID", "Balance"))],
+    "loan_types": [("loan", ("Type", "Amount"))],
+    "loan_status": [("loan", ("Status",))],
+    "transaction_volume_direct": [("transaction", ("Date",))],
+    "variable_returns": [("variablerateinvestment", ("StartDate", "ReturnRate"))],
+    "fixed_returns": [("fixedrateinvestment", ("StartDate", "InterestRate"))],
+}
+
+
+def dashboard_queries():
+    """
+    {name: (query, params)}: every chart query, the direct transaction volume aggregate, and
+    each time-series query limited to the last year as the date filter would issue it.
+    """
+    queries = {name: (query, None) for name, query in CHART_QUERIES.items()}
+    queries["transaction_volume_direct"] = (TRANSACTION_VOLUME_DIRECT_QUERY, None)
+    last_year = (date.today() - timedelta(days=365), date.today())
+    for name in DATE_RANGE_COLUMNS:
+        query = queries[name][0]
+        queries[f"{name} (date range)"] = apply_date_range(name, query, last_year)
+    return queries
+
+
+def _base_name(name):
+    return name.split(" (")[0]
+
+
+def explain(query, params=None):
+    """The EXPLAIN rows of a query as dicts (id, select_type, table, type, key, rows, Extra, ...)."""
+    with engine.connect() as conn:
+        result = conn.execute(text(f"EXPLAIN {query}"), params or {})
+        return [dict(row) for row in result.mappings()]
+
+
+def plan_issues(plan, min_rows=INDEX_ADVISOR_MIN_ROWS):
+    issues = []
+    for row in plan:
+        table = row.get("table")
+        extra = row.get("Extra") or ""
+        if row.get("type") == "ALL" and (row.get("rows") or 0) >= min_rows:
+            issues.append(f"full scan of {table} (~{row.get('rows')} rows)")
+        if "Using filesort" in extra:
+            issues.append(f"filesort on {table}")
+        if "Using temporary" in extra:
+            issues.append(f"temporary table on {table}")
+    return issues
+
+
+def existing_indexes():
+    """{table: [column tuples]} for every index in the current schema."""
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX")).fetchall()
+    indexes = {}
+    for table, index, column in rows:
+        indexes.setdefault((table.lower(), index), []).append(column.lower())
+    tables = {}
+    for (table, _), columns in indexes.items():
+        tables.setdefault(table, []).append(tuple(columns))
+    return tables
+
+
+def is_covered(table, columns, indexes):
+    wanted = tuple(column.lower() for column in columns)
+    return any(index[:len(wanted)] == wanted for index in indexes.get(table.lower(), []))
+
+
+def index_name(table, columns):
+    return f"ix_{table}_{'_'.join(columns)}".lower()[:64]
+
+
+def create_index_statement(table, columns):
+    # Online DDL: reads and writes continue while the index builds
+    column_list = ", ".join(quote_identifier(column) for column in columns)
+    return (f"CREATE INDEX {quote_identifier(index_name(table, columns))} ON {quote_identifier(table)} "
+            f"({column_list}) ALGORITHM=INPLACE LOCK=NONE")
+
+
+def analyze():
+    """
+    Returns (findings, proposals): one finding per query with its plan and issues, and the
+    indexes suggested for flagged queries that no existing index covers yet.
+    """
+    indexes = existing_indexes()
+    findings, proposals = [], {}
+    for name, (query, params) in dashboard_queries().items():
+        try:
+            plan = explain(query, params)
+        except Exception as e:
+            findings.append({"query": name, "plan": [], "issues": [f"EXPLAIN failed: {e}"]})
+            continue
+        issues = plan_issues(plan)
+        findings.append({"query": name, "plan": plan, "issues": issues})
+        if not issues:
+            continue
+        for table, columns in INDEX_SUGGESTIONS.get(_base_name(name), []):
+            if not is_covered(table, columns, indexes):
+                proposal = proposals.setdefault((table, columns), {
+                    "table": table, "columns": columns, "statement": create_index_statement(table, columns),
+                    "queries": []})
+                proposal["queries"].append(name)
+    return findings, list(proposals.values())
+
+
+def apply_index(proposal):
+    execute_sql(proposal["statement"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN the dashboard queries and propose secondary indexes.")
+    parser.add_argument("--apply", action="store_true", help="create the proposed indexes")
+    args = parser.parse_args()
+    findings, proposals = analyze()
+    for finding in findings:
+        print(f"{finding['query']}: {'; '.join(finding['issues']) or 'ok'}")
+    for proposal in proposals:
+        print(f"\n{proposal['statement']};  -- for {', '.join(proposal['queries'])}")
+        if args.apply:
+            apply_index(proposal)
+            print("created")
+    if not proposals:
+        print("\nNo indexes to propose.")
+
+
+if __name__ == "__main__":
+    main()
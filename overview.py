@@ -0,0 +1,99 @@
+import time
+
+import pandas as pd
+import streamlit as st
+from config import OVERVIEW_LOAD_BUDGET_MS
+from database import read_sql
+from guardrails import run_cancellable
+import result_cache
+from visualizations import (CHART_QUERIES, VISUALIZATIONS, load_chart_frames, render_visualization,
+                            display_snapshot_freshness, get_account_type_distribution, get_customer_ages,
+                            get_customer_growth_over_time,
+                            get_branch_assets, get_balance_distribution, get_loan_distribution_by_type,
+                            get_loan_status_breakdown, get_loan_amount_distribution,
+                            get_transaction_volume_over_time, get_investment_returns, get_investment_portfolio)
+
+# overview.py
+#
+# Every chart on one page. Their queries are loaded as one batch: fetched concurrently
+# (async_queries.py), so the page waits for the slowest query rather than the sum, and cached
+# as one entry. The page reports the batched load time against the sum of loading each chart
+# on its own, as a performance budget.
+
+# Chart -> (get_* function, the CHART_QUERIES it needs)
+CHART_SOURCES = {
+    'Account Types Distribution': (get_account_type_distribution, ["account_types"]),
+    'Age Distribution': (get_customer_ages, ["customer_ages"]),
+    'Customer Growth Over Time': (get_customer_growth_over_time, ["customer_growth"]),
+    'Branch Assets Comparison': (get_branch_assets, ["branch_assets"]),
+    'Account Balance Distribution': (get_balance_distribution, ["balance_distribution"]),
+    'Loan Distribution by Type': (get_loan_distribution_by_type, ["loan_types"]),
+    'Loan Status Breakdown': (get_loan_status_breakdown, ["loan_status"]),
+    'Loan Amount Distribution': (get_loan_amount_distribution, ["loan_amount_distribution"]),
+    'Transaction Volume Over Time': (get_transaction_volume_over_time, ["transaction_volume"]),
+    'Geographical Distribution': (lambda frames: frames["branch_locations"], ["branch_locations"]),
+    'Investment Returns': (get_investment_returns, ["variable_returns", "fixed_returns"]),
+    'Investment Portfolio Composition': (get_investment_portfolio, ["fixed_total", "variable_total"]),
+}
+OVERVIEW_QUERIES = [name for _, names in CHART_SOURCES.values() for name in names]
+
+
+def measure_loads():
+    """
+    Uncached timings: the batched overview load exactly as the page runs it (concurrent
+    fetches), and each chart loaded on its own (its queries one after another on fresh
+    checkouts, then its get_* transform), as on the Visualizations page.
+    """
+    started = time.perf_counter()
+    load_chart_frames(OVERVIEW_QUERIES, cached=False)
+    batched_ms = (time.perf_counter() - started) * 1000
+    individual = {}
+    for chart, (loader, names) in CHART_SOURCES.items():
+        started = time.perf_counter()
+        loader({name: read_sql(CHART_QUERIES[name]) for name in names})
+        individual[chart] = (time.perf_counter() - started) * 1000
+    return batched_ms, individual
+
+
+def display_load_budget(load_ms, from_cache):
+    if st.button("Measure uncached load times"):
+        st.session_state["overview_timings"] = run_cancellable(measure_loads, label="Measuring load times")
+    timings = st.session_state.get("overview_timings")
+    load_col, batched_col, individual_col = st.columns(3)
+    load_col.metric("This load", f"{load_ms:.0f} ms", help="Served from the result cache" if from_cache else None,
+                    delta=f"{load_ms - OVERVIEW_LOAD_BUDGET_MS:+.0f} ms vs budget", delta_color="inverse")
+    if timings:
+        batched_ms, individual = timings
+        total = sum(individual.values())
+        batched_col.metric("Concurrent load (uncached)", f"{batched_ms:.0f} ms",
+                           delta=f"{batched_ms - OVERVIEW_LOAD_BUDGET_MS:+.0f} ms vs budget", delta_color="inverse")
+        individual_col.metric("Sum of individual loads", f"{total:.0f} ms",
+                              delta=f"{total - batched_ms:+.0f} ms vs concurrent", delta_color="off",
+                              help=f"Slowest chart on its own: {max(individual.values()):.0f} ms")
+        with st.expander("Individual load timings"):
+            st.dataframe(pd.DataFrame({"Chart": list(individual), "Load (ms)": list(individual.values())}).round(1))
+
+
+def display_overview():
+    st.header("Overview")
+    st.caption(f"Load budget: {OVERVIEW_LOAD_BUDGET_MS} ms for all charts")
+    hits_before = result_cache.cache_stats()
+    started = time.perf_counter()
+    try:
+        frames = run_cancellable(load_chart_frames, OVERVIEW_QUERIES, label="Loading overview")
+    except Exception as e:
+        st.error(f"Error loading overview data: {e}")
+        return
+    load_ms = (time.perf_counter() - started) * 1000
+    hits_after = result_cache.cache_stats()
+    from_cache = (hits_after["hits"] + hits_after["shared_hits"]) > (hits_before["hits"] + hits_before["shared_hits"])
+    display_load_budget(load_ms, from_cache)
+    display_snapshot_freshness()
+
+    charts = [chart for chart in VISUALIZATIONS if chart != 'Geographical Distribution']
+    columns = st.columns(2)
+    for index, chart in enumerate(charts):
+        with columns[index % 2]:
+            render_visualization(chart, frames)
+    # Geocoding calls an external service per address, so the map renders last, full width
+    render_visualization('Geographical Distribution', frames)
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# pool_metrics.py
+#
+# Connection pool instrumentation: checkout wait times, checked-out/overflow counts and
+# connection churn for every engine built by database.create_database_engine().
+
+WAIT_SAMPLES = 1000
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class PoolMetrics:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.wait_samples = deque(maxlen=WAIT_SAMPLES)  # seconds spent in pool checkout
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.connects = 0  # new DBAPI connections opened
+        self.closes = 0  # DBAPI connections closed (recycled, overflow returned, shut down)
+        self.invalidations = 0  # connections discarded after errors / failed pre-ping
+        self.pool = None
+
+    def record_wait(self, seconds, timed_out=False):
+        with self.lock:
+            self.wait_samples.append(seconds)
+            if timed_out:
+                self.checkout_timeouts += 1
+            else:
+                self.checkouts += 1
+
+    def increment(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self):
+        with self.lock:
+            waits = sorted(self.wait_samples)
+            counters = {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "connects": self.connects,
+                "closes": self.closes,
+                "invalidations": self.invalidations,
+            }
+        uptime = max(time.time() - self.started, 1e-9)
+        pool = self.pool
+        return dict(
+            engine=self.name,
+            pool_size=pool.size() if pool is not None else None,
+            checked_out=pool.checkedout() if pool is not None else None,
+            checked_in=pool.checkedin() if pool is not None else None,
+            overflow=max(pool.overflow(), 0) if pool is not None else None,
+            wait_p50_ms=percentile(waits, 50) * 1000,
+            wait_p95_ms=percentile(waits, 95) * 1000,
+            wait_max_ms=(waits[-1] if waits else 0.0) * 1000,
+            churn_per_minute=(counters["connects"] + counters["closes"]) / uptime * 60,
+            **counters,
+        )
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a connection."""
+
+    metrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # Keep the metrics attached when the pool is rebuilt (engine.dispose())
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = pool
+        return pool
+
+
+def instrument_engine(engine, name):
+    """Attaches PoolMetrics to an engine that uses InstrumentedQueuePool and registers it."""
+    metrics = PoolMetrics(name)
+    metrics.pool = engine.pool
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.metrics = metrics
+
+    event.listen(engine, "connect", lambda dbapi_connection, record: metrics.increment("connects"))
+    event.listen(engine, "close", lambda dbapi_connection, record: metrics.increment("closes"))
+    event.listen(engine, "invalidate", lambda dbapi_connection, record, exception: metrics.increment("invalidations"))
+    with _registry_lock:
+        _registry[name] = metrics
+    return metrics
+
+
+def all_pool_metrics():
+    with _registry_lock:
+        return [metrics.snapshot() for metrics in _registry.values()]
@@ -0,0 +1,155 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+from pool_metrics import percentile
+from config import SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_PATH, SLOW_QUERY_LOG_MAX_BYTES, SLOW_QUERY_LOG_BACKUPS
+
+# query_stats.py
+#
+# Per-query timing for every engine built by database.create_database_engine(): statement
+# fingerprint, duration, rows and the dashboard function that issued it. Queries slower than
+# SLOW_QUERY_THRESHOLD_MS are written to a rotating log file.
+
+DURATION_SAMPLES = 1000
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Frames from these files are plumbing, not the caller we want to attribute a query to
+_SKIP_FILES = {"database.py", "query_stats.py", "pool_metrics.py", "routing.py"}
+
+_stats = defaultdict(lambda: {"count": 0, "total": 0.0, "rows": 0, "rows_counted": 0, "durations": deque(maxlen=DURATION_SAMPLES),
+                              "callers": set(), "frames": 0, "frame_bytes": 0})
+_stats_lock = threading.Lock()
+_slow_log = None
+
+
+def fingerprint(statement):
+    """Normalizes a statement so executions differing only in literals/parameters group together."""
+    normalized = re.sub(r"'(?:[^'\\]|\\.)*'", "?", statement)
+    normalized = re.sub(r"\b\d+(?:\.\d+)?\b", "?", normalized)
+    normalized = re.sub(r"%\(\w+\)s|%s|:\w+", "?", normalized)
+    normalized = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?+)", normalized)  # IN lists of any length
+    normalized = re.sub(r"(?:\(\?\+\)\s*,\s*)+\(\?\+\)", "(?+)", normalized)  # multi-row VALUES
+    return re.sub(r"\s+", " ", normalized).strip()
+
+
+def calling_function():
+    """'module.function' of the nearest project frame outside the database plumbing."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PROJECT_DIR) and os.path.basename(filename) not in _SKIP_FILES:
+            module = os.path.splitext(os.path.basename(filename))[0]
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def _get_slow_log():
+    global _slow_log
+    if _slow_log is None:
+        logger = logging.getLogger("banking_dashboard.slow_queries")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if not logger.handlers:
+            directory = os.path.dirname(SLOW_QUERY_LOG_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(SLOW_QUERY_LOG_PATH, maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                                          backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+        _slow_log = logger
+    return _slow_log
+
+
+def row_count(cursor):
+    """
+    The cursor's row count, or None when the driver doesn't know it: -1 before the rows are
+    fetched, or (unsigned) -1 as 2**64 - 1 from streaming cursors such as PyMySQL's SSCursor.
+    """
+    rows = getattr(cursor, "rowcount", -1)
+    if rows is None or rows < 0 or rows >= 2 ** 63:
+        return None
+    return rows
+
+
+def record_query(statement, seconds, rows, caller):
+    """rows=None records a query whose row count isn't known; it is left out of mean_rows."""
+    key = fingerprint(statement)
+    with _stats_lock:
+        stats = _stats[key]
+        stats["count"] += 1
+        stats["total"] += seconds
+        if rows is not None:
+            stats["rows"] += rows
+            stats["rows_counted"] += 1
+        stats["durations"].append(seconds)
+        stats["callers"].add(caller)
+    if seconds * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+        _get_slow_log().info("%.1fms rows=%s caller=%s sql=%s", seconds * 1000,
+                             "?" if rows is None else rows, caller, key)
+
+
+def record_frame(statement, frame_bytes):
+    """Memory of the DataFrame built from a query's result (database.read_sql)."""
+    key = fingerprint(statement)
+    with _stats_lock:
+        stats = _stats[key]
+        stats["frames"] += 1
+        stats["frame_bytes"] += frame_bytes
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_times"].pop()
+    record_query(statement, time.perf_counter() - started, row_count(cursor), calling_function())
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_times"):
+        conn.info["query_start_times"].pop()
+
+
+def instrument_query_timing(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def query_stats():
+    """One dict per fingerprint with count, p50/p95/p99 and mean duration (ms), rows and callers."""
+    with _stats_lock:
+        items = [(key, dict(stats, durations=sorted(stats["durations"]), callers=sorted(stats["callers"])))
+                 for key, stats in _stats.items()]
+    report = []
+    for key, stats in items:
+        durations = stats["durations"]
+        report.append({
+            "fingerprint": key,
+            "count": stats["count"],
+            "p50_ms": percentile(durations, 50) * 1000,
+            "p95_ms": percentile(durations, 95) * 1000,
+            "p99_ms": percentile(durations, 99) * 1000,
+            "mean_ms": stats["total"] / stats["count"] * 1000 if stats["count"] else 0.0,
+            "total_ms": stats["total"] * 1000,
+            "mean_rows": stats["rows"] / stats["rows_counted"] if stats["rows_counted"] else None,
+            "mean_frame_kb": stats["frame_bytes"] / stats["frames"] / 1024 if stats["frames"] else None,
+            "callers": ", ".join(stats["callers"]),
+        })
+    return sorted(report, key=lambda row: row["total_ms"], reverse=True)
+
+
+def reset_query_stats():
+    with _stats_lock:
+        _stats.clear()
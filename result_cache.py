@@ -0,0 +1,232 @@
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from sqlalchemy import event
+from config import RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL
+import shared_cache
+from frames import memory_bytes
+
+# result_cache.py
+#
+# Query result cache for the read helpers. Entries are keyed by SQL text and parameters,
+# tagged with the tables the query reads, expire after a TTL and are evicted least recently
+# used once the cached frames exceed RESULT_CACHE_MAX_BYTES. Every engine built by
+# database.create_database_engine() reports the tables its write statements touch, and only
+# entries tagged with those tables are dropped (again at commit, so no reader can re-cache
+# pre-commit data). With shared_cache enabled, misses fall through to the on-disk tier and
+# invalidations are propagated to (and checked against) the other processes.
+
+_READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+`?(\w+)`?", re.IGNORECASE)
+_WRITE_TARGET = re.compile(
+    r"^\s*(?:INSERT(?:\s+IGNORE)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+IGNORE)?|DELETE\s+(?:IGNORE\s+)?FROM"
+    r"|TRUNCATE(?:\s+TABLE)?|ALTER\s+TABLE|DROP\s+TABLE(?:\s+IF\s+EXISTS)?"
+    r"|CREATE\s+TABLE(?:\s+IF\s+NOT\s+EXISTS)?|LOAD\s+DATA\b.*?\bINTO\s+TABLE)\s+`?(\w+)`?",
+    re.IGNORECASE | re.DOTALL,
+)
+_WRITE_KEYWORDS = ("insert", "replace", "update", "delete", "truncate", "alter", "drop", "create",
+                   "rename", "load")
+
+_entries = OrderedDict()  # (query, params) -> entry dict
+_generations = defaultdict(int)  # table -> invalidation count, to spot writes racing a read
+_global_generation = 0
+_invalidated_at = {}  # table (or None for everything) -> time.monotonic() of its last invalidation
+_lock = threading.RLock()
+_stats = {"hits": 0, "misses": 0, "shared_hits": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+_total_bytes = 0
+
+
+def tables_read(query):
+    """Lower-cased names of the tables a SELECT reads (FROM and JOIN clauses)."""
+    return frozenset(name.lower() for name in _READ_TABLES.findall(query))
+
+
+def tables_written(statement):
+    """
+    Tables a statement modifies: an empty set for reads, None for a write whose target
+    can't be determined (which invalidates everything).
+    """
+    words = statement.lstrip().split(None, 1)
+    if not words or words[0].lower() not in _WRITE_KEYWORDS:
+        return frozenset()
+    match = _WRITE_TARGET.match(statement)
+    if match is None:
+        return None
+    # Multi-table UPDATE/DELETE ... JOIN: treat every referenced table as written
+    return frozenset({match.group(1).lower()} | tables_read(statement))
+
+
+def _key(query, params):
+    # repr() keeps list/tuple parameters (IN lists) hashable
+    return query, tuple(sorted((name, repr(value)) for name, value in (params or {}).items()))
+
+
+def _shared_versions(tables):
+    # The shared tier is best-effort: if it can't be reached, behave as if it were disabled
+    if not shared_cache.enabled():
+        return None
+    try:
+        return tuple(sorted(shared_cache.versions(tables).items()))
+    except Exception:
+        return None
+
+
+def generation(tables):
+    """Opaque token that changes whenever any of the tables is invalidated, in any process."""
+    with _lock:
+        local = _global_generation, tuple(_generations[table] for table in sorted(tables))
+    return local + (_shared_versions(tables),)
+
+
+def _remove(key, reason):
+    global _total_bytes
+    entry = _entries.pop(key)
+    _total_bytes -= entry["bytes"]
+    _stats[reason] += 1
+
+
+def _is_current(entry):
+    if entry["versions"] is None:
+        return True
+    try:
+        return shared_cache.is_current(dict(entry["versions"]))
+    except Exception:
+        return True
+
+
+def get(query, params=None):
+    """The cached DataFrame for the query, or None on a miss or expiry."""
+    key = _key(query, params)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry["expires"] <= time.monotonic():
+            _remove(key, "expirations")
+            entry = None
+    if entry is not None and not _is_current(entry):  # another process wrote to one of its tables
+        with _lock:
+            if _entries.get(key) is entry:
+                _remove(key, "invalidations")
+        entry = None
+    if entry is not None:
+        with _lock:
+            if key in _entries:
+                _entries.move_to_end(key)
+            _stats["hits"] += 1
+        return entry["data"]
+    data = _shared_get(key)
+    with _lock:
+        _stats["shared_hits" if data is not None else "misses"] += 1
+    if data is not None:
+        put(query, params, data, share=False)
+    return data
+
+
+def _shared_get(key):
+    if not shared_cache.enabled():
+        return None
+    try:
+        return shared_cache.get(*key)
+    except Exception:
+        return None
+
+
+def frame_bytes(data):
+    """Memory used by a DataFrame, or by a dict of DataFrames (a snapshot group)."""
+    if isinstance(data, dict):
+        return sum(frame_bytes(frame) for frame in data.values())
+    return memory_bytes(data)
+
+
+def put(query, params, data, ttl=RESULT_CACHE_TTL, tables=None, seen_generation=None, share=True):
+    """
+    Caches a result (and, with share, writes it to the shared tier). seen_generation (from
+    generation() before the query ran) skips storing it if one of its tables was written in
+    the meantime.
+    """
+    global _total_bytes
+    tables = frozenset(tables) if tables is not None else tables_read(query)
+    size = frame_bytes(data)
+    if size > RESULT_CACHE_MAX_BYTES:
+        return
+    key = _key(query, params)
+    current = generation(tables)
+    if seen_generation is not None and seen_generation != current:
+        return
+    shared_versions = current[2]
+    with _lock:
+        if key in _entries:
+            _total_bytes -= _entries.pop(key)["bytes"]
+        _entries[key] = {"data": data, "tables": tables, "bytes": size, "expires": time.monotonic() + ttl,
+                         "versions": shared_versions}
+        _total_bytes += size
+        while _total_bytes > RESULT_CACHE_MAX_BYTES:
+            _remove(next(iter(_entries)), "evictions")
+    if share and shared_versions is not None:
+        try:
+            shared_cache.put(*key, data, tables, ttl, recorded_versions=dict(shared_versions))
+        except Exception:
+            pass  # e.g. a column pyarrow can't serialize; the local entry still serves this process
+
+
+def invalidate(tables=None):
+    """Drops entries that read any of the tables; tables=None drops everything."""
+    global _global_generation
+    with _lock:
+        if tables is None:
+            _global_generation += 1
+            _invalidated_at[None] = time.monotonic()
+            keys = list(_entries)
+        else:
+            tables = {table.lower() for table in tables}
+            for table in tables:
+                _generations[table] += 1
+                _invalidated_at[table] = time.monotonic()
+            keys = [key for key, entry in _entries.items() if entry["tables"] & tables]
+        for key in keys:
+            _remove(key, "invalidations")
+    if shared_cache.enabled():
+        try:
+            shared_cache.bump(tables)
+        except Exception:
+            pass
+
+
+def invalidated_within(tables, seconds):
+    """Whether any of the tables (or everything) was invalidated in the last `seconds`."""
+    cutoff = time.monotonic() - seconds
+    with _lock:
+        return any(_invalidated_at.get(table, float("-inf")) > cutoff for table in [None, *tables])
+
+
+def cache_stats():
+    with _lock:
+        lookups = _stats["hits"] + _stats["shared_hits"] + _stats["misses"]
+        return dict(_stats, entries=len(_entries), bytes=_total_bytes, max_bytes=RESULT_CACHE_MAX_BYTES,
+                    hit_rate=(_stats["hits"] + _stats["shared_hits"]) / lookups if lookups else 0.0)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    written = tables_written(statement)
+    if written is None or written:
+        invalidate(written)
+        pending = conn.info.setdefault("written_tables", set())
+        if written is None or pending is None:
+            conn.info["written_tables"] = None
+        else:
+            pending.update(written)
+
+
+def _on_commit(conn):
+    if "written_tables" in conn.info:
+        invalidate(conn.info.pop("written_tables"))
+
+
+def _on_rollback(conn):
+    conn.info.pop("written_tables", None)
+
+
+def instrument_result_cache(engine):
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "commit", _on_commit)
+    event.listen(engine, "rollback", _on_rollback)
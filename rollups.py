@@ -0,0 +1,164 @@
+import argparse
+import threading
+
+from sqlalchemy import text
+from database import engine, note_write
+
+# rollups.py
+#
+# Aggregate tables over `transaction`, maintained incrementally: each refresh folds in only the
+# rows with TranID above the stored high-water mark (INSERT ... SELECT ... ON DUPLICATE KEY
+# UPDATE adds to the existing buckets), so chart queries read a few rows per month regardless
+# of how much history the table holds.
+#
+# Transactions are treated as append-only. Edits or deletes of already-rolled-up rows (and
+# inserts that commit with a TranID below the high-water mark) are only picked up by a
+# rebuild:  python rollups.py rebuild  (or the button on the Diagnostics page). The CRUD page
+# counts its own edits and deletes of transactions with mark_stale(); while that count is
+# non-zero the charts aggregate the base table instead of the rollups.
+
+ROLLUP_PREFIX = "rollup_"
+STATE_TABLE = "rollup_state"
+SOURCE = "transaction"
+# rollup_state row whose HighWaterMark column counts edits of rolled-up transactions since the last rebuild
+EDITS = "transaction_edits"
+
+# name -> (bucket columns with DDL, bucket expressions over `transaction` t, joins bankaccount a)
+ROLLUPS = {
+    "rollup_transaction_monthly": ([("Month", "CHAR(7) NOT NULL")],
+                                   ["DATE_FORMAT(t.Date, '%Y-%m')"], False),
+    "rollup_transaction_daily": ([("Day", "DATE NOT NULL")],
+                                 ["t.Date"], False),
+    # Branch of the account the transaction was made from; 0 for accounts without a branch
+    "rollup_transaction_branch_monthly": ([("BranchID", "INT NOT NULL"), ("Month", "CHAR(7) NOT NULL")],
+                                          ["COALESCE(a.BranchID, 0)", "DATE_FORMAT(t.Date, '%Y-%m')"], True),
+    "rollup_transaction_type_monthly": ([("Type", "VARCHAR(50) NOT NULL"), ("Month", "CHAR(7) NOT NULL")],
+                                        ["t.Type", "DATE_FORMAT(t.Date, '%Y-%m')"], False),
+    "rollup_transaction_currency_monthly": ([("CurrencyType", "VARCHAR(10) NOT NULL"), ("Month", "CHAR(7) NOT NULL")],
+                                            ["t.CurrencyType", "DATE_FORMAT(t.Date, '%Y-%m')"], False),
+}
+
+_tables_ready = False
+_tables_lock = threading.Lock()
+
+
+def ensure_rollup_tables():
+    global _tables_ready
+    with _tables_lock:
+        if _tables_ready:
+            return
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} ("
+                              "Name VARCHAR(64) NOT NULL PRIMARY KEY, HighWaterMark BIGINT NOT NULL)"))
+            for name in (SOURCE, EDITS):
+                conn.execute(text(f"INSERT IGNORE INTO {STATE_TABLE} (Name, HighWaterMark) VALUES (:name, 0)"),
+                             {"name": name})
+            for table, (buckets, _, _) in ROLLUPS.items():
+                columns = ", ".join(f"`{name}` {ddl}" for name, ddl in buckets)
+                keys = ", ".join(f"`{name}`" for name, _ in buckets)
+                conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table} ({columns}, "
+                                  "TransactionCount BIGINT NOT NULL, TotalAmount DECIMAL(20, 2) NOT NULL, "
+                                  f"PRIMARY KEY ({keys}))"))
+        _tables_ready = True
+
+
+def fold_in_statement(table):
+    """
+    INSERT ... SELECT adding the transactions with :low < TranID <= :high to one rollup. The
+    new totals are read from the derived table `new` rather than with VALUES(), which MySQL
+    deprecated in ON DUPLICATE KEY UPDATE as of 8.0.20.
+    """
+    buckets, expressions, joins_account = ROLLUPS[table]
+    columns = ", ".join(f"`{name}`" for name, _ in buckets)
+    selected = ", ".join(f"{expression} AS `{name}`" for (name, _), expression in zip(buckets, expressions))
+    join = "LEFT JOIN bankaccount a ON a.AccID = t.AccID" if joins_account else ""
+    return (
+        f"INSERT INTO {table} ({columns}, TransactionCount, TotalAmount) "
+        f"SELECT * FROM (SELECT {selected}, COUNT(*) AS TransactionCount, SUM(t.Amount) AS TotalAmount "
+        f"FROM `{SOURCE}` t {join} WHERE t.TranID > :low AND t.TranID <= :high "
+        f"GROUP BY {', '.join(expressions)}) AS new "
+        f"ON DUPLICATE KEY UPDATE TransactionCount = {table}.TransactionCount + new.TransactionCount, "
+        f"TotalAmount = {table}.TotalAmount + new.TotalAmount"
+    )
+
+
+def _fold_in(conn, low, high):
+    """Adds transactions with low < TranID <= high to every rollup."""
+    for table in ROLLUPS:
+        conn.execute(text(fold_in_statement(table)), {"low": low, "high": high})
+
+
+def refresh_rollups():
+    """
+    Folds new transactions into the rollups; returns how many TranIDs the high-water mark
+    advanced by (0 when already current). The state row is locked, so concurrent refreshes
+    from several processes never count a transaction twice.
+    """
+    ensure_rollup_tables()
+    with engine.connect() as conn:
+        # Cheap check without locks: most page views find nothing new
+        current = conn.execute(text(
+            f"SELECT (SELECT HighWaterMark FROM {STATE_TABLE} WHERE Name = :name), "
+            f"(SELECT COALESCE(MAX(TranID), 0) FROM `{SOURCE}`)"), {"name": SOURCE}).one()
+    if current[0] >= current[1]:
+        return 0
+    with engine.begin() as conn:
+        low = conn.execute(text(f"SELECT HighWaterMark FROM {STATE_TABLE} WHERE Name = :name FOR UPDATE"),
+                           {"name": SOURCE}).scalar_one()
+        high = conn.execute(text(f"SELECT COALESCE(MAX(TranID), 0) FROM `{SOURCE}`")).scalar_one()
+        if high <= low:
+            return 0
+        _fold_in(conn, low, high)
+        conn.execute(text(f"UPDATE {STATE_TABLE} SET HighWaterMark = :high WHERE Name = :name"),
+                     {"high": high, "name": SOURCE})
+    note_write()
+    return high - low
+
+
+def mark_stale():
+    """Records an edit or delete of transactions the rollups may already include."""
+    ensure_rollup_tables()
+    with engine.begin() as conn:
+        conn.execute(text(f"UPDATE {STATE_TABLE} SET HighWaterMark = HighWaterMark + 1 WHERE Name = :name"),
+                     {"name": EDITS})
+
+
+def stale_edits():
+    """How many recorded edits of rolled-up transactions the rollups don't reflect yet (0 = current)."""
+    ensure_rollup_tables()
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT HighWaterMark FROM {STATE_TABLE} WHERE Name = :name"),
+                            {"name": EDITS}).scalar_one()
+
+
+def rebuild_rollups():
+    """Recomputes every rollup from scratch in one transaction; readers see the old totals until it commits."""
+    ensure_rollup_tables()
+    with engine.begin() as conn:
+        conn.execute(text(f"SELECT HighWaterMark FROM {STATE_TABLE} WHERE Name = :name FOR UPDATE"),
+                     {"name": SOURCE})
+        # Cleared first so the row stays locked: an edit committing meanwhile marks the rollups stale again
+        conn.execute(text(f"UPDATE {STATE_TABLE} SET HighWaterMark = 0 WHERE Name = :name"), {"name": EDITS})
+        for table in ROLLUPS:
+            conn.execute(text(f"DELETE FROM {table}"))
+        high = conn.execute(text(f"SELECT COALESCE(MAX(TranID), 0) FROM `{SOURCE}`")).scalar_one()
+        _fold_in(conn, 0, high)
+        conn.execute(text(f"UPDATE {STATE_TABLE} SET HighWaterMark = :high WHERE Name = :name"),
+                     {"high": high, "name": SOURCE})
+    note_write()
+    return high
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the transaction rollup tables.")
+    parser.add_argument("command", choices=["refresh", "rebuild"],
+                        help="refresh: fold in new transactions; rebuild: recompute everything")
+    args = parser.parse_args()
+    if args.command == "rebuild":
+        print(f"Rebuilt rollups up to TranID {rebuild_rollups()}.")
+    else:
+        print(f"Folded in {refresh_rollups()} new TranIDs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import contextvars
+import itertools
+import threading
+import time
+
+from sqlalchemy import text
+
+# routing.py
+#
+# Read/write splitting. Writes always use the primary engine; reads go to a healthy replica
+# chosen round-robin or by fewest checked-out connections. A replica lagging more than the
+# staleness tolerance is skipped, and a session that has just written reads from the primary
+# for a while so it always sees its own changes.
+
+
+# Set by bind_session() so work handed to other threads keeps its session's routing
+_session_override = contextvars.ContextVar("routing_session_id", default=None)
+
+
+def bind_session(function, session_id=None):
+    """Wraps function so it runs as the given (default: current) session in any thread."""
+    session_id = session_id or current_session_id()
+
+    def bound(*args, **kwargs):
+        token = _session_override.set(session_id)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _session_override.reset(token)
+    return bound
+
+
+def script_run_context():
+    """The Streamlit script-run context of this thread, or None outside a Streamlit script."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        try:
+            from streamlit.scriptrunner import get_script_run_ctx  # older Streamlit
+        except ImportError:
+            return None
+    return get_script_run_ctx()
+
+
+def current_session_id():
+    """The Streamlit session running this thread, or the thread itself outside Streamlit."""
+    if _session_override.get() is not None:
+        return _session_override.get()
+    ctx = script_run_context()
+    return ctx.session_id if ctx is not None else f"thread-{threading.get_ident()}"
+
+
+def replica_lag_seconds(engine):
+    """
+    Seconds the replica is behind its source. A server that isn't configured as a replica
+    reports 0, so two independent local instances can stand in for a primary/replica pair.
+    Returns None when replication is broken or the lag can't be read.
+    """
+    with engine.connect() as conn:
+        for statement, column in (("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+                                  ("SHOW SLAVE STATUS", "Seconds_Behind_Master")):
+            try:
+                row = conn.execute(text(statement)).mappings().first()
+            except Exception:
+                continue  # older servers only know SHOW SLAVE STATUS
+            if row is None:
+                return 0
+            return row.get(column)
+    return None
+
+
+class ReplicaRouter:
+    def __init__(self, primary, replicas=(), selection="round_robin", max_lag_seconds=5,
+                 read_your_writes_seconds=10, lag_check_interval=5):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.selection = selection
+        self.max_lag_seconds = max_lag_seconds
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self.lag_check_interval = lag_check_interval
+        self._round_robin = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._lock = threading.Lock()
+        self._last_write = {}  # session id -> time of its last write
+        self._lag = {}  # replica index -> (checked_at, lag seconds or None)
+        self._reads = {"primary": 0, **{f"replica{i + 1}": 0 for i in range(len(self.replicas))}}
+
+    def note_write(self, session_id=None):
+        now = time.monotonic()
+        with self._lock:
+            # Drop sessions whose pin has lapsed so closed sessions do not accumulate
+            expired = [sid for sid, at in self._last_write.items() if now - at >= self.read_your_writes_seconds]
+            for sid in expired:
+                del self._last_write[sid]
+            self._last_write[session_id or current_session_id()] = now
+
+    def is_pinned(self, session_id=None):
+        """Whether the session wrote recently enough that its reads go to the primary."""
+        with self._lock:
+            return self._pinned_to_primary(session_id or current_session_id())
+
+    def _pinned_to_primary(self, session_id):
+        last_write = self._last_write.get(session_id)
+        return last_write is not None and time.monotonic() - last_write < self.read_your_writes_seconds
+
+    def _lag_of(self, index):
+        now = time.monotonic()
+        checked_at, lag = self._lag.get(index, (None, None))
+        if checked_at is None or now - checked_at > self.lag_check_interval:
+            try:
+                lag = replica_lag_seconds(self.replicas[index])
+            except Exception:
+                lag = None  # unreachable replica
+            self._lag[index] = (now, lag)
+        return lag
+
+    def _healthy_replicas(self):
+        healthy = []
+        for index in range(len(self.replicas)):
+            lag = self._lag_of(index)
+            if lag is not None and lag <= self.max_lag_seconds:
+                healthy.append(index)
+        return healthy
+
+    def read_engine(self, session_id=None):
+        """The engine the current session should read from."""
+        if not self.replicas:
+            return self.primary
+        session_id = session_id or current_session_id()
+        with self._lock:
+            if self._pinned_to_primary(session_id):
+                self._reads["primary"] += 1
+                return self.primary
+        healthy = self._healthy_replicas()
+        with self._lock:
+            if not healthy:
+                self._reads["primary"] += 1
+                return self.primary
+            if self.selection == "least_connections":
+                index = min(healthy, key=lambda i: self.replicas[i].pool.checkedout())
+            else:
+                index = next(self._round_robin)
+                while index not in healthy:
+                    index = next(self._round_robin)
+            self._reads[f"replica{index + 1}"] += 1
+            return self.replicas[index]
+
+    def status(self):
+        rows = [{"engine": "primary", "role": "primary", "lag_seconds": 0,
+                 "checked_out": self.primary.pool.checkedout(), "reads": self._reads["primary"]}]
+        for index, replica in enumerate(self.replicas):
+            _, lag = self._lag.get(index, (None, None))
+            rows.append({"engine": f"replica{index + 1}", "role": "replica", "lag_seconds": lag,
+                         "checked_out": replica.pool.checkedout(), "reads": self._reads[f"replica{index + 1}"]})
+        return rows
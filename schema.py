@@ -0,0 +1,174 @@
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import text
+from database import engine
+
+# schema.py
+#
+# Reflects tables, primary keys, column types, nullability and foreign keys from
+# information_schema once and keeps the result in-process until refresh_schema() is called.
+
+INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint", "year"}
+TEXT_TYPES = {"char", "varchar", "tinytext", "text", "mediumtext", "longtext"}
+
+
+@dataclass
+class ColumnInfo:
+    name: str
+    data_type: str  # e.g. 'int', 'varchar', 'decimal', 'date'
+    column_type: str  # full type, e.g. 'decimal(15,2)'
+    nullable: bool
+    default: object = None
+    auto_increment: bool = False
+    max_length: int = None
+    numeric_scale: int = None
+
+    @property
+    def required(self):
+        """True when an INSERT must supply a value for this column."""
+        return not self.nullable and self.default is None and not self.auto_increment
+
+    def parse(self, raw):
+        """
+        Converts text entered in a form into a value of this column's type.
+
+        Blank input becomes None. Raises ValueError when the text doesn't fit the type.
+        """
+        if raw is None:
+            return None
+        raw = str(raw).strip()
+        if raw == "":
+            return None
+        if self.data_type in INTEGER_TYPES:
+            return int(raw)
+        if self.data_type in ("decimal", "numeric"):
+            try:
+                return Decimal(raw)
+            except InvalidOperation:
+                raise ValueError(f"{raw!r} is not a valid {self.column_type}")
+        if self.data_type in ("float", "double", "real"):
+            return float(raw)
+        if self.data_type == "date":
+            return date.fromisoformat(raw[:10])
+        if self.data_type in ("datetime", "timestamp"):
+            return datetime.fromisoformat(raw)
+        return raw
+
+
+@dataclass
+class ForeignKeyInfo:
+    name: str
+    columns: list
+    referred_table: str
+    referred_columns: list
+
+
+@dataclass
+class TableInfo:
+    name: str
+    columns: list = field(default_factory=list)
+    primary_key: list = field(default_factory=list)
+    foreign_keys: list = field(default_factory=list)
+
+    @property
+    def column_names(self):
+        return [column.name for column in self.columns]
+
+    def get_column(self, name):
+        for column in self.columns:
+            if column.name == name:
+                return column
+        return None
+
+
+_schema_cache = None
+_schema_lock = threading.Lock()
+
+
+def fetch_table_names():
+    query = """
+    SELECT TABLE_NAME
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'
+    ORDER BY TABLE_NAME
+    """
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(text(query))]
+
+
+def reflect_schema():
+    """
+    Reads the full schema in three information_schema queries and returns {table_name: TableInfo}.
+    """
+    columns_query = """
+    SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT, EXTRA,
+           CHARACTER_MAXIMUM_LENGTH, NUMERIC_SCALE
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+    ORDER BY TABLE_NAME, ORDINAL_POSITION
+    """
+    keys_query = """
+    SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+    FROM information_schema.KEY_COLUMN_USAGE
+    WHERE TABLE_SCHEMA = DATABASE()
+      AND (CONSTRAINT_NAME = 'PRIMARY' OR REFERENCED_TABLE_NAME IS NOT NULL)
+    ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION
+    """
+    tables = {name: TableInfo(name) for name in fetch_table_names()}
+    with engine.connect() as conn:
+        for row in conn.execute(text(columns_query)):
+            table = tables.get(row.TABLE_NAME)
+            if table is None:  # views
+                continue
+            table.columns.append(ColumnInfo(
+                name=row.COLUMN_NAME,
+                data_type=row.DATA_TYPE.lower(),
+                column_type=row.COLUMN_TYPE,
+                nullable=row.IS_NULLABLE == 'YES',
+                default=row.COLUMN_DEFAULT,
+                auto_increment='auto_increment' in (row.EXTRA or '').lower(),
+                max_length=row.CHARACTER_MAXIMUM_LENGTH,
+                numeric_scale=row.NUMERIC_SCALE,
+            ))
+
+        foreign_keys = {}
+        for row in conn.execute(text(keys_query)):
+            table = tables.get(row.TABLE_NAME)
+            if table is None:
+                continue
+            if row.CONSTRAINT_NAME == 'PRIMARY':
+                table.primary_key.append(row.COLUMN_NAME)
+                continue
+            key = (row.TABLE_NAME, row.CONSTRAINT_NAME)
+            if key not in foreign_keys:
+                foreign_keys[key] = ForeignKeyInfo(row.CONSTRAINT_NAME, [], row.REFERENCED_TABLE_NAME, [])
+                table.foreign_keys.append(foreign_keys[key])
+            foreign_keys[key].columns.append(row.COLUMN_NAME)
+            foreign_keys[key].referred_columns.append(row.REFERENCED_COLUMN_NAME)
+    return tables
+
+
+def get_schema(refresh=False):
+    global _schema_cache
+    with _schema_lock:
+        if _schema_cache is None or refresh:
+            _schema_cache = reflect_schema()
+        return _schema_cache
+
+
+def refresh_schema():
+    return get_schema(refresh=True)
+
+
+def get_table_names():
+    return sorted(get_schema())
+
+
+def get_table(table_name):
+    table = get_schema().get(table_name)
+    if table is None:
+        raise KeyError(f"Unknown table: {table_name}")
+    return table
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+
+from config import SHARED_CACHE_DIR, SHARED_CACHE_MAX_BYTES
+
+# shared_cache.py
+#
+# Optional on-disk cache tier shared by every Streamlit process on the host (enabled by
+# SHARED_CACHE_DIR). Frames are stored as Parquet files written atomically (temp file +
+# os.replace); a SQLite index tracks size, expiry and last access for least-recently-used
+# eviction, plus a version counter per table. Invalidating a table bumps its counter, and an
+# entry recorded against an older version is treated as stale by every process.
+
+_ALL_TABLES = "*"  # bumped by invalidations that don't name their tables
+_initialized = False
+
+
+def enabled():
+    return bool(SHARED_CACHE_DIR)
+
+
+@contextmanager
+def _open():
+    """An autocommit connection to the index, creating the cache directory and schema on first use."""
+    global _initialized
+    if not _initialized:
+        os.makedirs(os.path.join(SHARED_CACHE_DIR, "frames"), exist_ok=True)
+    conn = sqlite3.connect(os.path.join(SHARED_CACHE_DIR, "index.sqlite"), timeout=10, isolation_level=None)
+    try:
+        if not _initialized:
+            conn.execute("PRAGMA journal_mode=WAL")  # readers don't block the writing process
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, files TEXT NOT NULL, "
+                         "bytes INTEGER NOT NULL, versions TEXT NOT NULL, expires REAL NOT NULL, "
+                         "last_access REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            _initialized = True
+        yield conn
+    finally:
+        conn.close()
+
+
+def versions(tables):
+    """{table: version} for the tables (plus the catch-all counter), as seen by all processes."""
+    names = sorted(set(tables) | {_ALL_TABLES})
+    with _open() as conn:
+        rows = dict(conn.execute(f"SELECT name, version FROM table_versions WHERE name IN "
+                                 f"({', '.join('?' * len(names))})", names).fetchall())
+    return {name: rows.get(name, 0) for name in names}
+
+
+def is_current(recorded):
+    """Whether versions recorded by versions() still match, i.e. no table was invalidated since."""
+    return versions(set(recorded) - {_ALL_TABLES}) == recorded
+
+
+def bump(tables=None):
+    """Invalidates the tables (None: everything) for every process sharing the cache."""
+    names = [_ALL_TABLES] if tables is None else sorted(tables)
+    with _open() as conn:
+        for name in names:
+            conn.execute("INSERT INTO table_versions (name, version) VALUES (?, 1) "
+                         "ON CONFLICT(name) DO UPDATE SET version = version + 1", (name,))
+
+
+def _entry_key(key, params):
+    return hashlib.sha256(repr((key, params)).encode("utf-8")).hexdigest()
+
+
+def _write_atomically(path, write):
+    directory = os.path.dirname(path)
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(handle)
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _write_frame(path, frame):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    _write_atomically(path, lambda temp_path: pq.write_table(table, temp_path))
+
+
+def _write_json(path, payload):
+    def write(temp_path):
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, default=str)
+    _write_atomically(path, write)
+
+
+def _read(description):
+    path = os.path.join(SHARED_CACHE_DIR, "frames", description["file"])
+    if description["kind"] == "json":
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    import pyarrow.parquet as pq
+    frame = pq.read_table(path).to_pandas()
+    frame.attrs.update(description.get("attrs", {}))
+    return frame
+
+
+def _remove_files(files):
+    for description in json.loads(files).values():
+        try:
+            os.remove(os.path.join(SHARED_CACHE_DIR, "frames", description["file"]))
+        except FileNotFoundError:
+            pass
+
+
+def get(key, params=None):
+    """
+    The cached value, or None on a miss, expiry or when one of its tables changed since it
+    was stored. Values are DataFrames, {name: DataFrame} groups or JSON chart payloads.
+    """
+    entry_key = _entry_key(key, params)
+    with _open() as conn:
+        row = conn.execute("SELECT files, versions, expires FROM entries WHERE key = ?", (entry_key,)).fetchone()
+        if row is None:
+            return None
+        files, recorded, expires = row
+        if expires <= time.time() or not is_current(json.loads(recorded)):
+            conn.execute("DELETE FROM entries WHERE key = ?", (entry_key,))
+            _remove_files(files)
+            return None
+        conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), entry_key))
+    try:
+        described = json.loads(files)
+        if "" in described:
+            return _read(described[""])
+        return {name: _read(description) for name, description in described.items()}
+    except (OSError, ValueError):
+        return None  # evicted by another process between the lookup and the read
+
+
+def put(key, params, value, tables, ttl, recorded_versions=None):
+    """
+    Stores a DataFrame, a {name: DataFrame} group or a JSON payload. recorded_versions (from
+    versions() before the data was read) keeps a result that raced a write from being stored.
+    """
+    import pandas as pd
+    recorded_versions = recorded_versions or versions(tables)
+    entry_key = _entry_key(key, params)
+    frames_dir = os.path.join(SHARED_CACHE_DIR, "frames")
+    parts = value if isinstance(value, dict) and all(isinstance(v, pd.DataFrame) for v in value.values()) \
+        else {"": value}
+    files = {}
+    size = 0
+    for name, part in parts.items():
+        file_name = f"{entry_key}-{hashlib.sha256(name.encode('utf-8')).hexdigest()[:8]}"
+        if isinstance(part, pd.DataFrame):
+            file_name += ".parquet"
+            _write_frame(os.path.join(frames_dir, file_name), part)
+            files[name] = {"kind": "frame", "file": file_name, "attrs": dict(part.attrs)}
+        else:
+            file_name += ".json"
+            _write_json(os.path.join(frames_dir, file_name), part)
+            files[name] = {"kind": "json", "file": file_name}
+        size += os.path.getsize(os.path.join(frames_dir, file_name))
+    with _open() as conn:
+        if not is_current(recorded_versions):
+            _remove_files(json.dumps(files))
+            return
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO entries (key, files, bytes, versions, expires, last_access) "
+                     "VALUES (?, ?, ?, ?, ?, ?)",
+                     (entry_key, json.dumps(files), size, json.dumps(recorded_versions), now + ttl, now))
+        _evict(conn)
+
+
+def _evict(conn):
+    total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+    if total <= SHARED_CACHE_MAX_BYTES:
+        return
+    for entry_key, files, size in conn.execute(
+            "SELECT key, files, bytes FROM entries ORDER BY last_access").fetchall():
+        conn.execute("DELETE FROM entries WHERE key = ?", (entry_key,))
+        _remove_files(files)
+        total -= size
+        if total <= SHARED_CACHE_MAX_BYTES:
+            break
+
+
+def cache_stats():
+    with _open() as conn:
+        entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries").fetchone()
+    return {"entries": entries, "bytes": total, "max_bytes": SHARED_CACHE_MAX_BYTES, "directory": SHARED_CACHE_DIR}
@@ -0,0 +1,117 @@
+import streamlit as st
+import pandas as pd
+from database import execute_batch, StaleWriteError
+from statements import insert_statement, update_statement, delete_statement
+
+# staging.py
+#
+# Staging mode for the CRUD page: writes are queued in the session, reviewed as a diff and
+# flushed together in one transaction, batched per table and statement shape.
+
+STAGED_WRITES_KEY = "staged_writes"
+
+
+def get_staged_writes():
+    return st.session_state.setdefault(STAGED_WRITES_KEY, [])
+
+
+def stage_insert(table_name, values):
+    get_staged_writes().append({"operation": "insert", "table": table_name, "values": dict(values),
+                                "key_columns": [], "key": ()})
+
+
+def stage_update(table_name, values, key_columns, key_values, expected=None):
+    get_staged_writes().append({"operation": "update", "table": table_name, "values": dict(values),
+                                "key_columns": list(key_columns), "key": tuple(key_values),
+                                "expected": dict(expected or {})})
+
+
+def stage_delete(table_name, key_columns, key_values):
+    get_staged_writes().append({"operation": "delete", "table": table_name, "values": {},
+                                "key_columns": list(key_columns), "key": tuple(key_values)})
+
+
+def build_statement(write):
+    if write["operation"] == "insert":
+        return insert_statement(write["table"], write["values"])
+    if write["operation"] == "update":
+        return update_statement(write["table"], write["values"], write["key_columns"], write["key"],
+                                write.get("expected"))
+    return delete_statement(write["table"], write["key_columns"], write["key"])
+
+
+def group_writes(writes):
+    """
+    Groups writes into [(query, [params, ...]), ...] for executemany.
+
+    A write joins the immediately preceding group when the query text matches, otherwise it
+    opens a new group, so statements run in exactly the order they were staged (an insert of a
+    parent row still precedes an insert of a child referencing it) while consecutive runs of
+    same-shaped statements collapse into a single executemany call.
+    """
+    groups = []
+    for write in writes:
+        query, params = build_statement(write)
+        if not groups or groups[-1][0] != query:
+            groups.append((query, []))
+        groups[-1][1].append(params)
+    return groups
+
+
+def flush_staged_writes(on_flushed=None):
+    """
+    Flushes all staged writes in one transaction. on_flushed, if given, receives the list of
+    writes after the commit (the CRUD page uses it to patch its cached frames).
+    """
+    writes = get_staged_writes()
+    if not writes:
+        return []
+    groups = group_writes(writes)
+    # Every staged update/delete must hit its row; otherwise the whole flush is rolled back
+    counts = execute_batch(groups, expect_rows=True)
+    flushed = list(writes)
+    writes.clear()
+    if on_flushed:
+        on_flushed(flushed)
+    return list(zip(groups, counts))
+
+
+def staged_writes_frame(writes):
+    rows = []
+    for position, write in enumerate(writes):
+        key = ", ".join(f"{column}={value}" for column, value in zip(write["key_columns"], write["key"]))
+        changes = ", ".join(f"{column}={value}" for column, value in write["values"].items())
+        rows.append({"#": position, "Operation": write["operation"].upper(), "Table": write["table"],
+                     "Key": key, "Changes": changes})
+    return pd.DataFrame(rows, columns=["#", "Operation", "Table", "Key", "Changes"])
+
+
+def display_staging_panel(on_flushed=None):
+    writes = get_staged_writes()
+    st.subheader(f"Staged Changes ({len(writes)})")
+    if not writes:
+        st.info("No staged changes. Creates, updates and deletes are queued here while staging mode is on.")
+        return
+
+    st.dataframe(staged_writes_frame(writes))
+    groups = group_writes(writes)
+    st.caption(f"{len(writes)} writes will be sent as {len(groups)} batched statements in one transaction.")
+
+    to_remove = st.multiselect("Remove staged writes:", list(range(len(writes))))
+    flush_col, remove_col, discard_col = st.columns(3)
+    if remove_col.button("Remove selected") and to_remove:
+        for position in sorted(to_remove, reverse=True):
+            del writes[position]
+        st.success(f"Removed {len(to_remove)} staged writes.")
+    if discard_col.button("Discard all"):
+        writes.clear()
+        st.success("Discarded all staged changes.")
+    if flush_col.button("Flush"):
+        try:
+            results = flush_staged_writes(on_flushed)
+            affected = sum(count for _, count in results if count and count > 0)
+            st.success(f"Flushed {len(results)} batched statements; {affected} rows affected.")
+        except StaleWriteError as e:
+            st.error(f"Flush rolled back because of a conflict: {e}. Reload the rows and stage the changes again.")
+        except Exception as e:
+            st.error(f"Flush failed and was rolled back: {e}")
@@ -0,0 +1,134 @@
+import pandas as pd
+from database import quote_identifier
+
+# statements.py
+#
+# Builders for the parameterized INSERT/UPDATE/DELETE statements used by the CRUD page.
+# Each builder returns (query, params); statements touching the same table and columns
+# produce the same query text, which is what batching groups on.
+
+
+def to_python(value):
+    # numpy scalars, NaN and Timestamps from pandas rows are not accepted as bind parameters by every driver
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, pd.Timedelta):
+        # TIME columns (e.g. assist.Time); str() would give '0 days 01:02:03', which matches nothing
+        return value.to_pytimedelta()
+    if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+def display_text(value):
+    # Text shown in edit forms; NULL is shown as an empty field
+    value = to_python(value)
+    return "" if value is None else str(value)
+
+
+def row_key(row, key_columns):
+    return tuple(to_python(row[column]) for column in key_columns)
+
+
+def primary_key_clause(key_columns, prefix="pk_"):
+    # WHERE clause over every key column, so composite keys address exactly one row
+    return " AND ".join(f"{quote_identifier(column)} = :{prefix}{i}" for i, column in enumerate(key_columns))
+
+
+def primary_key_params(key_values, prefix="pk_"):
+    return {f"{prefix}{i}": value for i, value in enumerate(key_values)}
+
+
+def insert_statement(table_name, values):
+    columns = ", ".join(quote_identifier(column) for column in values)
+    placeholders = ", ".join(f":v_{i}" for i in range(len(values)))
+    query = f"INSERT INTO {quote_identifier(table_name)} ({columns}) VALUES ({placeholders})"
+    params = {f"v_{i}": value for i, value in enumerate(values.values())}
+    return query, params
+
+
+def update_statement(table_name, values, key_columns, key_values, expected=None):
+    """
+    SETs only the columns in values. expected maps columns to the values they held when the row
+    was loaded; they are added to the WHERE clause (NULL-safe) so a concurrent change makes the
+    UPDATE match zero rows instead of being silently overwritten.
+    """
+    set_clause = ", ".join(f"{quote_identifier(column)} = :v_{i}" for i, column in enumerate(values))
+    where = primary_key_clause(key_columns)
+    if expected:
+        where += "".join(f" AND {quote_identifier(column)} <=> :o_{i}" for i, column in enumerate(expected))
+    query = f"UPDATE {quote_identifier(table_name)} SET {set_clause} WHERE {where}"
+    params = {f"v_{i}": value for i, value in enumerate(values.values())}
+    params.update(primary_key_params(key_values))
+    params.update({f"o_{i}": value for i, value in enumerate((expected or {}).values())})
+    return query, params
+
+
+def delete_statement(table_name, key_columns, key_values):
+    query = f"DELETE FROM {quote_identifier(table_name)} WHERE {primary_key_clause(key_columns)}"
+    return query, primary_key_params(key_values)
+
+
+def chunked(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def key_set_clause(key_columns, keys, prefix="k"):
+    """
+    Builds `pk IN (...)`, or a row-constructor IN for composite keys, over a list of key tuples.
+    Returns (clause, params).
+    """
+    params = {}
+    if len(key_columns) == 1:
+        placeholders = []
+        for i, key in enumerate(keys):
+            params[f"{prefix}{i}"] = key[0]
+            placeholders.append(f":{prefix}{i}")
+        return f"{quote_identifier(key_columns[0])} IN ({', '.join(placeholders)})", params
+    tuples = []
+    for i, key in enumerate(keys):
+        names = [f"{prefix}{i}_{j}" for j in range(len(key_columns))]
+        params.update(dict(zip(names, key)))
+        tuples.append("(" + ", ".join(f":{name}" for name in names) + ")")
+    columns = "(" + ", ".join(quote_identifier(column) for column in key_columns) + ")"
+    return f"{columns} IN ({', '.join(tuples)})", params
+
+
+def seek_clause(columns, comparison, key, prefix="k"):
+    """
+    Keyset predicate selecting the rows after (comparison '>') or before ('<') key in the order
+    of columns. Composite keys bound the leading column on its own before the row comparison,
+    since MySQL does not reliably range-scan an index for a bare `(a, b) > (x, y)`.
+    Returns (clause, params).
+    """
+    quoted = [quote_identifier(column) for column in columns]
+    placeholders = [f":{prefix}{i}" for i in range(len(columns))]
+    params = {f"{prefix}{i}": value for i, value in enumerate(key)}
+    if len(columns) == 1:
+        return f"{quoted[0]} {comparison} {placeholders[0]}", params
+    clause = (f"{quoted[0]} {comparison}= {placeholders[0]} AND "
+              f"({', '.join(quoted)}) {comparison} ({', '.join(placeholders)})")
+    return clause, params
+
+
+def bulk_update_statements(table_name, values, key_columns, keys, chunk_size):
+    """One UPDATE ... WHERE pk IN (...) per chunk of keys, as [(query, params), ...]."""
+    set_clause = ", ".join(f"{quote_identifier(column)} = :v_{i}" for i, column in enumerate(values))
+    value_params = {f"v_{i}": value for i, value in enumerate(values.values())}
+    statements = []
+    for chunk in chunked(keys, chunk_size):
+        clause, params = key_set_clause(key_columns, chunk)
+        params.update(value_params)
+        statements.append((f"UPDATE {quote_identifier(table_name)} SET {set_clause} WHERE {clause}", params))
+    return statements
+
+
+def bulk_delete_statements(table_name, key_columns, keys, chunk_size):
+    """One DELETE ... WHERE pk IN (...) per chunk of keys, as [(query, params), ...]."""
+    statements = []
+    for chunk in chunked(keys, chunk_size):
+        clause, params = key_set_clause(key_columns, chunk)
+        statements.append((f"DELETE FROM {quote_identifier(table_name)} WHERE {clause}", params))
+    return statements
@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from sqlalchemy import text
+from config import CRUD_CACHE_MAX_ENTRIES
+from database import engine
+from statements import row_key
+
+# table_cache.py
+#
+# In-process cache of the DataFrames shown on the CRUD page, keyed by table and by the
+# page/filter/sort that produced them. Writes made through the page patch the cached frames
+# in place (append inserted rows, replace updated ones, drop deleted ones) instead of forcing a
+# reload; an entry is only dropped when a patch can't be applied safely. A cheap per-table
+# change marker detects writes made outside this process.
+
+_entries = OrderedDict()  # (table, signature) -> entry dict
+_change_markers = {}  # table -> last seen UPDATE_TIME
+_lock = threading.RLock()
+
+
+def make_entry(data, order_columns, descending=False, filtered=False, has_previous=False, has_next=False):
+    return {"data": data, "order_columns": list(order_columns), "descending": descending,
+            "filtered": filtered, "has_previous": has_previous, "has_next": has_next}
+
+
+def get_entry(table_name, signature):
+    with _lock:
+        entry = _entries.get((table_name, signature))
+        if entry is not None:
+            _entries.move_to_end((table_name, signature))
+        return entry
+
+
+def put_entry(table_name, signature, entry):
+    with _lock:
+        _entries[(table_name, signature)] = entry
+        _entries.move_to_end((table_name, signature))
+        while len(_entries) > CRUD_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def invalidate(table_name=None):
+    with _lock:
+        for key in [key for key in _entries if table_name is None or key[0] == table_name]:
+            del _entries[key]
+
+
+def _table_entries(table_name):
+    return [(key, entry) for key, entry in _entries.items() if key[0] == table_name]
+
+
+def _keys_mask(data, key_columns, keys):
+    """Rows of data whose key is one of keys (a list of key tuples), in one vectorized pass."""
+    if len(key_columns) == 1:
+        return data[key_columns[0]].isin([key[0] for key in keys])
+    return pd.Series(pd.MultiIndex.from_frame(data[list(key_columns)]).isin([tuple(key) for key in keys]),
+                     index=data.index)
+
+
+def _sorted(data, entry):
+    return data.sort_values(entry["order_columns"], ascending=not entry["descending"],
+                            kind="mergesort").reset_index(drop=True)
+
+
+def _insert_fits(entry, key):
+    """True when a row with this ordering key belongs on the cached page."""
+    data = entry["data"]
+    if not entry["has_previous"] and not entry["has_next"]:
+        return True  # the entry holds the whole (unfiltered) result
+    if data.empty:
+        return False
+    first = row_key(data.iloc[0], entry["order_columns"])
+    last = row_key(data.iloc[-1], entry["order_columns"])
+    if entry["descending"]:
+        before_page, after_page = key > first, key < last
+    else:
+        before_page, after_page = key < first, key > last
+    if before_page:
+        return not entry["has_previous"]
+    if after_page:
+        return not entry["has_next"]
+    return True
+
+
+def apply_insert(table_name, rows):
+    """rows: DataFrame holding the inserted records as stored (defaults applied)."""
+    with _lock:
+        for key, entry in _table_entries(table_name):
+            if entry["filtered"]:
+                del _entries[key]
+                continue
+            try:
+                fits = [_insert_fits(entry, row_key(row, entry["order_columns"])) for _, row in rows.iterrows()]
+            except TypeError:  # NULLs or mixed types in the ordering key
+                del _entries[key]
+                continue
+            if any(fits):
+                entry["data"] = _sorted(pd.concat([entry["data"], rows[fits]], ignore_index=True), entry)
+
+
+def apply_update(table_name, key_columns, keys, values):
+    """Sets values on every cached row whose key is in keys."""
+    with _lock:
+        for key, entry in _table_entries(table_name):
+            # A changed filter or ordering column can move the row onto another page
+            if entry["filtered"] or set(values) & set(entry["order_columns"]):
+                del _entries[key]
+                continue
+            data = entry["data"]
+            mask = _keys_mask(data, key_columns, keys)
+            if mask.any():
+                data = data.copy()
+                for column, value in values.items():
+                    if column in data.columns:
+                        if isinstance(data[column].dtype, pd.CategoricalDtype) and value is not None \
+                                and value not in data[column].cat.categories:
+                            data[column] = data[column].cat.add_categories([value])
+                        data.loc[mask, column] = value
+                entry["data"] = data
+
+
+def apply_delete(table_name, key_columns, keys):
+    """Drops every cached row whose key is in keys."""
+    with _lock:
+        for key, entry in _table_entries(table_name):
+            data = entry["data"]
+            mask = _keys_mask(data, key_columns, keys)
+            if mask.any():
+                entry["data"] = data[~mask].reset_index(drop=True)
+
+
+def table_change_marker(table_name):
+    """
+    Returns InnoDB's last-modified time for the table. information_schema statistics are cached
+    for a day by default on MySQL 8, so the session expiry is turned off first.
+    """
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("SET SESSION information_schema_stats_expiry = 0"))
+        except Exception:
+            pass  # MySQL 5.7 has no statistics cache
+        return conn.execute(text(
+            "SELECT UPDATE_TIME FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"
+        ), {"table_name": table_name}).scalar()
+
+
+def check_external_change(table_name):
+    """Drops the table's entries when it changed since the last check; returns True if it did."""
+    marker = table_change_marker(table_name)
+    with _lock:
+        changed = table_name in _change_markers and _change_markers[table_name] != marker
+        _change_markers[table_name] = marker
+        if changed:
+            invalidate(table_name)
+        return changed
+
+
+def acknowledge_write(table_name):
+    # Our own write moved the change marker; record it so it isn't mistaken for an external change
+    marker = table_change_marker(table_name)
+    with _lock:
+        _change_markers[table_name] = marker
@@ -0,0 +1,148 @@
+import re
+from datetime import timedelta
+
+import streamlit as st
+from database import quote_identifier
+from schema import TEXT_TYPES
+
+# table_filters.py
+#
+# Filter, sort and search controls for the CRUD grid. Everything compiles to a parameterized
+# WHERE clause / ORDER BY column that MySQL evaluates, so only matching rows leave the server.
+
+FILTER_OPERATORS = ["equals", "range", "prefix", "in list"]
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def compile_filters(table_info, filters, search=None):
+    """
+    Compiles filters and a free-text search into (where_sql, params).
+
+    filters is a list of dicts {column, operator, value}; for 'range' the value is a (low, high)
+    tuple where either bound may be blank, for 'in list' a list of values. Values are parsed with
+    the column's type. where_sql is '' when nothing applies, otherwise a bare condition without
+    the WHERE keyword so callers can AND it with their own predicates.
+    """
+    conditions = []
+    params = {}
+    for i, spec in enumerate(filters):
+        column = table_info.get_column(spec["column"])
+        name = quote_identifier(column.name)
+        operator, value = spec["operator"], spec["value"]
+        if operator == "equals":
+            params[f"f{i}"] = column.parse(value)
+            conditions.append(f"{name} = :f{i}" if params[f"f{i}"] is not None else f"{name} IS NULL")
+        elif operator == "range":
+            low, high = (column.parse(bound) for bound in value)
+            if low is not None:
+                conditions.append(f"{name} >= :f{i}_low")
+                params[f"f{i}_low"] = low
+            if high is not None:
+                conditions.append(f"{name} <= :f{i}_high")
+                params[f"f{i}_high"] = high
+        elif operator == "prefix":
+            if value:
+                # LIKE 'abc%' with no leading wildcard can still use an index on the column
+                conditions.append(f"{name} LIKE :f{i}")
+                params[f"f{i}"] = _escape_like(str(value)) + "%"
+        elif operator == "in list":
+            values = [column.parse(item) for item in value if str(item).strip()]
+            if values:
+                placeholders = ", ".join(f":f{i}_{j}" for j in range(len(values)))
+                conditions.append(f"{name} IN ({placeholders})")
+                params.update({f"f{i}_{j}": item for j, item in enumerate(values)})
+        else:
+            raise ValueError(f"Unknown filter operator: {operator}")
+
+    if search:
+        text_columns = [column for column in table_info.columns if column.data_type in TEXT_TYPES]
+        if text_columns:
+            conditions.append("(" + " OR ".join(
+                f"{quote_identifier(column.name)} LIKE :search" for column in text_columns
+            ) + ")")
+            params["search"] = "%" + _escape_like(search) + "%"
+
+    return " AND ".join(conditions), params
+
+
+def date_range_condition(column, start=None, end=None, granularity="day", prefix="date"):
+    """
+    Index-friendly predicate for an inclusive date range: the bare column compared against
+    constants (`Date >= :date_start AND Date < :date_end`, the day after end), never wrapped in
+    DATE_FORMAT()/YEAR(), so MySQL can range-scan an index on it. granularity="month" compares a
+    'YYYY-MM' text column such as the rollup tables' Month. Returns (condition, params).
+    """
+    conditions, params = [], {}
+    if granularity == "month":
+        if start is not None:
+            conditions.append(f"{quote_identifier(column)} >= :{prefix}_start")
+            params[f"{prefix}_start"] = start.strftime("%Y-%m")
+        if end is not None:
+            conditions.append(f"{quote_identifier(column)} <= :{prefix}_end")
+            params[f"{prefix}_end"] = end.strftime("%Y-%m")
+    else:
+        if start is not None:
+            conditions.append(f"{quote_identifier(column)} >= :{prefix}_start")
+            params[f"{prefix}_start"] = start
+        if end is not None:
+            conditions.append(f"{quote_identifier(column)} < :{prefix}_end")
+            params[f"{prefix}_end"] = end + timedelta(days=1)
+    return " AND ".join(conditions), params
+
+
+def add_condition(query, condition):
+    """ANDs a condition into a single-SELECT query, ahead of its GROUP BY / ORDER BY / LIMIT."""
+    if not condition:
+        return query
+    match = re.search(r"\b(GROUP\s+BY|ORDER\s+BY|LIMIT)\b", query, re.IGNORECASE)
+    head, tail = (query[:match.start()], query[match.start():]) if match else (query.rstrip(), "")
+    keyword = "AND" if re.search(r"\bWHERE\b", head, re.IGNORECASE) else "WHERE"
+    return f"{head.rstrip()}\n    {keyword} {condition}\n    {tail}"
+
+
+def sortable_columns(table_info):
+    # Keyset pagination compares (sort column, primary key) tuples, which NULLs would break
+    return [column.name for column in table_info.columns if not column.nullable]
+
+
+def display_filter_controls(table_info):
+    """
+    Renders the filter/sort/search widgets and returns (filters, search, sort_column, descending).
+    """
+    prefix = f"filters_{table_info.name}"
+    with st.expander("Filter, Sort & Search"):
+        search = st.text_input("Search text columns:", key=f"{prefix}_search").strip()
+
+        filters = []
+        filter_columns = st.multiselect("Filter columns:", table_info.column_names, key=f"{prefix}_columns")
+        for column_name in filter_columns:
+            operator_col, value_col = st.columns([1, 2])
+            operator = operator_col.selectbox(f"{column_name}", FILTER_OPERATORS, key=f"{prefix}_{column_name}_op")
+            if operator == "range":
+                low_col, high_col = value_col.columns(2)
+                value = (low_col.text_input("From", key=f"{prefix}_{column_name}_low"),
+                         high_col.text_input("To", key=f"{prefix}_{column_name}_high"))
+                if not any(bound.strip() for bound in value):
+                    continue
+            elif operator == "in list":
+                raw = value_col.text_input("Values (comma-separated)", key=f"{prefix}_{column_name}_in")
+                value = [item.strip() for item in raw.split(",") if item.strip()]
+                if not value:
+                    continue
+            else:
+                value = value_col.text_input("Value", key=f"{prefix}_{column_name}_value")
+                if not value.strip():
+                    continue
+            filters.append({"column": column_name, "operator": operator, "value": value})
+
+        columns = sortable_columns(table_info)
+        default = table_info.primary_key[0] if table_info.primary_key and table_info.primary_key[0] in columns else None
+        sort_col, direction_col = st.columns([2, 1])
+        sort_column = sort_col.selectbox("Sort by:", columns, key=f"{prefix}_sort",
+                                         index=columns.index(default) if default else 0)
+        descending = direction_col.radio("Direction:", ["Ascending", "Descending"],
+                                         key=f"{prefix}_direction") == "Descending"
+    return filters, search, sort_column, descending
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+import analytics_cache
+
+ROWS = pd.DataFrame({"InvestID": [1, 1, 1, 2, 3], "AccID": [10, 11, 12, 10, 10],
+                     "Amount": [1.0, 2.0, 3.0, 4.0, 5.0], "ReturnRate": [0.1] * 5,
+                     "StartDate": pd.to_datetime(["2024-01-01"] * 5)})
+
+
+@pytest.fixture
+def snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_cache, "ANALYTICS_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(analytics_cache, "ANALYTICS_BATCH_ROWS", 2)
+    table = {"rows": ROWS.iloc[:2], "queries": []}
+
+    def read_sql(query, params=None, **kwargs):
+        table["queries"].append(query)
+        data = table["rows"]
+        if params:  # ... (InvestID, AccID) > (:k0, :k1)
+            data = data[[(i, a) > (params["k0"], params["k1"]) for i, a in zip(data["InvestID"], data["AccID"])]]
+        # ORDER BY InvestID, AccID LIMIT 2
+        return data.sort_values(["InvestID", "AccID"]).head(2).reset_index(drop=True)
+    monkeypatch.setattr(analytics_cache, "read_sql", read_sql)
+    return table
+
+
+def test_batch_query_pages_on_the_whole_key():
+    query, params = analytics_cache.batch_query("SELECT * FROM `t`", ["InvestID", "AccID"], [1, 11])
+    assert query == ("SELECT * FROM `t` WHERE `InvestID` >= :k0 AND (`InvestID`, `AccID`) > (:k0, :k1) "
+                     f"ORDER BY `InvestID`, `AccID` LIMIT {analytics_cache.ANALYTICS_BATCH_ROWS}")
+    assert params == {"k0": 1, "k1": 11}
+
+
+def test_batch_query_starts_from_the_lowest_key():
+    query, params = analytics_cache.batch_query("SELECT * FROM `t`", ["TranID"])
+    assert query.startswith("SELECT * FROM `t` ORDER BY `TranID` LIMIT ") and params is None
+
+
+def test_incremental_refresh_keeps_rows_sharing_an_invest_id(snapshot):
+    manifest = {}
+    analytics_cache._refresh_table(manifest, "variablerateinvestment", rebuild=False)
+    assert manifest["variablerateinvestment"]["high_water"] == [1, 11]
+    snapshot["rows"] = ROWS
+    analytics_cache._refresh_table(manifest, "variablerateinvestment", rebuild=False)
+    data = analytics_cache.read_table("variablerateinvestment", manifest)
+    assert list(zip(data["InvestID"], data["AccID"])) == [(1, 10), (1, 11), (1, 12), (2, 10), (3, 10)]
+
+
+def test_first_build_is_paged(snapshot):
+    snapshot["rows"] = ROWS
+    manifest = {}
+    analytics_cache._refresh_table(manifest, "variablerateinvestment", rebuild=False)
+    entry = manifest["variablerateinvestment"]
+    assert len(entry["parts"]) == 3 and entry["rows"] == 5 and entry["high_water"] == [3, 10]
+    assert all("LIMIT 2" in query for query in snapshot["queries"])
+    data = analytics_cache.read_table("variablerateinvestment", manifest)
+    assert data["Amount"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_rebuild_pages_into_new_parts_and_retires_the_old_ones(snapshot):
+    manifest = {}
+    analytics_cache._refresh_table(manifest, "variablerateinvestment", rebuild=False)
+    old_parts = list(manifest["variablerateinvestment"]["parts"])
+    snapshot["rows"] = ROWS.iloc[1:]
+    analytics_cache._refresh_table(manifest, "variablerateinvestment", rebuild=True)
+    entry = manifest["variablerateinvestment"]
+    assert entry["retired"] == old_parts and not set(entry["parts"]) & set(old_parts)
+    assert entry["rows"] == 4 and len(entry["parts"]) == 2
+    assert all("LIMIT 2" in query for query in snapshot["queries"])
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import async_queries
+from guardrails import QueryTimeoutError
+from routing import current_session_id
+
+
+@pytest.fixture
+def slow_reads(monkeypatch):
+    current_session_id()  # imports Streamlit's script-run context up front, outside the timing
+    calls = []
+
+    def read_sql(query, params=None, timeout_ms=None, max_rows=None):
+        calls.append((query, timeout_ms, current_session_id()))
+        time.sleep(0.2)
+        return pd.DataFrame({"query": [query]})
+
+    def read_snapshot(queries, cached=True, max_rows=None):
+        calls.append((tuple(queries), None, current_session_id()))
+        return {name: pd.DataFrame({"query": [query]}) for name, (query, _) in queries.items()}
+
+    monkeypatch.setattr(async_queries, "read_sql", read_sql)
+    monkeypatch.setattr(async_queries, "read_snapshot", read_snapshot)
+    return calls
+
+
+def test_queries_run_concurrently_as_the_calling_session(slow_reads):
+    started = time.perf_counter()
+    frames = async_queries.run_queries({"a": "SELECT 1", "b": "SELECT 2", "c": ("SELECT 3", {"x": 1})})
+    assert time.perf_counter() - started < 0.5  # three 0.2 s queries, not 0.6 s in a row
+    assert list(frames) == ["a", "b", "c"]
+    assert frames["c"]["query"].tolist() == ["SELECT 3"]
+    assert {session for _, _, session in slow_reads} == {current_session_id()}
+
+
+def test_snapshot_groups_are_read_together(slow_reads):
+    frames = async_queries.run_queries({"a": "SELECT 1", "b": "SELECT 2", "c": "SELECT 3"},
+                                       snapshot_groups=[["a", "c"], ["b", "missing"]])
+    assert list(frames) == ["a", "b", "c"]
+    assert sorted(call[0] for call in slow_reads if isinstance(call[0], tuple)) == [("a", "c")]
+
+
+def test_per_query_timeout(slow_reads):
+    with pytest.raises(QueryTimeoutError):
+        async_queries.run_queries({"a": "SELECT 1"}, timeout=0.05)
+    assert slow_reads[0][1] == 50  # the server stops the query too
+
+
+def test_nested_fan_out_runs_in_line(monkeypatch):
+    threads = []
+
+    def inner():
+        return async_queries.run_loaders({"x": lambda: threads.append(threading.current_thread().name)})
+    async_queries.run_loaders({"outer": inner})
+    assert threads[0].startswith("query")
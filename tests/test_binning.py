@@ -0,0 +1,57 @@
+import math
+
+import pytest
+
+from binning import ages, bin_labels, bin_values, binned_query
+
+
+def test_ages_count_completed_years_around_a_birthday():
+    born = ["1990-06-15"]
+    assert ages(born, today="2024-06-14").tolist() == [33]
+    assert ages(born, today="2024-06-15").tolist() == [34]
+    assert ages(born, today="2024-06-16").tolist() == [34]
+
+
+def test_ages_for_a_leap_day_birthday_turn_over_on_march_first():
+    born = ["2000-02-29"]
+    assert ages(born, today="2023-02-28").tolist() == [22]
+    assert ages(born, today="2023-03-01").tolist() == [23]
+    assert ages(born, today="2024-02-29").tolist() == [24]
+
+
+def test_ages_are_nan_for_unknown_dates():
+    result = ages(["1980-01-01", None, "not a date"], today="2024-01-01").tolist()
+    assert result[0] == 44
+    assert math.isnan(result[1]) and math.isnan(result[2])
+
+
+def test_bin_values_floors_negative_values_into_lower_bins():
+    frame = bin_values([-150, -100, -1, 0, 99, 100], width=100)
+    assert frame["BinStart"].tolist() == [-200, -100, 0, 100]
+    assert frame["Count"].tolist() == [1, 2, 2, 1]
+
+
+def test_bin_values_with_float_width_and_missing_values():
+    frame = bin_values([0.1, 0.24, 0.25, 0.74, None, "x"], width=0.25)
+    assert frame["BinStart"].tolist() == [0.0, 0.25, 0.5]
+    assert frame["Count"].tolist() == [2, 1, 1]
+
+
+@pytest.mark.parametrize("width", [0, -5, True, "10", None])
+def test_invalid_widths_are_rejected(width):
+    with pytest.raises(ValueError):
+        bin_values([1, 2], width)
+    with pytest.raises(ValueError):
+        binned_query("loan", "Amount", width)
+
+
+def test_binned_query_inlines_the_width():
+    query = binned_query("loan", "Amount", 1000.0)
+    assert "FLOOR((Amount) / 1000) * 1000 as BinStart" in query
+    assert "FLOOR((Balance) / 0.5) * 0.5" in binned_query("bankaccount", "Balance", 0.5)
+
+
+def test_bin_labels():
+    assert bin_labels([30.0, 31.0], 1) == ["30", "31"]
+    assert bin_labels([-1000.0, 0.0, 1000.0], 1000) == ["-1,000-0", "0-1,000", "1,000-2,000"]
+    assert bin_labels([0.0, 0.25], 0.25) == ["0-0.25", "0.25-0.5"]
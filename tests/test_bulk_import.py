@@ -0,0 +1,58 @@
+import io
+
+import pandas as pd
+import pytest
+
+import bulk_import
+from bulk_import import validate_chunk
+from schema import ColumnInfo, TableInfo
+
+
+def _table():
+    return TableInfo("account", columns=[
+        ColumnInfo("AccID", "int", "int", nullable=False),
+        ColumnInfo("Balance", "decimal", "decimal(15,2)", nullable=True),
+    ], primary_key=["AccID"])
+
+
+def test_non_integral_value_in_integer_column_is_reported_per_row():
+    chunk = pd.DataFrame({"AccID": ["1", "1.5", "3"], "Balance": ["10.00", "20.00", None]}, dtype=object)
+    valid, errors = validate_chunk(chunk, _table())
+    assert valid["AccID"].tolist() == [1, 3]
+    assert [(row, column) for row, column, _ in errors] == [(2, "AccID")]
+
+
+def test_row_numbers_continue_across_chunks():
+    chunk = pd.DataFrame({"AccID": ["x"], "Balance": ["1"]}, dtype=object)
+    _, errors = validate_chunk(chunk, _table(), first_row=100)
+    assert errors[0][0] == 101
+
+
+@pytest.fixture
+def infile_import(monkeypatch):
+    """import_file over a CSV with LOAD DATA replaced by `result` = (rows loaded, warnings)."""
+    state = {}
+    monkeypatch.setattr(bulk_import, "get_table", lambda table_name: _table())
+    monkeypatch.setattr(bulk_import, "_load_chunk_with_infile", lambda table_name, frame: state["result"])
+    monkeypatch.setattr(bulk_import.table_cache, "acknowledge_write", lambda table_name: None)
+
+    def run(csv_text):
+        return bulk_import.import_file("account", io.StringIO(csv_text), "csv", use_load_data=True)
+    state["run"] = run
+    return state
+
+
+def test_load_data_warnings_are_reported_against_source_rows(infile_import):
+    infile_import["result"] = (1, [(2, "Data truncated for column 'Balance' at row 2")])
+    report = infile_import["run"]("AccID,Balance\nx,1\n1,10\n2,99999999999\n")
+    # Row 1 failed validation, so line 2 of the loaded file is source row 3
+    assert report["errors"][1] == (3, None, "Data truncated for column 'Balance' at row 2")
+
+
+def test_rows_skipped_by_load_data_are_reported(infile_import):
+    infile_import["result"] = (1, [(None, "Duplicate entry '1' for key 'PRIMARY'")])
+    report = infile_import["run"]("AccID,Balance\n1,10\n1,20\n")
+    assert report["rows_loaded"] == 1
+    assert [message for _, _, message in report["errors"]] == [
+        "Duplicate entry '1' for key 'PRIMARY'",
+        "1 of 2 valid rows were not loaded (skipped by the database, e.g. duplicate keys)"]
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+import database
+import result_cache
+
+
+@pytest.fixture
+def replicated(monkeypatch):
+    """A router with one replica; `pinned` controls whether the session just wrote."""
+    state = {"pinned": False, "reads": 0}
+    monkeypatch.setattr(database.router, "replicas", ["replica"])
+    monkeypatch.setattr(database.router, "is_pinned", lambda session_id=None: state["pinned"])
+
+    def read_sql(query, params=None, max_rows=None, **kwargs):
+        state["reads"] += 1
+        return pd.DataFrame({"n": [state["reads"]]})
+    monkeypatch.setattr(database, "read_sql", read_sql)
+    result_cache.invalidate()
+    yield state
+    result_cache.invalidate()
+
+
+QUERY = "SELECT COUNT(*) AS n FROM loan"
+
+
+def test_replica_result_is_not_cached_right_after_a_write(replicated):
+    result_cache.invalidate(["loan"])
+    database.cached_read_sql(QUERY)
+    database.cached_read_sql(QUERY)
+    assert replicated["reads"] == 2
+
+
+def test_pinned_session_bypasses_cached_results(replicated, monkeypatch):
+    monkeypatch.setattr(result_cache, "_invalidated_at", {})
+    database.cached_read_sql(QUERY)
+    replicated["pinned"] = True
+    assert database.cached_read_sql(QUERY)["n"].iloc[0] == 2
+    replicated["pinned"] = False
+    assert database.cached_read_sql(QUERY)["n"].iloc[0] == 2  # the primary's result was cached
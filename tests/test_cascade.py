@@ -0,0 +1,98 @@
+import pytest
+
+import cascade
+from schema import ColumnInfo, ForeignKeyInfo, TableInfo
+
+
+def _table(name, key, columns, foreign_keys=()):
+    """columns: {name: nullable}; foreign_keys: (columns, referred table, referred columns)."""
+    return TableInfo(name, [ColumnInfo(column, "int", "int", nullable) for column, nullable in columns.items()],
+                     [key], [ForeignKeyInfo(f"fk_{name}_{i}", list(fk_columns), referred, list(referred_columns))
+                             for i, (fk_columns, referred, referred_columns) in enumerate(foreign_keys)])
+
+
+SCHEMA = {table.name: table for table in [
+    _table("branch", "BranchID", {"BranchID": False}),
+    _table("employee", "EmpID", {"EmpID": False, "BranchID": False, "ManagerID": True},
+           [(["BranchID"], "branch", ["BranchID"]), (["ManagerID"], "employee", ["EmpID"])]),
+    _table("bankaccount", "AccID", {"AccID": False, "BranchID": True},
+           [(["BranchID"], "branch", ["BranchID"])]),
+    _table("transaction", "TranID", {"TranID": False, "AccID": False},
+           [(["AccID"], "bankaccount", ["AccID"])]),
+    _table("loan", "LoanID", {"LoanID": False, "EmpID": True}, [(["EmpID"], "employee", ["EmpID"])]),
+]}
+
+ROWS = {
+    "branch": [{"BranchID": 1}, {"BranchID": 2}],
+    "employee": [{"EmpID": 10, "BranchID": 1, "ManagerID": None}, {"EmpID": 11, "BranchID": 1, "ManagerID": 10},
+                 {"EmpID": 12, "BranchID": 2, "ManagerID": 10}],
+    "bankaccount": [{"AccID": 100, "BranchID": 1}, {"AccID": 101, "BranchID": 2}],
+    "transaction": [{"TranID": 1000, "AccID": 100}, {"TranID": 1001, "AccID": 101}],
+    "loan": [{"LoanID": 500, "EmpID": 11}, {"LoanID": 501, "EmpID": 12}],
+}
+
+
+@pytest.fixture(autouse=True)
+def database(monkeypatch):
+    def select_keys(conn, table_name, select_columns, where_columns, values):
+        return {tuple(row[column] for column in select_columns) for row in ROWS[table_name]
+                if tuple(row[column] for column in where_columns) in values}
+    monkeypatch.setattr(cascade, "_select_keys", select_keys)
+    monkeypatch.setattr(cascade, "get_schema", lambda: SCHEMA)
+
+
+def _plan(table, keys, nullable=cascade.SET_NULL):
+    return cascade.plan_cascade(table, keys, conn=object(), nullable=nullable)
+
+
+def test_nullable_references_are_set_null_instead_of_deleted():
+    plan, nulls = _plan("employee", [(11,)])
+    assert plan == {"employee": {(11,)}}
+    assert nulls == {("loan", ("EmpID",)): {(500,)}}
+
+
+def test_deleting_a_branch_keeps_its_accounts_and_their_transactions():
+    plan, nulls = _plan("branch", [(1,)])
+    assert plan == {"branch": {(1,)}, "employee": {(10,), (11,)}}
+    # The branch's own employees are deleted; references to them from elsewhere are cleared
+    assert nulls == {("bankaccount", ("BranchID",)): {(100,)}, ("employee", ("ManagerID",)): {(11,), (12,)},
+                     ("loan", ("EmpID",)): {(500,)}}
+
+
+def test_delete_mode_follows_nullable_references():
+    plan, nulls = _plan("branch", [(1,)], nullable=cascade.DELETE)
+    assert nulls == {}
+    assert plan == {"branch": {(1,)}, "employee": {(10,), (11,), (12,)}, "bankaccount": {(100,)},
+                    "transaction": {(1000,)}, "loan": {(500,), (501,)}}
+
+
+def test_delete_order_is_children_first():
+    plan, _ = _plan("branch", [(2,)], nullable=cascade.DELETE)
+    order = cascade.delete_order(plan, SCHEMA, cascade.DELETE)
+    assert order.index("transaction") < order.index("bankaccount") < order.index("branch")
+    assert order.index("loan") < order.index("employee") < order.index("branch")
+
+
+def test_delete_order_ignores_self_references_and_nulled_keys():
+    plan = {"employee": {(10,)}, "loan": {(500,)}}
+    assert cascade.delete_order(plan, SCHEMA, cascade.DELETE) == ["loan", "employee"]
+    # loan.EmpID is set NULL first, so it no longer constrains the order
+    assert cascade.delete_order(plan, SCHEMA) == ["employee", "loan"]
+
+
+def test_cycle_of_required_keys_is_rejected():
+    schema = {"a": _table("a", "id", {"id": False, "b_id": False}, [(["b_id"], "b", ["id"])]),
+              "b": _table("b", "id", {"id": False, "a_id": False}, [(["a_id"], "a", ["id"])])}
+    with pytest.raises(ValueError, match="cycle"):
+        cascade.delete_order({"a": {(1,)}, "b": {(2,)}}, schema)
+    # The same cycle through a nullable key is broken by setting it NULL
+    schema["b"].columns[1].nullable = True
+    assert cascade.delete_order({"a": {(1,)}, "b": {(2,)}}, schema) == ["a", "b"]
+
+
+def test_child_without_primary_key_is_rejected(monkeypatch):
+    schema = dict(SCHEMA, loan=_table("loan", "LoanID", {"LoanID": False, "EmpID": False},
+                                      [(["EmpID"], "employee", ["EmpID"])]))
+    schema["loan"].primary_key = []
+    with pytest.raises(ValueError, match="no primary key"):
+        cascade.plan_cascade("employee", [(11,)], conn=object(), schema=schema)
@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+
+import crud
+
+
+def _captured_query(monkeypatch, order_by):
+    seen = {}
+    monkeypatch.setattr(crud, "read_sql", lambda query, params=None, **kwargs: seen.setdefault("query", query))
+    crud.fetch_table_data("loan", order_by=order_by)
+    return seen["query"]
+
+
+def test_no_sort_column_falls_back_to_the_key_columns(monkeypatch):
+    order_by = crud.page_order_columns(["LoanID"], None)
+    assert _captured_query(monkeypatch, order_by).endswith("ORDER BY `LoanID` ASC")
+
+
+def test_no_sort_column_and_no_key_reads_unordered(monkeypatch):
+    order_by = crud.page_order_columns([], None)
+    query = _captured_query(monkeypatch, order_by)
+    assert "ORDER BY" not in query and "None" not in query
+
+
+@pytest.fixture
+def page_reads(monkeypatch):
+    """Serves `rows` ids to fetch_table_page and records the query and parameters it sent."""
+    state = {"rows": []}
+
+    def read_sql(query, params=None, **kwargs):
+        state.update(query=" ".join(query.split()), params=params)
+        return pd.DataFrame({"TranID": state["rows"]})
+    monkeypatch.setattr(crud, "read_sql", read_sql)
+    return state
+
+
+def test_first_page(page_reads):
+    page_reads["rows"] = [1, 2, 3]
+    data, has_previous, has_next = crud.fetch_table_page("transaction", ["TranID"], 2)
+    assert page_reads["query"] == "SELECT * FROM `transaction` ORDER BY `TranID` ASC LIMIT :limit"
+    assert page_reads["params"] == {"limit": 3}
+    assert data["TranID"].tolist() == [1, 2]
+    assert (has_previous, has_next) == (False, True)
+
+
+def test_after_seeks_past_the_anchor_on_a_composite_order(page_reads):
+    page_reads["rows"] = [5, 6]
+    data, has_previous, has_next = crud.fetch_table_page(
+        "transaction", ["TranID"], 2, ("after", (100, 4)), where="`Type` = :f0", params={"f0": "Deposit"},
+        sort_column="Amount")
+    assert page_reads["query"] == (
+        "SELECT * FROM `transaction` WHERE (`Type` = :f0) AND `Amount` >= :k0 AND (`Amount`, `TranID`) > (:k0, :k1) "
+        "ORDER BY `Amount` ASC, `TranID` ASC LIMIT :limit")
+    assert page_reads["params"] == {"f0": "Deposit", "limit": 3, "k0": 100, "k1": 4}
+    assert (has_previous, has_next) == (True, False)
+
+
+def test_before_scans_backwards_and_returns_the_page_in_order(page_reads):
+    page_reads["rows"] = [9, 8, 7]  # two rows of the page plus one more before it
+    data, has_previous, has_next = crud.fetch_table_page("transaction", ["TranID"], 2, ("before", (10,)))
+    assert page_reads["query"] == "SELECT * FROM `transaction` WHERE `TranID` < :k0 ORDER BY `TranID` DESC LIMIT :limit"
+    assert data["TranID"].tolist() == [8, 9]
+    assert (has_previous, has_next) == (True, True)
+
+
+def test_before_on_the_first_page_has_no_previous(page_reads):
+    page_reads["rows"] = [2, 1]
+    data, has_previous, _ = crud.fetch_table_page("transaction", ["TranID"], 2, ("before", (3,)))
+    assert data["TranID"].tolist() == [1, 2] and not has_previous
+
+
+def test_descending_flips_the_seek(page_reads):
+    crud.fetch_table_page("transaction", ["TranID"], 2, ("after", (50, 7)), sort_column="Amount", descending=True)
+    assert "`Amount` <= :k0 AND (`Amount`, `TranID`) < (:k0, :k1)" in page_reads["query"]
+    assert page_reads["query"].endswith("ORDER BY `Amount` DESC, `TranID` DESC LIMIT :limit")
+    crud.fetch_table_page("transaction", ["TranID"], 2, ("before", (50, 7)), sort_column="Amount", descending=True)
+    assert "`Amount` >= :k0 AND (`Amount`, `TranID`) > (:k0, :k1)" in page_reads["query"]
+    assert page_reads["query"].endswith("ORDER BY `Amount` ASC, `TranID` ASC LIMIT :limit")
+
+
+@pytest.mark.parametrize("descending, comparison, order", [(False, ">=", "ASC"), (True, "<=", "DESC")])
+def test_from_jumps_on_the_leading_sort_column(page_reads, descending, comparison, order):
+    page_reads["rows"] = [3]
+    data, has_previous, has_next = crud.fetch_table_page(
+        "transaction", ["TranID"], 2, ("from", ("2024-01-01",)), sort_column="Date", descending=descending)
+    assert page_reads["query"] == (f"SELECT * FROM `transaction` WHERE `Date` {comparison} :k0 "
+                                   f"ORDER BY `Date` {order}, `TranID` {order} LIMIT :limit")
+    assert page_reads["params"]["k0"] == "2024-01-01"
+    assert (has_previous, has_next) == (True, False)
+
+
+def test_edits_and_deletes_of_transactions_mark_the_rollups_stale(monkeypatch):
+    marked = []
+    monkeypatch.setattr(crud, "mark_rollups_stale", lambda: marked.append(True))
+    monkeypatch.setattr(crud.table_cache, "acknowledge_write", lambda table_name: None)
+    crud._note_rollup_edits("transaction", {"insert"})
+    crud._note_rollup_edits("loan", {"delete"})
+    assert not marked
+    crud._note_rollup_edits("transaction", {"insert", "update"})
+    crud._invalidate_after_cascade({"transaction": 3, "bankaccount": 1})
+    assert len(marked) == 2
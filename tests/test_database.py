@@ -0,0 +1,53 @@
+import pytest
+
+import database
+from database import multi_row_insert
+
+
+def test_rewrites_a_single_row_insert_for_every_parameter_set():
+    query, params = multi_row_insert("INSERT INTO loan (LoanID, Amount) VALUES (:LoanID, :Amount)",
+                                     [{"LoanID": 1, "Amount": 10}, {"LoanID": 2, "Amount": 20}])
+    assert query == ("INSERT INTO loan (LoanID, Amount) VALUES "
+                     "(:LoanID_r0, :Amount_r0), (:LoanID_r1, :Amount_r1)")
+    assert params == {"LoanID_r0": 1, "Amount_r0": 10, "LoanID_r1": 2, "Amount_r1": 20}
+
+
+def test_keeps_an_upsert_tail_and_literals_inside_the_row():
+    query, params = multi_row_insert(
+        "INSERT INTO t (a, b, at) VALUES (:a, 'x', '10:30') ON DUPLICATE KEY UPDATE a = VALUES(a)",
+        [{"a": 1}, {"a": 2}])
+    assert query == ("INSERT INTO t (a, b, at) VALUES (:a_r0, 'x', '10:30'), (:a_r1, 'x', '10:30') "
+                     "ON DUPLICATE KEY UPDATE a = VALUES(a)")
+    assert params == {"a_r0": 1, "a_r1": 2}
+
+
+@pytest.mark.parametrize("query", [
+    "UPDATE loan SET Amount = :Amount WHERE LoanID = :LoanID",
+    "INSERT INTO t (a, n) VALUES (:a, 1) ON DUPLICATE KEY UPDATE n = n + :step",
+    "INSERT INTO t (a) SELECT a FROM s WHERE a > :low",
+])
+def test_returns_none_when_the_statement_cannot_be_rewritten(query):
+    assert multi_row_insert(query, [{"a": 1, "LoanID": 1, "Amount": 1, "step": 1, "low": 0}]) is None
+
+
+def test_execute_many_keeps_each_chunk_under_the_placeholder_limit(monkeypatch):
+    executed = []
+
+    class Connection:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, statement, params):
+            executed.append(len(params))
+            return type("Result", (), {"rowcount": len(params)})()
+
+    monkeypatch.setattr(database, "engine", type("Engine", (), {"begin": lambda self: Connection()})())
+    monkeypatch.setattr(database, "note_write", lambda: None)
+    monkeypatch.setattr(database, "MAX_PLACEHOLDERS", 10)
+    rows = [{"a": i, "b": i} for i in range(12)]
+    report = database.execute_many("INSERT INTO t (a, b) VALUES (:a, :b)", rows, chunk_size=100)
+    assert [chunk["rows"] for chunk in report] == [5, 5, 2]
+    assert max(executed) <= 10
@@ -0,0 +1,104 @@
+import csv
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import export
+from schema import ColumnInfo, TableInfo
+
+COLUMNS = ["AccID", "Balance", "Opened"]
+BATCHES = [[(1, Decimal("10.50"), date(2024, 1, 2)), (2, None, None)], [(3, Decimal("7.00"), date(2024, 3, 4))]]
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    """Feeds export_query the given partitions instead of a server-side cursor."""
+    state = {"batches": BATCHES}
+
+    def stream_query(query, params=None, batch_size=None):
+        for rows in state["batches"] or [[]]:
+            yield COLUMNS, rows
+    monkeypatch.setattr(export, "stream_query", stream_query)
+    return state
+
+
+def test_csv_writes_a_header_and_every_batch(stream, tmp_path):
+    path = tmp_path / "out.csv"
+    report = export.export_query("SELECT", str(path), "csv")
+    assert (report["rows"], report["batches"]) == (3, 2)
+    with open(path, newline="", encoding="utf-8") as handle:
+        assert list(csv.reader(handle)) == [COLUMNS, ["1", "10.50", "2024-01-02"], ["2", "", ""],
+                                            ["3", "7.00", "2024-03-04"]]
+
+
+def test_json_lines_stringify_driver_types(stream, tmp_path):
+    path = tmp_path / "out.jsonl"
+    export.export_query("SELECT", str(path), "jsonl")
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert lines[0] == {"AccID": 1, "Balance": "10.50", "Opened": "2024-01-02"}
+    assert lines[1] == {"AccID": 2, "Balance": None, "Opened": None}
+
+
+def test_parquet_writes_one_row_group_per_batch(stream, tmp_path):
+    path = tmp_path / "out.parquet"
+    export.export_query("SELECT", str(path), "parquet")
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 2
+    assert parquet.read().column("AccID").to_pylist() == [1, 2, 3]
+
+
+def test_parquet_column_null_in_the_first_batch_is_typed_as_text(stream, tmp_path):
+    stream["batches"] = [[(1, None, None)], [(2, Decimal("1.00"), date(2024, 1, 1))]]
+    path = tmp_path / "out.parquet"
+    export.export_query("SELECT", str(path), "parquet")
+    assert pq.read_table(path).column("Balance").to_pylist() == [None, "1.00"]
+
+
+@pytest.mark.parametrize("file_format, expected", [("csv", "AccID,Balance,Opened\n"), ("jsonl", "")])
+def test_empty_result_keeps_the_header(stream, tmp_path, file_format, expected):
+    stream["batches"] = []
+    path = tmp_path / f"out.{file_format}"
+    report = export.export_query("SELECT", str(path), file_format)
+    assert report["rows"] == 0 and path.read_text(encoding="utf-8").replace("\r\n", "\n") == expected
+
+
+def test_empty_parquet_result_keeps_the_schema(stream, tmp_path):
+    stream["batches"] = []
+    path = tmp_path / "out.parquet"
+    export.export_query("SELECT", str(path), "parquet", arrow_schema=pa.schema([("AccID", pa.int64())]))
+    table = pq.read_table(path)
+    assert table.num_rows == 0 and table.schema.field("AccID").type == pa.int64()
+
+
+def test_unknown_format_is_rejected(stream, tmp_path):
+    with pytest.raises(ValueError, match="Unsupported export format"):
+        export.export_query("SELECT", str(tmp_path / "out.xml"), "xml")
+
+
+def test_arrow_schema_follows_the_reflected_column_types(monkeypatch):
+    table = TableInfo("account", columns=[
+        ColumnInfo("AccID", "int", "int", nullable=False),
+        ColumnInfo("Balance", "decimal", "decimal(15,2)", nullable=True),
+        ColumnInfo("Rate", "double", "double", nullable=True),
+        ColumnInfo("Opened", "date", "date", nullable=True),
+        ColumnInfo("Updated", "timestamp", "timestamp", nullable=True),
+        ColumnInfo("Time", "time", "time", nullable=True),
+        ColumnInfo("Status", "varchar", "varchar(20)", nullable=True),
+    ])
+    monkeypatch.setattr(export, "get_table", lambda table_name: table)
+    schema = export.arrow_schema_for_table("account")
+    assert [field.type for field in schema] == [pa.int64(), pa.decimal128(15, 2), pa.float64(), pa.date32(),
+                                                pa.timestamp("us"), pa.duration("us"), pa.string()]
+    assert not schema.field("AccID").nullable and schema.field("Balance").nullable
+
+
+def test_arrow_schema_writes_time_values(monkeypatch, tmp_path):
+    schema = pa.schema([("Time", pa.duration("us"))])
+    monkeypatch.setattr(export, "stream_query", lambda *args, **kwargs: iter([(["Time"], [(timedelta(hours=1),)])]))
+    path = tmp_path / "out.parquet"
+    export.export_query("SELECT", str(path), "parquet", arrow_schema=schema)
+    assert pq.read_table(path).column("Time").to_pylist() == [timedelta(hours=1)]
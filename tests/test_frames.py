@@ -0,0 +1,22 @@
+from datetime import date
+from decimal import Decimal
+
+from frames import compact_frame
+
+# (name, type_code, display_size, internal_size, precision, scale, null_ok) as in cursor.description
+DESCRIPTION = [("Balance", 246, None, None, 15, 2, True), ("SetupDate", 10, None, None, None, None, True)]
+ROWS = [(Decimal("1234.50"), date(1990, 5, 1)), (Decimal("10.00"), date(2020, 1, 2))]
+
+
+def test_default_frames_are_compact():
+    data = compact_frame(ROWS, ["Balance", "SetupDate"], DESCRIPTION)
+    assert str(data["Balance"].dtype) == "float64"
+    assert str(data["SetupDate"].dtype).startswith("datetime64")
+
+
+def test_exact_frames_keep_decimal_and_date_values():
+    data = compact_frame(ROWS, ["Balance", "SetupDate"], DESCRIPTION, decimals="exact")
+    assert data["Balance"].tolist() == [Decimal("1234.50"), Decimal("10.00")]
+    assert data["SetupDate"].tolist() == [date(1990, 5, 1), date(2020, 1, 2)]
+    assert str(data.at[0, "SetupDate"]) == "1990-05-01"
+
@@ -0,0 +1,24 @@
+import pandas as pd
+
+from guardrails import _CANCELLED_KEY, _FINISHED_KEY, _pending_cancel, cap_rows, with_execution_timeout, with_row_cap
+
+
+def test_cancel_click_for_a_running_query_cancels():
+    state = {_CANCELLED_KEY: "cancel_query_1"}
+    assert _pending_cancel(state)
+    assert _CANCELLED_KEY not in state
+
+
+def test_late_cancel_click_after_the_query_finished_is_ignored():
+    state = {_CANCELLED_KEY: "cancel_query_1", _FINISHED_KEY: ["cancel_query_1"]}
+    assert not _pending_cancel(state)
+    assert not _pending_cancel(state)
+
+
+def test_timeout_hint_and_row_cap():
+    assert with_execution_timeout("SELECT 1", 500) == "SELECT /*+ MAX_EXECUTION_TIME(500) */ 1"
+    assert with_execution_timeout("UPDATE t SET a = 1", 500) == "UPDATE t SET a = 1"
+    assert with_row_cap("SELECT * FROM t", 10) == ("SELECT * FROM t LIMIT 11", True)
+    assert with_row_cap("SELECT * FROM t LIMIT :limit", 10) == ("SELECT * FROM t LIMIT :limit", False)
+    capped = cap_rows(pd.DataFrame({"a": range(11)}), 10)
+    assert len(capped) == 10 and capped.attrs["truncated_at"] == 10
@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("geopy")  # index_advisor reads the chart queries from visualizations.py
+import index_advisor  # noqa: E402
+
+
+def test_plan_issues_flags_large_scans_filesorts_and_temporary_tables():
+    plan = [{"table": "transaction", "type": "ALL", "rows": 50000, "Extra": "Using temporary; Using filesort"},
+            {"table": "branch", "type": "ALL", "rows": 10, "Extra": None},
+            {"table": "loan", "type": "range", "rows": 90000, "Extra": "Using where"}]
+    assert index_advisor.plan_issues(plan, min_rows=1000) == [
+        "full scan of transaction (~50000 rows)", "filesort on transaction", "temporary table on transaction"]
+
+
+def test_plan_issues_accepts_a_clean_plan():
+    assert index_advisor.plan_issues([{"table": "loan", "type": "ref", "rows": 5, "Extra": "Using index"}]) == []
+
+
+def test_is_covered_matches_leading_columns_case_insensitively():
+    indexes = {"bankaccount": [("branchid", "balance", "accid"), ("type",)]}
+    assert index_advisor.is_covered("BankAccount", ("BranchID", "Balance"), indexes)
+    assert index_advisor.is_covered("bankaccount", ("Type",), indexes)
+    assert not index_advisor.is_covered("bankaccount", ("Balance",), indexes)
+    assert not index_advisor.is_covered("bankaccount", ("Type", "Status"), indexes)
+    assert not index_advisor.is_covered("loan", ("Type",), indexes)
@@ -0,0 +1,19 @@
+from types import SimpleNamespace
+
+import query_stats
+
+
+def test_unknown_row_counts_are_not_recorded():
+    assert query_stats.row_count(SimpleNamespace(rowcount=3)) == 3
+    assert query_stats.row_count(SimpleNamespace(rowcount=-1)) is None
+    assert query_stats.row_count(SimpleNamespace(rowcount=18446744073709551615)) is None
+
+
+def test_mean_rows_ignores_streamed_queries():
+    query_stats.reset_query_stats()
+    query_stats.record_query("SELECT * FROM loan", 0.001, 10, "test")
+    query_stats.record_query("SELECT * FROM loan", 0.001, None, "test")
+    [row] = query_stats.query_stats()
+    assert row["count"] == 2
+    assert row["mean_rows"] == 10
+    query_stats.reset_query_stats()
@@ -0,0 +1,42 @@
+import pytest
+
+from result_cache import tables_read, tables_written
+
+
+def test_tables_read_covers_from_and_join_clauses():
+    query = """
+    SELECT b.Name, SUM(a.Balance) FROM `BankAccount` a
+    LEFT JOIN branch b ON b.BranchID = a.BranchID
+    INNER JOIN customer c ON c.CustomerID = a.CustomerID
+    GROUP BY b.Name
+    """
+    assert tables_read(query) == {"bankaccount", "branch", "customer"}
+
+
+def test_tables_read_sees_through_derived_tables():
+    assert tables_read("SELECT * FROM (SELECT AccID FROM loan) AS l") == {"loan"}
+
+
+@pytest.mark.parametrize("statement, written", [
+    ("INSERT INTO `loan` (LoanID) VALUES (:id)", {"loan"}),
+    ("insert ignore into Loan (LoanID) VALUES (:id)", {"loan"}),
+    ("REPLACE INTO branch (BranchID) VALUES (1)", {"branch"}),
+    ("UPDATE bankaccount SET Balance = 0 WHERE AccID = :id", {"bankaccount"}),
+    ("DELETE FROM customer WHERE CustomerID = :id", {"customer"}),
+    ("TRUNCATE TABLE rollup_state", {"rollup_state"}),
+    ("CREATE TABLE IF NOT EXISTS rollup_state (Name VARCHAR(64))", {"rollup_state"}),
+    # INSERT ... SELECT and multi-table writes count every table they touch
+    ("INSERT INTO rollup_daily (Day) SELECT t.Date FROM `transaction` t", {"rollup_daily", "transaction"}),
+    ("UPDATE loan l JOIN bankaccount a ON a.AccID = l.AccID SET l.Status = 'x'", {"loan", "bankaccount"}),
+])
+def test_tables_written_names_the_target(statement, written):
+    assert tables_written(statement) == written
+
+
+@pytest.mark.parametrize("statement", ["SELECT * FROM loan", "  SHOW TABLES", "EXPLAIN SELECT 1", ""])
+def test_reads_write_nothing(statement):
+    assert tables_written(statement) == frozenset()
+
+
+def test_unknown_write_target_invalidates_everything():
+    assert tables_written("RENAME TABLE loan TO loan_old") is None
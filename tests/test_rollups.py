@@ -0,0 +1,16 @@
+import rollups
+
+
+def test_fold_in_reads_new_totals_through_a_row_alias():
+    for table in rollups.ROLLUPS:
+        statement = rollups.fold_in_statement(table)
+        assert "VALUES(" not in statement
+        assert ") AS new ON DUPLICATE KEY UPDATE" in statement
+        assert f"TransactionCount = {table}.TransactionCount + new.TransactionCount" in statement
+
+
+def test_fold_in_aliases_bucket_expressions_to_the_key_columns():
+    statement = rollups.fold_in_statement("rollup_transaction_branch_monthly")
+    assert "COALESCE(a.BranchID, 0) AS `BranchID`" in statement
+    assert "DATE_FORMAT(t.Date, '%Y-%m') AS `Month`" in statement
+    assert "LEFT JOIN bankaccount a" in statement
@@ -0,0 +1,16 @@
+from routing import ReplicaRouter
+
+
+def test_note_write_evicts_sessions_whose_pin_has_lapsed(monkeypatch):
+    router = ReplicaRouter(primary=object(), read_your_writes_seconds=10)
+    clock = {"now": 100.0}
+    monkeypatch.setattr("routing.time.monotonic", lambda: clock["now"])
+
+    router.note_write("old")
+    clock["now"] = 105.0
+    router.note_write("recent")
+    clock["now"] = 112.0
+    router.note_write("new")
+
+    assert set(router._last_write) == {"recent", "new"}
+    assert router.is_pinned("recent") and not router.is_pinned("old")
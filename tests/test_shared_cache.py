@@ -0,0 +1,78 @@
+import os
+
+import pandas as pd
+import pytest
+
+import shared_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_cache, "SHARED_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(shared_cache, "_initialized", False)
+    return tmp_path
+
+
+def _frames(cache_dir):
+    return sorted(os.listdir(cache_dir / "frames"))
+
+
+def _frame(rows=3):
+    data = pd.DataFrame({"AccID": range(rows), "Type": ["Savings"] * rows})
+    data.attrs["truncated_at"] = 100
+    return data
+
+
+def test_round_trips_frames_groups_and_payloads():
+    shared_cache.put("q", {"a": 1}, _frame(), {"bankaccount"}, ttl=60)
+    shared_cache.put("group", None, {"x": _frame(1), "y": _frame(2)}, {"loan"}, ttl=60)
+    shared_cache.put("chart", None, {"series": [1, 2]}, {"loan"}, ttl=60)
+    cached = shared_cache.get("q", {"a": 1})
+    pd.testing.assert_frame_equal(cached, _frame())
+    assert cached.attrs == {"truncated_at": 100}
+    assert {name: len(data) for name, data in shared_cache.get("group").items()} == {"x": 1, "y": 2}
+    assert shared_cache.get("chart") == {"series": [1, 2]}
+    assert shared_cache.get("q", {"a": 2}) is None
+
+
+def test_bumping_a_table_drops_entries_that_read_it(cache_dir):
+    shared_cache.put("accounts", None, _frame(), {"bankaccount"}, ttl=60)
+    shared_cache.put("loans", None, _frame(), {"loan"}, ttl=60)
+    shared_cache.bump({"bankaccount"})
+    assert shared_cache.get("accounts") is None
+    assert shared_cache.get("loans") is not None
+    assert len(_frames(cache_dir)) == 1  # the stale entry's file is removed on lookup
+
+
+def test_bumping_everything_drops_every_entry():
+    shared_cache.put("loans", None, _frame(), {"loan"}, ttl=60)
+    shared_cache.bump()
+    assert shared_cache.get("loans") is None
+
+
+def test_put_that_raced_a_write_is_not_stored(cache_dir):
+    seen = shared_cache.versions({"loan"})  # taken before the read
+    shared_cache.bump({"loan"})  # a write lands while the query runs
+    shared_cache.put("loans", None, _frame(), {"loan"}, ttl=60, recorded_versions=seen)
+    assert shared_cache.get("loans") is None
+    assert _frames(cache_dir) == []
+
+
+def test_expired_entries_are_misses():
+    shared_cache.put("loans", None, _frame(), {"loan"}, ttl=0)
+    assert shared_cache.get("loans") is None
+
+
+def test_eviction_drops_the_least_recently_used(cache_dir, monkeypatch):
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(shared_cache.time, "time", lambda: clock["now"])
+    for key in ("a", "b"):
+        shared_cache.put(key, None, _frame(), {"loan"}, ttl=60)
+        clock["now"] += 1
+    shared_cache.get("a")  # now more recent than b
+    clock["now"] += 1
+    monkeypatch.setattr(shared_cache, "SHARED_CACHE_MAX_BYTES", shared_cache.cache_stats()["bytes"])
+    shared_cache.put("c", None, _frame(), {"loan"}, ttl=60)
+    assert shared_cache.get("b") is None
+    assert shared_cache.get("a") is not None and shared_cache.get("c") is not None
+    assert shared_cache.cache_stats()["entries"] == 2 and len(_frames(cache_dir)) == 2
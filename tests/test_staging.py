@@ -0,0 +1,24 @@
+from staging import group_writes
+
+
+def _insert(table, key):
+    return {"operation": "insert", "table": table, "values": {"ID": key}, "key_columns": [], "key": ()}
+
+
+def test_consecutive_same_shaped_writes_share_a_group():
+    groups = group_writes([_insert("bankaccount", 1), _insert("bankaccount", 2)])
+    assert len(groups) == 1
+    assert [params["v_0"] for params in groups[0][1]] == [1, 2]
+
+
+def test_writes_to_other_tables_in_between_keep_statement_order():
+    groups = group_writes([_insert("bankaccount", 1), _insert("customer", 2), _insert("bankaccount", 3)])
+    assert [[params["v_0"] for params in params_list] for _, params_list in groups] == [[1], [2], [3]]
+    assert "customer" in groups[1][0]
+
+
+def test_update_between_inserts_splits_the_run():
+    update = {"operation": "update", "table": "bankaccount", "values": {"Balance": 5},
+              "key_columns": ["ID"], "key": (1,), "expected": {}}
+    groups = group_writes([_insert("bankaccount", 1), update, _insert("bankaccount", 2)])
+    assert [len(params_list) for _, params_list in groups] == [1, 1, 1]
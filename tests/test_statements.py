@@ -0,0 +1,24 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from statements import row_key, to_python
+
+
+def test_pandas_scalars_become_driver_friendly_values():
+    assert to_python(pd.Timestamp("2024-01-02 03:04:05")) == datetime(2024, 1, 2, 3, 4, 5)
+    assert type(to_python(np.int64(7))) is int
+    assert to_python(float("nan")) is None
+    assert to_python(pd.NaT) is None
+
+
+def test_time_values_bind_as_timedelta():
+    value = to_python(pd.Timedelta(hours=1, minutes=2, seconds=3))
+    assert type(value) is timedelta
+    assert value == timedelta(hours=1, minutes=2, seconds=3)
+
+
+def test_row_key_over_a_time_column():
+    row = pd.Series({"EmpID": np.int64(4), "Time": pd.Timedelta(minutes=30)})
+    assert row_key(row, ["EmpID", "Time"]) == (4, timedelta(minutes=30))
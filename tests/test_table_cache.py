@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+import crud
+import table_cache
+from schema import ColumnInfo, TableInfo
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    table_cache.invalidate()
+    yield
+    table_cache.invalidate()
+
+
+def _cache_page(data, order_columns=("AccID",)):
+    table_cache.put_entry("bankaccount", "all", table_cache.make_entry(data, order_columns))
+    return lambda: table_cache.get_entry("bankaccount", "all")["data"]
+
+
+def test_update_and_delete_apply_many_keys_at_once():
+    cached = _cache_page(pd.DataFrame({"AccID": [1, 2, 3, 4], "Status": ["a", "a", "a", "a"]}))
+    table_cache.apply_update("bankaccount", ["AccID"], [(1,), (3,)], {"Status": "closed"})
+    assert cached()["Status"].tolist() == ["closed", "a", "closed", "a"]
+    table_cache.apply_delete("bankaccount", ["AccID"], [(2,), (4,)])
+    assert cached()["AccID"].tolist() == [1, 3]
+
+
+def test_composite_keys():
+    data = pd.DataFrame({"InvestID": [1, 1, 2], "AccID": [10, 11, 10], "Amount": [5, 6, 7]})
+    cached = _cache_page(data, ("InvestID", "AccID"))
+    table_cache.apply_delete("bankaccount", ["InvestID", "AccID"], [(1, 11), (2, 10)])
+    assert cached()[["InvestID", "AccID"]].values.tolist() == [[1, 10]]
+
+
+def test_insert_appends_several_rows_in_order():
+    cached = _cache_page(pd.DataFrame({"AccID": [1, 5], "Status": ["a", "a"]}))
+    table_cache.apply_insert("bankaccount", pd.DataFrame({"AccID": [3, 7], "Status": ["b", "b"]}))
+    assert cached()["AccID"].tolist() == [1, 3, 5, 7]
+
+
+def test_bulk_patch_acknowledges_once_and_reads_inserts_in_one_query(monkeypatch):
+    table_info = TableInfo("bankaccount", columns=[ColumnInfo("AccID", "int", "int", nullable=False),
+                                                   ColumnInfo("Status", "varchar", "varchar(50)", nullable=False)],
+                           primary_key=["AccID"])
+    cached = _cache_page(pd.DataFrame({"AccID": [1, 2, 3], "Status": ["a", "a", "a"]}))
+    acknowledged, reads = [], []
+    monkeypatch.setattr(table_cache, "acknowledge_write", acknowledged.append)
+
+    def fetch(table_name, where, params):
+        reads.append(where)
+        return pd.DataFrame({"AccID": [4, 5], "Status": ["new", "new"]})
+    monkeypatch.setattr(crud, "fetch_table_data", fetch)
+
+    writes = [{"operation": "update", "values": {"Status": "x"}, "key_columns": ["AccID"], "key": (key,)}
+              for key in (1, 2, 3)]
+    writes += [{"operation": "insert", "values": {"AccID": "4", "Status": "new"}},
+               {"operation": "insert", "values": {"AccID": "5", "Status": "new"}}]
+    crud.patch_cache_after_writes(table_info, writes)
+    assert acknowledged == ["bankaccount"]
+    assert len(reads) == 1
+    assert cached()["Status"].tolist() == ["x", "x", "x", "new", "new"]
@@ -0,0 +1,44 @@
+from datetime import date
+
+from table_filters import add_condition, date_range_condition
+
+
+def test_day_range_compares_the_bare_column_with_an_exclusive_end():
+    condition, params = date_range_condition("Date", date(2024, 1, 1), date(2024, 1, 31))
+    assert condition == "`Date` >= :date_start AND `Date` < :date_end"
+    assert params == {"date_start": date(2024, 1, 1), "date_end": date(2024, 2, 1)}
+
+
+def test_month_range_compares_month_text_inclusively():
+    condition, params = date_range_condition("Month", date(2024, 1, 15), date(2024, 3, 2), granularity="month")
+    assert condition == "`Month` >= :date_start AND `Month` <= :date_end"
+    assert params == {"date_start": "2024-01", "date_end": "2024-03"}
+
+
+def test_open_ended_ranges():
+    assert date_range_condition("Date", start=date(2024, 1, 1)) == ("`Date` >= :date_start",
+                                                                     {"date_start": date(2024, 1, 1)})
+    assert date_range_condition("Date", end=date(2024, 12, 31), prefix="d") == ("`Date` < :d_end",
+                                                                               {"d_end": date(2025, 1, 1)})
+    assert date_range_condition("Date") == ("", {})
+
+
+def _words(query):
+    return " ".join(query.split())
+
+
+def test_add_condition_inserts_a_where_before_group_by():
+    query = "SELECT Type, COUNT(*) FROM loan GROUP BY Type ORDER BY Type"
+    assert _words(add_condition(query, "`Date` >= :d")) == (
+        "SELECT Type, COUNT(*) FROM loan WHERE `Date` >= :d GROUP BY Type ORDER BY Type")
+
+
+def test_add_condition_extends_an_existing_where():
+    query = "SELECT * FROM loan WHERE Status = 'Open' ORDER BY LoanID LIMIT 10"
+    assert _words(add_condition(query, "`Date` >= :d")) == (
+        "SELECT * FROM loan WHERE Status = 'Open' AND `Date` >= :d ORDER BY LoanID LIMIT 10")
+
+
+def test_add_condition_appends_to_a_query_without_clauses():
+    assert _words(add_condition("SELECT * FROM loan\n", "x = 1")) == "SELECT * FROM loan WHERE x = 1"
+    assert add_condition("SELECT * FROM loan", "") == "SELECT * FROM loan"
@@ -1,156 +1,300 @@
+import logging
+import time
+
 import streamlit as st
 from geopy import Nominatim
 from streamlit_echarts import st_echarts
 import pandas as pd
-from database import engine
-from geocoding import plot_branch_locations  # If needed
+import analytics_cache
+from binning import bin_frame, bin_labels, distribution_query
+from config import DISTRIBUTION_BIN_WIDTHS
+from async_queries import read_concurrently
+from database import cached_read_sql
+from guardrails import run_cancellable
+from geocoding import BRANCH_LOCATIONS_QUERY, plot_branch_locations
+from rollups import refresh_rollups, stale_edits
+from sqlalchemy.exc import SQLAlchemyError
+from table_filters import add_condition, date_range_condition
 from geopy.extra.rate_limiter import RateLimiter
 
-def get_account_type_distribution():
-    query = "SELECT Type, COUNT(*) as count FROM bankaccount GROUP BY Type"
-    with engine.connect() as conn:
-        data = pd.read_sql(query, conn)
-    types = data['Type'].tolist()
-    counts = data['count'].tolist()
-    return types, counts
+logger = logging.getLogger("banking_dashboard.rollups")
 
-def get_customer_ages():
-    query = "SELECT DateOfBirth FROM customer"
-    with engine.connect() as conn:
-        data = pd.read_sql(query, conn)
-    today = pd.to_datetime('today').normalize()
-    data['DateOfBirth'] = pd.to_datetime(data['DateOfBirth'])
-    data['Age'] = data['DateOfBirth'].apply(
-        lambda dob: today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-    )
-    ages = data['Age'].tolist()
-    return ages
-
-def get_customer_growth_over_time():
-    query = """
+# Every chart query by name. A page can load any group of them at once (load_chart_frames) and
+# hand the frames to the get_* functions; called without frames, each get_* loads its own.
+CHART_QUERIES = {
+    "account_types": "SELECT Type, COUNT(*) as count FROM bankaccount GROUP BY Type",
+    # Histograms bucketed in SQL (binning.py), one row per bin
+    "customer_ages": distribution_query("age"),
+    "balance_distribution": distribution_query("balance"),
+    "loan_amount_distribution": distribution_query("loan_amount"),
+    "customer_growth": """
     SELECT YEAR(SetupDate) as Year, COUNT(DISTINCT CustomerID) as CustomerCount
     FROM bankaccount
     GROUP BY Year
     ORDER BY Year
-    """
-    with engine.connect() as conn:
-        data = pd.read_sql(query, conn)
-    return data
-
-def get_branch_assets():
-    query = """
+    """,
+    "branch_assets": """
     SELECT b.Name, SUM(ba.Balance) as TotalBalance
     FROM bankaccount ba
     JOIN branch b ON ba.BranchID = b.BranchID
     GROUP BY b.Name 
-    """
-    with engine.connect() as conn:
-        data = pd.read_sql(query, conn)
-    return data
-
-def get_loan_distribution_by_type():
-    query = """
+    """,
+    "loan_types": """
     SELECT l.Type, COUNT(*) as LoanCount, SUM(l.Amount) as TotalAmount
     FROM loan l
     GROUP BY l.Type
-    """
-    with engine.connect() as conn:
-        data = pd.read_sql(query, conn)
-    return data
-
-def get_loan_status_breakdown():
-    query = """
+    """,
+    "loan_status": """
     SELECT Status, COUNT(*) as LoanCount
     FROM loan
     GROUP BY Status
-    """
-    with engine.connect() as conn:
-        data = pd.read_sql(query, conn)
-    return data
-
-def get_transaction_volume_over_time():
-    query = """
-    SELECT DATE_FORMAT(Date, '%%Y-%%m') as Month, COUNT(*) as TransactionCount
-    FROM `transaction`
-    GROUP BY Month
+    """,
+    # Maintained incrementally by rollups.py; see _chart_queries()
+    "transaction_volume": """
+    SELECT Month, TransactionCount
+    FROM rollup_transaction_monthly
     ORDER BY Month
-    """
-    with engine.connect() as conn:
-        data = pd.read_sql(query, conn)
-    return data
-
-def get_branch_addresses():
-    query = """
+    """,
+    "branch_addresses": """
     SELECT ba.Street, ba.City, ba.State, ba.ZipCode, ba.Country,
            b.Name as BranchName
     FROM branchaddress ba
     JOIN branch b ON ba.BranchID = b.BranchID
-    """
-    with engine.connect() as conn:
-        data = pd.read_sql(query, conn)
-    return data
-
-
-def get_investment_returns():
-    # Query to get average ReturnRate over time from variablerateinvestment
-    query_variable = """
-    SELECT DATE_FORMAT(StartDate, '%%Y-%%m') as Period, AVG(ReturnRate) as AverageReturnRate
+    """,
+    # Average ReturnRate / InterestRate over time, for the investment returns chart
+    "variable_returns": """
+    SELECT DATE_FORMAT(StartDate, '%Y-%m') as Period, AVG(ReturnRate) as AverageReturnRate
     FROM variablerateinvestment
     GROUP BY Period
     ORDER BY Period
-    """
-    # Query to get average InterestRate over time from fixedrateinvestment
-    query_fixed = """
-    SELECT DATE_FORMAT(StartDate, '%%Y-%%m') as Period, AVG(InterestRate) as AverageInterestRate
+    """,
+    "fixed_returns": """
+    SELECT DATE_FORMAT(StartDate, '%Y-%m') as Period, AVG(InterestRate) as AverageInterestRate
     FROM fixedrateinvestment
     GROUP BY Period
     ORDER BY Period
-    """
-    with engine.connect() as conn:
-        data_variable = pd.read_sql(query_variable, conn)
-        data_fixed = pd.read_sql(query_fixed, conn)
-    # Merge the two datasets on Period
-    data = pd.merge(data_variable, data_fixed, on='Period', how='outer').fillna(0)
-    return data
-
-def get_investment_portfolio():
-    # Query to get total Amount from fixedrateinvestment
-    query_fixed = """
+    """,
+    # Total Amount per investment kind, for the portfolio composition chart
+    "fixed_total": """
     SELECT 'Fixed Rate Investment' as InvestmentType, SUM(Amount) as TotalAmount
     FROM fixedrateinvestment
-    """
-    # Query to get total Amount from variablerateinvestment
-    query_variable = """
+    """,
+    "variable_total": """
     SELECT 'Variable Rate Investment' as InvestmentType, SUM(Amount) as TotalAmount
     FROM variablerateinvestment
+    """,
+    "branch_locations": BRANCH_LOCATIONS_QUERY,
+}
+
+# Queries one chart compares side by side, read from the same snapshot
+SNAPSHOT_GROUPS = [["variable_returns", "fixed_returns"], ["fixed_total", "variable_total"]]
+
+# Same result as the transaction_volume rollup, aggregated over the whole table
+TRANSACTION_VOLUME_DIRECT_QUERY = """
+    SELECT DATE_FORMAT(Date, '%Y-%m') as Month, COUNT(*) as TransactionCount
+    FROM `transaction`
+    GROUP BY Month
+    ORDER BY Month
     """
-    with engine.connect() as conn:
-        data_fixed = pd.read_sql(query_fixed, conn)
-        data_variable = pd.read_sql(query_variable, conn)
+
+# Time-series queries that accept a date range: query name -> (date column, granularity).
+# The range is compiled against the bare column so an index on it can be range-scanned.
+DATE_RANGE_COLUMNS = {
+    "customer_growth": ("SetupDate", "day"),
+    "transaction_volume": ("Month", "month"),
+    "transaction_volume_direct": ("Date", "day"),
+    "variable_returns": ("StartDate", "day"),
+    "fixed_returns": ("StartDate", "day"),
+}
+
+def apply_date_range(range_key, query, date_range):
+    """(query, params) limited to date_range = (start, end), either end optional."""
+    if not date_range or range_key not in DATE_RANGE_COLUMNS:
+        return query, None
+    column, granularity = DATE_RANGE_COLUMNS[range_key]
+    condition, params = date_range_condition(column, *date_range, granularity=granularity)
+    return add_condition(query, condition), params or None
+
+def _chart_queries(names, date_range=None):
+    range_keys = {name: name for name in names}
+    queries = {name: CHART_QUERIES[name] for name in names}
+    if "transaction_volume" in queries:
+        try:
+            refresh_rollups()  # folds in new transactions; a no-op check when nothing changed
+            current = not stale_edits()  # edited transactions are only corrected by a rebuild
+        except SQLAlchemyError:
+            # e.g. no CREATE privilege or a lock timeout: aggregate the base table instead
+            logger.warning("Rollup refresh failed; charting transaction volume from the base table", exc_info=True)
+            current = False
+        if not current:
+            queries["transaction_volume"] = TRANSACTION_VOLUME_DIRECT_QUERY
+            range_keys["transaction_volume"] = "transaction_volume_direct"
+    return {name: apply_date_range(range_keys[name], query, date_range) for name, query in queries.items()}
+
+def _from_analytics(names, date_range):
+    # Unfiltered charts over the tables in the local analytics snapshot skip MySQL entirely
+    if date_range or not analytics_cache.enabled():
+        return {}
+    frames = {name: analytics_cache.query(name) for name in names}
+    return {name: data for name, data in frames.items() if data is not None}
+
+def load_chart_data(name, frames=None, date_range=None):
+    if frames is not None:
+        return frames[name].copy()
+    local = _from_analytics([name], date_range)
+    if name in local:
+        return local[name]
+    query, params = _chart_queries([name], date_range)[name]
+    return cached_read_sql(query, params)
+
+def load_chart_frames(names=None, cached=True, date_range=None):
+    # The queries run concurrently (one cache entry for the group); queries drawn together on
+    # one chart share a snapshot so their numbers agree
+    names = names or list(CHART_QUERIES)
+    frames = _from_analytics(names, date_range)
+    remaining = [name for name in names if name not in frames]
+    if remaining:
+        frames.update(read_concurrently(_chart_queries(remaining, date_range), SNAPSHOT_GROUPS, cached=cached))
+    return frames
+
+def display_snapshot_freshness():
+    """Caption saying how old the local analytics snapshot behind the charts is."""
+    if not analytics_cache.enabled():
+        return
+    refreshed = [at for at in analytics_cache.freshness().values() if at is not None]
+    if not refreshed:
+        st.caption("The local analytics snapshot is being built; charts read the database meanwhile.")
+        return
+    age = time.time() - min(refreshed)
+    age_text = f"{age:.0f} s" if age < 60 else f"{age / 60:.0f} min" if age < 3600 else f"{age / 3600:.1f} h"
+    st.caption(f"Charts without a date range read a local snapshot of the analytics tables, updated {age_text} ago.")
+
+def get_account_type_distribution(frames=None):
+    data = load_chart_data("account_types", frames)
+    types = data['Type'].tolist()
+    counts = data['count'].tolist()
+    return types, counts
+
+def _distribution(name, query_name, column, frames):
+    # BinStart/Count from SQL, or bucketed here when the frame holds the raw column
+    data = load_chart_data(query_name, frames)
+    if column in data:
+        return bin_frame(name, data)
+    return data
+
+def get_customer_ages(frames=None):
+    return _distribution("age", "customer_ages", "DateOfBirth", frames)
+
+def get_balance_distribution(frames=None):
+    return _distribution("balance", "balance_distribution", "Balance", frames)
+
+def get_loan_amount_distribution(frames=None):
+    return _distribution("loan_amount", "loan_amount_distribution", "Amount", frames)
+
+def get_customer_growth_over_time(frames=None, date_range=None):
+    data = load_chart_data("customer_growth", frames, date_range)
+    return data
+
+def get_branch_assets(frames=None):
+    data = load_chart_data("branch_assets", frames)
+    return data
+
+def get_loan_distribution_by_type(frames=None):
+    data = load_chart_data("loan_types", frames)
+    return data
+
+def get_loan_status_breakdown(frames=None):
+    data = load_chart_data("loan_status", frames)
+    return data
+
+def get_transaction_volume_over_time(frames=None, date_range=None):
+    data = load_chart_data("transaction_volume", frames, date_range)
+    return data
+
+def get_branch_addresses(frames=None):
+    data = load_chart_data("branch_addresses", frames)
+    return data
+
+
+def get_investment_returns(frames=None, date_range=None):
+    # Both tables are read from the same snapshot, so the periods line up
+    frames = frames or load_chart_frames(["variable_returns", "fixed_returns"], date_range=date_range)
+    data_variable, data_fixed = frames["variable_returns"], frames["fixed_returns"]
+    # Merge the two datasets on Period
+    data = pd.merge(data_variable, data_fixed, on='Period', how='outer').fillna(0)
+    return data
+
+def get_investment_portfolio(frames=None):
+    frames = frames or load_chart_frames(["fixed_total", "variable_total"])
+    data_fixed, data_variable = frames["fixed_total"], frames["variable_total"]
     # Combine the two datasets
     data = pd.concat([data_fixed, data_variable], ignore_index=True)
     return data
 
+VISUALIZATIONS = [
+    'Account Types Distribution',
+    'Age Distribution',
+    'Customer Growth Over Time',
+    'Branch Assets Comparison',
+    'Account Balance Distribution',
+    'Loan Distribution by Type',
+    'Loan Status Breakdown',
+    'Loan Amount Distribution',
+    'Transaction Volume Over Time',
+    'Geographical Distribution',
+    'Investment Returns',  # New visualization
+    'Investment Portfolio Composition'  # New visualization
+]
+
+# Charts whose loaders take a date_range
+TIME_SERIES_VISUALIZATIONS = {'Customer Growth Over Time', 'Transaction Volume Over Time', 'Investment Returns'}
+
+def date_range_filter():
+    """(start, end) picked in the sidebar, or None for all time."""
+    picked = st.sidebar.date_input("Date range", value=(), help="Leave empty to show all time")
+    picked = tuple(picked) if isinstance(picked, (list, tuple)) else (picked,)
+    if not picked:
+        return None
+    return picked[0], picked[1] if len(picked) > 1 else None
+
 def display_visualizations():
     st.sidebar.title("Visualizations")
-    visualizations = [
-        'Account Types Distribution',
-        'Age Distribution',
-        'Customer Growth Over Time',
-        'Branch Assets Comparison',
-        'Loan Distribution by Type',
-        'Loan Status Breakdown',
-        'Transaction Volume Over Time',
-        'Geographical Distribution',
-        'Investment Returns',  # New visualization
-        'Investment Portfolio Composition'  # New visualization
-    ]
-    selected_visualization = st.sidebar.selectbox("Select a visualization:", visualizations)
+    selected_visualization = st.sidebar.selectbox("Select a visualization:", VISUALIZATIONS)
+    date_range = date_range_filter() if selected_visualization in TIME_SERIES_VISUALIZATIONS else None
+    display_snapshot_freshness()
+    render_visualization(selected_visualization, date_range=date_range)
 
+def _chart_data(loader, selected_visualization, frames, date_range=None):
+    # Pre-loaded frames (Overview page) only need transforming; otherwise load with a Cancel button
+    if frames is not None:
+        return loader(frames)
+    if date_range:
+        return run_cancellable(loader, label=selected_visualization, date_range=date_range)
+    return run_cancellable(loader, label=selected_visualization)
+
+def _histogram(data, width, x_name, y_name):
+    options = {
+        "title": {"text": "", "left": "center"},
+        "backgroundColor": "rgba(255, 255, 255, 0.8)",
+        "tooltip": {"trigger": "axis"},
+        "xAxis": {"type": "category", "data": bin_labels(data['BinStart'].tolist(), width), "name": x_name, "axisLabel": {"fontSize": 13, "color": "#000000"}},
+        "yAxis": {"type": "value", "name": y_name, "axisLabel": {"fontSize": 13, "color": "#000000"}},
+        "series": [
+            {
+                "data": data['Count'].tolist(),
+                "type": "bar",
+                "barWidth": "60%",
+                "itemStyle": {"color": "#5470C6"},
+            }
+        ],
+    }
+    st_echarts(options=options, height="500px")
+
+def render_visualization(selected_visualization, frames=None, date_range=None):
     if selected_visualization == 'Account Types Distribution':
         st.header('Account Types Distribution')
         try:
-            types, counts = get_account_type_distribution()
+            types, counts = _chart_data(get_account_type_distribution, selected_visualization, frames)
             # Prepare ECharts options
             pie_data = [{"value": count, "name": acc_type} for acc_type, count in zip(types, counts)]
             options = {
@@ -189,31 +333,23 @@ def display_visualizations():
     elif selected_visualization == 'Age Distribution':
         st.header('Age Distribution of Customers')
         try:
-            ages = get_customer_ages()
-            age_counts = pd.Series(ages).value_counts().sort_index()
-            options = {
-                "title": {"text": "", "left": "center"},
-                "backgroundColor": "rgba(255, 255, 255, 0.8)",
-                "tooltip": {"trigger": "axis"},
-                "xAxis": {"type": "category", "data": age_counts.index.tolist(), "name": "Age", "axisLabel": {"fontSize": 13, "color": "#000000"}},
-                "yAxis": {"type": "value", "name": "Number of Customers", "axisLabel": {"fontSize": 13, "color": "#000000"}},
-                "series": [
-                    {
-                        "data": age_counts.values.tolist(),
-                        "type": "bar",
-                        "barWidth": "60%",
-                        "itemStyle": {"color": "#5470C6"},
-                    }
-                ],
-            }
-            st_echarts(options=options, height="500px")
+            data = _chart_data(get_customer_ages, selected_visualization, frames)
+            _histogram(data, DISTRIBUTION_BIN_WIDTHS["age"], "Age", "Number of Customers")
+        except Exception as e:
+            st.error(f"Error generating visualization: {e}")
+
+    elif selected_visualization == 'Account Balance Distribution':
+        st.header('Account Balance Distribution')
+        try:
+            data = _chart_data(get_balance_distribution, selected_visualization, frames)
+            _histogram(data, DISTRIBUTION_BIN_WIDTHS["balance"], "Balance", "Number of Accounts")
         except Exception as e:
             st.error(f"Error generating visualization: {e}")
 
     elif selected_visualization == 'Customer Growth Over Time':
         st.header('Customer Growth Over Time')
         try:
-            data = get_customer_growth_over_time()
+            data = _chart_data(get_customer_growth_over_time, selected_visualization, frames, date_range)
             years = data['Year'].tolist()
             counts = data['CustomerCount'].tolist()
             options = {
@@ -238,7 +374,7 @@ def display_visualizations():
     elif selected_visualization == 'Branch Assets Comparison':
         st.header('Branch Assets Comparison')
         try:
-            data = get_branch_assets()
+            data = _chart_data(get_branch_assets, selected_visualization, frames)
             branch_names = data['Name'].tolist()
             total_balances = data['TotalBalance'].tolist()
             options = {
@@ -263,7 +399,7 @@ def display_visualizations():
     elif selected_visualization == 'Loan Distribution by Type':
         st.header('Loan Distribution by Type')
         try:
-            data = get_loan_distribution_by_type()
+            data = _chart_data(get_loan_distribution_by_type, selected_visualization, frames)
             loan_types = data['Type'].tolist()
             loan_counts = data['LoanCount'].tolist()
             options = {
@@ -288,7 +424,7 @@ def display_visualizations():
     elif selected_visualization == 'Loan Status Breakdown':
         st.header('Loan Status Breakdown')
         try:
-            data = get_loan_status_breakdown()
+            data = _chart_data(get_loan_status_breakdown, selected_visualization, frames)
             statuses = data['Status'].tolist()
             loan_counts = data['LoanCount'].tolist()
             pie_data = [{"value": count, "name": status} for status, count in zip(statuses, loan_counts)]
@@ -324,10 +460,18 @@ def display_visualizations():
         except Exception as e:
             st.error(f"Error generating visualization: {e}")
 
+    elif selected_visualization == 'Loan Amount Distribution':
+        st.header('Loan Amount Distribution')
+        try:
+            data = _chart_data(get_loan_amount_distribution, selected_visualization, frames)
+            _histogram(data, DISTRIBUTION_BIN_WIDTHS["loan_amount"], "Loan Amount", "Number of Loans")
+        except Exception as e:
+            st.error(f"Error generating visualization: {e}")
+
     elif selected_visualization == 'Transaction Volume Over Time':
         st.header('Transaction Volume Over Time')
         try:
-            data = get_transaction_volume_over_time()
+            data = _chart_data(get_transaction_volume_over_time, selected_visualization, frames, date_range)
             if data.empty:
                 st.warning("No data available for transaction volume over time.")
             else:
@@ -357,14 +501,14 @@ def display_visualizations():
     elif selected_visualization == 'Geographical Distribution':
         st.header('Geographical Distribution')
         try:
-            plot_branch_locations()
+            plot_branch_locations(frames["branch_locations"] if frames is not None else None)
         except Exception as e:
             st.error(f"Error generating visualization: {e}")
 
     elif selected_visualization == 'Investment Returns':
         st.header('Average Investment Returns Over Time')
         try:
-            data = get_investment_returns()
+            data = _chart_data(get_investment_returns, selected_visualization, frames, date_range)
             periods = data['Period'].tolist()
             avg_return_rates = data['AverageReturnRate'].tolist()
             avg_interest_rates = data['AverageInterestRate'].tolist()
@@ -399,7 +543,7 @@ def display_visualizations():
     elif selected_visualization == 'Investment Portfolio Composition':
         st.header('Investment Portfolio Composition')
         try:
-            data = get_investment_portfolio()
+            data = _chart_data(get_investment_portfolio, selected_visualization, frames)
             investment_types = data['InvestmentType'].tolist()
             total_amounts = data['TotalAmount'].tolist()
             options = {